@@ -0,0 +1,109 @@
+from datetime import datetime, timezone
+from typing import List, Sequence, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import numpy as np
+
+from . import models
+
+GRANULARITIES = ("hour", "day", "week", "month")
+
+# Mongo groups clicks by local wall-clock hour for hourly series and by local
+# day otherwise; week/month buckets are folded from days in NumPy.
+_GROUP_FORMATS = {"hour": "%Y-%m-%dT%H", "day": "%Y-%m-%d", "week": "%Y-%m-%d", "month": "%Y-%m-%d"}
+_KEY_UNITS = {"hour": "h", "day": "D", "week": "D", "month": "D"}
+
+
+def get_timezone(name: str) -> ZoneInfo:
+    """Resolve an IANA timezone name, raising ValueError if unknown."""
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unknown timezone '{name}'")
+
+
+def bucket_edges(days: int, granularity: str, tz: ZoneInfo, now: datetime = None) -> Tuple[np.ndarray, datetime]:
+    """
+    Return the local wall-clock start of every bucket covering the last `days`
+    days (today included) as a datetime64 array, plus the UTC instant of the
+    first bucket start, used to bound the Mongo match.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unsupported granularity '{granularity}'")
+
+    now_local = (now or datetime.now(timezone.utc)).astimezone(tz)
+    today = np.datetime64(now_local.date(), "D")
+    first_day = today - np.timedelta64(days - 1, "D")
+
+    if granularity == "hour":
+        current_hour = np.datetime64(now_local.replace(tzinfo=None), "h")
+        edges = np.arange(first_day.astype("datetime64[h]"), current_hour + 1)
+    elif granularity == "day":
+        edges = np.arange(first_day, today + 1)
+    elif granularity == "week":
+        # 1970-01-01 was a Thursday: shift so that Monday is weekday 0
+        monday = first_day - np.timedelta64((first_day.astype(np.int64) + 3) % 7, "D")
+        edges = np.arange(monday, today + 1, 7)
+    else:
+        edges = np.arange(first_day.astype("datetime64[M]"), today.astype("datetime64[M]") + 1)
+
+    # Start the match at the first bucket so leading weeks/months are complete
+    start_local = datetime.combine(edges[0].astype("datetime64[D]").astype(datetime), datetime.min.time(), tzinfo=tz)
+    start_utc = start_local.astimezone(timezone.utc).replace(tzinfo=None)
+    return edges, start_utc
+
+
+def assemble_series(edges: np.ndarray, granularity: str, code_index: np.ndarray, keys: np.ndarray, counts: np.ndarray, n_codes: int) -> np.ndarray:
+    """
+    Scatter aggregation rows into a zero-filled (n_codes, n_buckets) matrix.
+
+    `keys` are the local timestamps returned by Mongo; each one is mapped to
+    the bucket whose start is the closest edge at or before it, which both
+    fills the gaps and folds days into weeks/months in a single pass.
+    """
+    matrix = np.zeros((n_codes, len(edges)), dtype=np.int64)
+    if len(keys) == 0:
+        return matrix
+    key_edges = edges.astype(f"datetime64[{_KEY_UNITS[granularity]}]")
+    bucket = np.searchsorted(key_edges, keys, side="right") - 1
+    valid = bucket >= 0
+    np.add.at(matrix, (code_index[valid], bucket[valid]), counts[valid])
+    return matrix
+
+
+def bucket_labels(edges: np.ndarray) -> List[str]:
+    return np.datetime_as_string(edges).tolist()
+
+
+async def click_timeseries(qrcode_ids: Sequence, days: int, granularity: str = "day", tz_name: str = "UTC"):
+    """
+    Build click count series for one or several QR codes.
+
+    Returns (labels, matrix) where matrix[i] is the series of qrcode_ids[i].
+    """
+    tz = get_timezone(tz_name)
+    edges, start_utc = bucket_edges(days, granularity, tz)
+
+    date_expr = {"date": "$timestamp", "format": _GROUP_FORMATS[granularity]}
+    if tz_name != "UTC":
+        date_expr["timezone"] = tz_name
+
+    pipeline = [
+        {"$match": {
+            "qrcode_id": {"$in": list(qrcode_ids)},
+            "timestamp": {"$gte": start_utc}
+        }},
+        {"$group": {
+            "_id": {"q": "$qrcode_id", "b": {"$dateToString": date_expr}},
+            "count": {"$sum": 1}
+        }}
+    ]
+    rows = await models.Click.aggregate(pipeline).to_list()
+
+    positions = {qrcode_id: i for i, qrcode_id in enumerate(qrcode_ids)}
+    code_index = np.fromiter((positions[r["_id"]["q"]] for r in rows), dtype=np.intp, count=len(rows))
+    keys = np.array([r["_id"]["b"] for r in rows], dtype=f"datetime64[{_KEY_UNITS[granularity]}]")
+    counts = np.fromiter((r["count"] for r in rows), dtype=np.int64, count=len(rows))
+
+    matrix = assemble_series(edges, granularity, code_index, keys, counts, len(qrcode_ids))
+    return bucket_labels(edges), matrix
@@ -1,8 +1,16 @@
 import os
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
+from bson import ObjectId
+from bson.errors import InvalidId
 from jose import JWTError, jwt
-from fastapi import HTTPException
+from fastapi import HTTPException, Request
 from passlib.context import CryptContext
 
 SECRET_KEY = os.getenv("SECRET_KEY", "replace-this")
@@ -12,9 +20,23 @@ if SECRET_KEY == "replace-this":
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 15))
 REFRESH_TOKEN_EXPIRE_MINUTES = int(os.getenv("REFRESH_TOKEN_EXPIRE_MINUTES", 1440))
+# Verified token payloads kept in memory, keyed by token digest (0 disables the cache)
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 1024))
+
+_token_cache: "OrderedDict[bytes, tuple]" = OrderedDict()
+# decode_token also runs on the threadpool (sync routes), where an unguarded
+# move_to_end can race an eviction of the same key
+_token_cache_lock = threading.Lock()
+
+# Max concurrent bcrypt operations; each one takes ~100-300ms of CPU
+PASSWORD_HASH_CONCURRENCY = int(os.getenv("PASSWORD_HASH_CONCURRENCY", 2))
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt releases the GIL, so running it on a small dedicated pool keeps the
+# event loop (and redirects) responsive during a burst of logins.
+_password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_CONCURRENCY, thread_name_prefix="bcrypt")
+
 
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
@@ -24,6 +46,18 @@ def get_password_hash(password):
     return pwd_context.hash(password)
 
 
+async def verify_password_async(plain_password, hashed_password):
+    """verify_password run on the bounded bcrypt pool instead of the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_executor, verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password):
+    """get_password_hash run on the bounded bcrypt pool instead of the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_executor, get_password_hash, password)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
@@ -39,15 +73,39 @@ def create_refresh_token(data: dict, expires_delta: Optional[timedelta] = None):
 
 
 def decode_token(token: str):
+    """Verify a JWT and return its payload, or None if invalid/expired.
+
+    Successful verifications are cached until the token's own `exp`, so the
+    same cookie sent by a burst of dashboard calls is only verified once.
+    """
+    digest = hashlib.sha256(token.encode()).digest()
+    with _token_cache_lock:
+        cached = _token_cache.get(digest)
+        if cached is not None:
+            payload, exp = cached
+            if exp is None or exp > time.time():
+                _token_cache.move_to_end(digest)
+                return dict(payload)
+            _token_cache.pop(digest, None)
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except JWTError:
         return None
 
+    if TOKEN_CACHE_SIZE > 0:
+        with _token_cache_lock:
+            _token_cache[digest] = (payload, payload.get("exp"))
+            while len(_token_cache) > TOKEN_CACHE_SIZE:
+                _token_cache.popitem(last=False)
+    return dict(payload)
+
 
 def require_admin_from_request(request):
     """Return payload if request contains a valid admin token (cookie or Authorization header), else raise HTTPException."""
+    payload = getattr(request.state, "admin_payload", None)
+    if payload is not None:
+        return payload
     token = None
     # cookie
     token = request.cookies.get('admin_token')
@@ -61,4 +119,42 @@ def require_admin_from_request(request):
     payload = decode_token(token)
     if not payload or not payload.get('admin'):
         raise HTTPException(status_code=403, detail='Not authorized')
+    request.state.admin_payload = payload
     return payload
+
+
+async def require_admin(request: Request) -> dict:
+    """FastAPI dependency: admin token payload, verified once per request.
+
+    The auth dependencies never block, so they are coroutines: FastAPI runs
+    sync dependencies on the threadpool, one hop per dependency per request.
+    """
+    return require_admin_from_request(request)
+
+
+def _bearer_user_id(request) -> Optional[ObjectId]:
+    """User id from a valid `Authorization: Bearer <access token>` header, else None."""
+    auth_header = request.headers.get('Authorization')
+    if not auth_header or not auth_header.startswith('Bearer '):
+        return None
+    payload = decode_token(auth_header.split(' ', 1)[1])
+    # Email verification links are access tokens too; they carry an "action"
+    if not payload or payload.get('type') != 'access' or payload.get('action') or not payload.get('sub'):
+        return None
+    try:
+        return ObjectId(payload['sub'])
+    except (InvalidId, TypeError):
+        return None
+
+
+async def require_user_id(request: Request) -> ObjectId:
+    """FastAPI dependency: id of the logged-in user, 401 otherwise."""
+    user_id = _bearer_user_id(request)
+    if user_id is None:
+        raise HTTPException(status_code=401, detail='Not authenticated')
+    return user_id
+
+
+async def optional_user_id(request: Request) -> Optional[ObjectId]:
+    """FastAPI dependency: id of the logged-in user, or None for anonymous calls."""
+    return _bearer_user_id(request)
@@ -0,0 +1,151 @@
+import asyncio
+import hashlib
+import logging
+import os
+from collections import Counter
+from datetime import datetime
+from typing import Optional
+
+from pymongo import UpdateOne
+
+from . import models
+from .geoip import load_geoip
+from .live import LIVE_SOURCE, click_bus
+from .uniques import add_scanners
+
+logger = logging.getLogger(__name__)
+
+# 1 = insert every click immediately (safe default for serverless); larger
+# values batch inserts, flushed when full or every CLICK_BUFFER_FLUSH_INTERVAL s.
+CLICK_BUFFER_SIZE = int(os.getenv("CLICK_BUFFER_SIZE", 1))
+CLICK_BUFFER_FLUSH_INTERVAL = float(os.getenv("CLICK_BUFFER_FLUSH_INTERVAL", 1.0))
+
+COUNTRY_DIMENSION = "country"
+
+
+def hash_ip(ip: str) -> str:
+    # GDPR: Anonymize IP by hashing, keep first 16 chars for brevity but anonymity
+    return hashlib.sha256(ip.encode()).hexdigest()[:16]
+
+
+class ClickBuffer:
+    """
+    Collects clicks recorded on the redirect path and writes them in batches.
+
+    The raw client IP only lives in this buffer: it is resolved to a country
+    with the local GeoIP index at flush time, then hashed before anything is
+    stored.
+
+    Unique-scanner sketches are not updated by the flush itself: the hashed
+    IPs wait for `feed_sketches`, run after the redirect response is sent
+    and by the flush loop, so a scan never pays for the sketch read and
+    compare-and-swap.
+    """
+
+    def __init__(self, max_size: int = CLICK_BUFFER_SIZE):
+        self.max_size = max(1, max_size)
+        self._pending = []
+        self._scanners = []
+        self._lock = asyncio.Lock()
+
+    def __len__(self):
+        return len(self._pending)
+
+    async def record(self, qrcode_id, ip: str, user_agent: Optional[str], ip_hash: Optional[str] = None,
+                     owner_id=None, slug: Optional[str] = None, verify: bool = False):
+        """`verify`: the target came from a cache, check the code still exists before counting."""
+        self._pending.append((qrcode_id, ip, ip_hash, user_agent, datetime.utcnow(), owner_id, slug, verify))
+        if len(self._pending) >= self.max_size:
+            await self.flush()
+
+    async def flush(self) -> int:
+        """Write all pending clicks, return how many were written."""
+        async with self._lock:
+            batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+            batch = await self._drop_deleted(batch)
+            if not batch:
+                return 0
+
+            geo = await load_geoip()
+            docs = []
+            countries = Counter()
+            owners = Counter()
+            live = []
+            for qrcode_id, ip, ip_hash, user_agent, timestamp, owner_id, slug, _ in batch:
+                country = geo.lookup(ip) if geo else None
+                docs.append({
+                    "qrcode_id": qrcode_id,
+                    "timestamp": timestamp,
+                    "ip": ip_hash or hash_ip(ip),
+                    "user_agent": user_agent,
+                    "country": country,
+                })
+                if geo:
+                    countries[(qrcode_id, country or "unknown")] += 1
+                if owner_id:
+                    owners[owner_id] += 1
+                live.append((qrcode_id, slug, timestamp, country))
+
+            await models.Click.get_motor_collection().insert_many(docs, ordered=False)
+            if LIVE_SOURCE == "bus":
+                click_bus.post(live)
+
+            if countries:
+                now = datetime.utcnow()
+                await models.ClickRollup.get_motor_collection().bulk_write([
+                    UpdateOne(
+                        {"qrcode_id": qrcode_id, "dimension": COUNTRY_DIMENSION, "value": country},
+                        {"$inc": {"clicks": n}, "$set": {"updated_at": now}},
+                        upsert=True
+                    )
+                    for (qrcode_id, country), n in countries.items()
+                ], ordered=False)
+
+            if owners:
+                await models.User.get_motor_collection().bulk_write([
+                    UpdateOne({"_id": owner_id}, {"$inc": {"click_count": n}})
+                    for owner_id, n in owners.items()
+                ], ordered=False)
+
+            self._scanners.extend((doc["qrcode_id"], doc["timestamp"], doc["ip"]) for doc in docs)
+
+            return len(docs)
+
+    async def feed_sketches(self) -> int:
+        """Fold the scanners of the flushed clicks into the daily sketches; return sketches written."""
+        scanners, self._scanners = self._scanners, []
+        if not scanners:
+            return 0
+        try:
+            return await add_scanners(scanners)
+        except Exception as e:
+            logger.warning(f"Unique scanner sketches not updated: {e}")
+            return 0
+
+    @staticmethod
+    async def _drop_deleted(batch: list) -> list:
+        """Drop the clicks of codes deleted since a cached redirect served them (one read per flush)."""
+        to_check = {click[0] for click in batch if click[-1]}
+        if not to_check:
+            return batch
+        cursor = models.QRCode.get_motor_collection().find({"_id": {"$in": list(to_check)}}, {"_id": 1})
+        deleted = to_check - {doc["_id"] async for doc in cursor}
+        return [click for click in batch if click[0] not in deleted] if deleted else batch
+
+
+click_buffer = ClickBuffer()
+
+
+async def run_flush_loop(interval: float = CLICK_BUFFER_FLUSH_INTERVAL):
+    """Flush the click buffer every `interval` seconds until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await click_buffer.flush()
+            await click_buffer.feed_sketches()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Click buffer flush failed: {e}")
@@ -3,6 +3,8 @@ from dotenv import load_dotenv
 from motor.motor_asyncio import AsyncIOMotorClient
 from beanie import init_beanie
 
+from .metrics import mongo_event_listeners
+
 load_dotenv()
 
 _client = None
@@ -37,15 +39,16 @@ async def init_db():
         socketTimeoutMS=10000,           # 10s timeout for operations
         maxPoolSize=10,                  # Limit connections for serverless
         minPoolSize=0,                   # Allow pool to shrink
+        event_listeners=mongo_event_listeners(),
     )
     _db = _client[DB_NAME]
 
     # Import models here to avoid circular imports
-    from .models import User, QRCode, Click, ProcessedFile
+    from .models import User, QRCode, Click, ClickRollup, RateLimitCounter, QRImage, UniqueSketch, TrendingSlot, ProcessedFile
 
     await init_beanie(
         database=_db,
-        document_models=[User, QRCode, Click, ProcessedFile]
+        document_models=[User, QRCode, Click, ClickRollup, RateLimitCounter, QRImage, UniqueSketch, TrendingSlot, ProcessedFile]
     )
     _initialized = True
 
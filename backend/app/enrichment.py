@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import os
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Optional
+
+from pymongo import UpdateOne
+
+from . import models
+from .useragent import parse_user_agent
+
+logger = logging.getLogger(__name__)
+
+ENRICH_BATCH_SIZE = int(os.getenv("CLICK_ENRICH_BATCH_SIZE", 1000))
+# Seconds after which clicks claimed by a run that never finished can be claimed again
+ENRICH_CLAIM_TTL = float(os.getenv("CLICK_ENRICH_CLAIM_TTL", 600))
+ROLLUP_DIMENSIONS = ("device", "os", "browser")
+
+
+def _claimable(now: datetime) -> dict:
+    return {
+        "enriched_at": None,
+        "$or": [
+            {"enrich_claimed_at": None},
+            {"enrich_claimed_at": {"$lt": now - timedelta(seconds=ENRICH_CLAIM_TTL)}},
+        ],
+    }
+
+
+async def _claim_batch(clicks, batch_size: int) -> list:
+    """
+    Claim up to `batch_size` unenriched clicks for this run and return them.
+
+    The claim is a conditional update_many, atomic per click: concurrent runs
+    (cron and background loop, or several instances) never get the same
+    click, so no click is counted twice in the rollups.
+    """
+    now = datetime.utcnow()
+    candidates = await clicks.find(_claimable(now), {"_id": 1}).limit(batch_size).to_list(length=batch_size)
+    if not candidates:
+        return []
+    token = uuid.uuid4().hex
+    await clicks.update_many(
+        {"_id": {"$in": [doc["_id"] for doc in candidates]}, **_claimable(now)},
+        {"$set": {"enrich_claim": token, "enrich_claimed_at": now}}
+    )
+    return await clicks.find({"enrich_claim": token}, {"qrcode_id": 1, "user_agent": 1}).to_list(length=batch_size)
+
+
+async def enrich_clicks(batch_size: int = ENRICH_BATCH_SIZE, max_batches: Optional[int] = None) -> dict:
+    """
+    Parse the user agent of clicks that have not been enriched yet, store the
+    normalized device/os/browser fields on each click and increment the
+    per-QR rollups served by the analytics endpoints.
+
+    Runs off the redirect path (cron endpoint or background loop).
+    """
+    clicks = models.Click.get_motor_collection()
+    rollups = models.ClickRollup.get_motor_collection()
+    summary = {"enriched": 0, "batches": 0}
+
+    while max_batches is None or summary["batches"] < max_batches:
+        docs = await _claim_batch(clicks, batch_size)
+        if not docs:
+            # nothing left, or all candidates were claimed by a concurrent run
+            break
+
+        now = datetime.utcnow()
+        click_updates = []
+        counts = Counter()
+        for doc in docs:
+            info = parse_user_agent(doc.get("user_agent"))
+            click_updates.append(UpdateOne(
+                {"_id": doc["_id"]},
+                {
+                    "$set": {
+                        "device": info.device,
+                        "os": info.os,
+                        "browser": info.browser,
+                        "enriched_at": now,
+                    },
+                    "$unset": {"enrich_claim": "", "enrich_claimed_at": ""},
+                }
+            ))
+            for dimension in ROLLUP_DIMENSIONS:
+                counts[(doc["qrcode_id"], dimension, getattr(info, dimension))] += 1
+
+        await clicks.bulk_write(click_updates, ordered=False)
+        await rollups.bulk_write([
+            UpdateOne(
+                {"qrcode_id": qrcode_id, "dimension": dimension, "value": value},
+                {"$inc": {"clicks": n}, "$set": {"updated_at": now}},
+                upsert=True
+            )
+            for (qrcode_id, dimension, value), n in counts.items()
+        ], ordered=False)
+
+        summary["enriched"] += len(docs)
+        summary["batches"] += 1
+
+    return summary
+
+
+async def run_enrichment_loop(interval: float):
+    """Enrich new clicks every `interval` seconds until cancelled."""
+    while True:
+        try:
+            result = await enrich_clicks()
+            if result["enriched"]:
+                logger.info(f"Enriched {result['enriched']} clicks")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Click enrichment failed: {e}")
+        await asyncio.sleep(interval)
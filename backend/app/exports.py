@@ -0,0 +1,200 @@
+import asyncio
+import csv
+import io
+import json
+import os
+import tempfile
+import zipfile
+from datetime import datetime, timezone
+from typing import Optional
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+from . import models
+from .rendering import qr_payload, render_many
+
+# Documents fetched per getMore round trip; rows are written out as each batch arrives
+CLICK_EXPORT_BATCH_SIZE = int(os.getenv("CLICK_EXPORT_BATCH_SIZE", 2000))
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+# Upper bound on QR codes in one image export
+IMAGE_EXPORT_MAX_CODES = int(os.getenv("IMAGE_EXPORT_MAX_CODES", 5000))
+# The PDF sheet is held in memory until its last page (about 20 KB per 300 px
+# code, 80 KB at 1000 px): far fewer codes, and label images of at most 600 px
+PDF_EXPORT_MAX_CODES = int(os.getenv("PDF_EXPORT_MAX_CODES", 500))
+PDF_EXPORT_MAX_SIZE = 600
+
+IMAGE_EXPORT_FORMATS = {
+    "zip": "application/zip",
+    "pdf": "application/pdf",
+}
+CLICK_EXPORT_FIELDS = ("id", "qrcode_id", "timestamp", "ip", "user_agent", "country", "device", "os", "browser")
+
+
+def _as_naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def click_export_filter(qrcode_id=None, start: Optional[datetime] = None, end: Optional[datetime] = None) -> dict:
+    query = {}
+    if qrcode_id is not None:
+        query["qrcode_id"] = qrcode_id
+    time_range = {}
+    if start:
+        time_range["$gte"] = _as_naive_utc(start)
+    if end:
+        time_range["$lt"] = _as_naive_utc(end)
+    if time_range:
+        query["timestamp"] = time_range
+    return query
+
+
+def _row(doc: dict) -> dict:
+    timestamp = doc.get("timestamp")
+    return {
+        "id": str(doc["_id"]),
+        "qrcode_id": str(doc["qrcode_id"]),
+        "timestamp": timestamp.isoformat() if timestamp else None,
+        "ip": doc.get("ip"),
+        "user_agent": doc.get("user_agent"),
+        "country": doc.get("country"),
+        "device": doc.get("device"),
+        "os": doc.get("os"),
+        "browser": doc.get("browser"),
+    }
+
+
+async def stream_clicks(query: dict, fmt: str = "csv", batch_size: int = CLICK_EXPORT_BATCH_SIZE):
+    """
+    Yield clicks matching `query` as CSV or NDJSON chunks, oldest first.
+
+    Reads through a server-side cursor and emits one chunk per cursor batch,
+    so memory use does not depend on how many clicks are exported.
+    """
+    projection = {name: 1 for name in CLICK_EXPORT_FIELDS if name != "id"}
+    cursor = models.Click.get_motor_collection().find(
+        query, projection, batch_size=batch_size
+    ).sort("timestamp", 1)
+
+    buf = io.StringIO()
+    writer = None
+    if fmt == "csv":
+        writer = csv.DictWriter(buf, fieldnames=CLICK_EXPORT_FIELDS)
+        writer.writeheader()
+
+    pending = 0
+    try:
+        async for doc in cursor:
+            row = _row(doc)
+            if writer:
+                writer.writerow(row)
+            else:
+                buf.write(json.dumps(row, ensure_ascii=False))
+                buf.write("\n")
+            pending += 1
+            if pending >= batch_size:
+                yield buf.getvalue().encode()
+                buf.seek(0)
+                buf.truncate()
+                pending = 0
+        if buf.tell():
+            yield buf.getvalue().encode()
+    finally:
+        await cursor.close()
+
+
+class _ChunkSink:
+    """Write-only, non-seekable file object collecting what zipfile writes until taken."""
+
+    def __init__(self):
+        self._parts = []
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self) -> bytes:
+        data, self._parts = b"".join(self._parts), []
+        return data
+
+
+async def _qr_payloads(query: dict, base_url: str):
+    cursor = models.QRCode.get_motor_collection().find(
+        query, {"slug": 1, "title": 1, "content": 1, "is_dynamic": 1, "options": 1, "base_url": 1}
+    ).sort("created_at", -1).limit(IMAGE_EXPORT_MAX_CODES)
+    try:
+        async for doc in cursor:
+            payload = qr_payload(doc.get("is_dynamic", False), doc["slug"], doc["content"],
+                                 doc.get("base_url") or base_url)
+            yield (doc["slug"], doc.get("title") or ""), payload, doc.get("options") or {}
+    finally:
+        await cursor.close()
+
+
+async def stream_qr_zip(query: dict, base_url: str, image_format: str = "png", size: int = 300):
+    """
+    Yield a ZIP archive of `<slug>.<png|svg>` images for the QR codes matching `query`.
+
+    The archive is written without seeking (sizes go in data descriptors),
+    and each member is yielded as soon as its image comes back from the
+    render pool.
+    """
+    sink = _ChunkSink()
+    # PNG is already deflated, recompressing it only costs CPU
+    compression = zipfile.ZIP_STORED if image_format == "png" else zipfile.ZIP_DEFLATED
+    with zipfile.ZipFile(sink, "w", compression=compression) as archive:
+        async for (slug, _title), image in render_many(_qr_payloads(query, base_url), image_format, size):
+            archive.writestr(f"{slug}.{image_format}", image)
+            yield sink.take()
+    yield sink.take()
+
+
+async def stream_qr_pdf(query: dict, base_url: str, size: int = 300, columns: int = 4, rows: int = 5):
+    """
+    Yield an A4 label sheet PDF with `columns` x `rows` QR codes per page,
+    captioned with their title (or slug).
+
+    Images are rendered in the pool while pages are laid out, but reportlab
+    keeps the whole document until `save()`: memory grows with the number of
+    codes and nothing is sent before the last page is built, hence
+    PDF_EXPORT_MAX_CODES. The saved document is spooled to a temporary file
+    (on disk past 8 MB) and read back in chunks.
+    """
+    size = min(size, PDF_EXPORT_MAX_SIZE)
+    page_width, page_height = A4
+    margin, caption = 36, 12
+    cell_width = (page_width - 2 * margin) / columns
+    cell_height = (page_height - 2 * margin) / rows
+    side = min(cell_width, cell_height - caption) - 8
+    per_page = columns * rows
+
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as spool:
+        sheet = canvas.Canvas(spool, pagesize=A4)
+        sheet.setTitle("QR codes")
+        index = 0
+        async for (slug, title), image in render_many(_qr_payloads(query, base_url), "png", size):
+            if index and index % per_page == 0:
+                sheet.showPage()
+            row, column = divmod(index % per_page, columns)
+            center_x = margin + (column + 0.5) * cell_width
+            top = page_height - margin - row * cell_height
+            y = top - 4 - side
+            sheet.drawImage(ImageReader(io.BytesIO(image)), center_x - side / 2, y, side, side)
+            sheet.setFont("Helvetica", 7)
+            sheet.drawCentredString(center_x, y - caption + 3, (title or slug)[:48])
+            index += 1
+
+        await asyncio.to_thread(sheet.save)
+        spool.seek(0)
+        while chunk := spool.read(64 * 1024):
+            yield chunk
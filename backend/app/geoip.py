@@ -0,0 +1,130 @@
+import asyncio
+import csv
+import ipaddress
+import logging
+import os
+import socket
+import threading
+from array import array
+from bisect import bisect_right
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+GEOIP_DB_PATH = os.getenv("GEOIP_DB_PATH")
+
+
+def _parse_ip(value: str) -> int:
+    value = value.strip()
+    if value.isdigit():
+        return int(value)
+    return int(ipaddress.ip_address(value))
+
+
+class GeoIPIndex:
+    """
+    In-memory IP range -> country index.
+
+    Ranges are kept as parallel sorted arrays (start, end, country) and a lookup
+    is a single bisect, so resolving an address takes a few microseconds and
+    never touches the network. IPv4 ranges live in compact unsigned arrays,
+    IPv6 ranges (128-bit) in plain lists.
+    """
+
+    def __init__(self, ranges):
+        v4, v6 = [], []
+        for start, end, country in ranges:
+            (v4 if end <= 0xFFFFFFFF else v6).append((start, end, country))
+        v4.sort()
+        v6.sort()
+
+        self._v4_starts = array("L", (r[0] for r in v4))
+        self._v4_ends = array("L", (r[1] for r in v4))
+        self._v4_countries = [r[2] for r in v4]
+        self._v6_starts = [r[0] for r in v6]
+        self._v6_ends = [r[1] for r in v6]
+        self._v6_countries = [r[2] for r in v6]
+
+    def __len__(self):
+        return len(self._v4_countries) + len(self._v6_countries)
+
+    @classmethod
+    def from_csv(cls, path: str) -> "GeoIPIndex":
+        """
+        Load a range database in CSV form: `start,end,country` per line, with
+        addresses either as dotted/colon notation (DB-IP lite) or as integers
+        (IP2Location LITE). Extra columns and a header row are ignored.
+        """
+        ranges = []
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.reader(f):
+                if len(row) < 3:
+                    continue
+                try:
+                    start, end = _parse_ip(row[0]), _parse_ip(row[1])
+                except ValueError:
+                    continue  # header or malformed line
+                if ":" in row[0] and end <= 0xFFFFFFFF:
+                    continue  # reserved low IPv6 space, would collide with IPv4 ranges
+                country = row[2].strip().upper()
+                if country and country != "-" and country != "ZZ":
+                    ranges.append((start, end, country))
+        return cls(ranges)
+
+    def lookup(self, ip: str) -> Optional[str]:
+        """Return the ISO country code for `ip`, or None if unknown/invalid."""
+        try:
+            # Fast path for the common IPv4 case, avoids building an ipaddress object
+            value = int.from_bytes(socket.inet_aton(ip), "big") if ip.count(".") == 3 else None
+        except OSError:
+            value = None
+        if value is not None:
+            starts, ends, countries = self._v4_starts, self._v4_ends, self._v4_countries
+        else:
+            try:
+                addr = ipaddress.ip_address(ip)
+            except ValueError:
+                return None
+            if addr.version == 6 and addr.ipv4_mapped:
+                addr = addr.ipv4_mapped
+            value = int(addr)
+            if addr.version == 4:
+                starts, ends, countries = self._v4_starts, self._v4_ends, self._v4_countries
+            else:
+                starts, ends, countries = self._v6_starts, self._v6_ends, self._v6_countries
+
+        i = bisect_right(starts, value) - 1
+        if i >= 0 and value <= ends[i]:
+            return countries[i]
+        return None
+
+
+_index: Optional[GeoIPIndex] = None
+_loaded = False
+_load_lock = threading.Lock()
+
+
+def get_geoip() -> Optional[GeoIPIndex]:
+    """
+    Return the process-wide GeoIP index, loading GEOIP_DB_PATH on first use
+    (None if not configured). Parsing a full database takes seconds: from
+    async code, use `load_geoip`.
+    """
+    global _index, _loaded
+    with _load_lock:
+        if not _loaded:
+            if GEOIP_DB_PATH:
+                try:
+                    _index = GeoIPIndex.from_csv(GEOIP_DB_PATH)
+                    logger.info(f"Loaded {len(_index)} GeoIP ranges from {GEOIP_DB_PATH}")
+                except OSError as e:
+                    logger.error(f"Could not load GeoIP database {GEOIP_DB_PATH}: {e}")
+            _loaded = True
+    return _index
+
+
+async def load_geoip() -> Optional[GeoIPIndex]:
+    """get_geoip without blocking the event loop: the first call parses the database in a thread."""
+    if _loaded:
+        return _index
+    return await asyncio.to_thread(get_geoip)
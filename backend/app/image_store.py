@@ -0,0 +1,182 @@
+"""
+Pre-rendered QR image variants.
+
+A variant is stored under a key hashing everything the image depends on
+(encoded payload, rendering options, format, size), so a stored image can
+never be stale: when `content` or `options` change the key changes, the
+new variants are rendered and the old ones deleted. A dynamic code encodes
+its redirect URL, so editing its target does not re-render anything; the
+URL's origin is the one stored with the code (QRCode.base_url), not the host
+of each request, so every host is served the same variants.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import shutil
+from typing import Optional, Union
+
+from . import models
+from .rendering import qr_payload, render
+
+logger = logging.getLogger(__name__)
+
+# "mongo" (qr_images collection, shared by all instances), "local" (files
+# under IMAGE_STORE_PATH, served with FileResponse) or "off"
+IMAGE_STORE = os.getenv("IMAGE_STORE", "mongo")
+IMAGE_STORE_PATH = os.getenv("IMAGE_STORE_PATH", "/tmp/qrgen-images")
+# Variants rendered at creation, as format:size (size is ignored for svg)
+IMAGE_VARIANTS = os.getenv("IMAGE_VARIANTS", "png:300,svg")
+
+# Bump when the renderer output changes, so stored images get re-rendered
+RENDER_VERSION = 1
+
+
+def parse_variants(spec: str) -> tuple:
+    variants = []
+    for item in spec.split(","):
+        item = item.strip().lower()
+        if not item:
+            continue
+        fmt, _, size = item.partition(":")
+        variants.append(normalize_variant(fmt, int(size or 300)))
+    return tuple(dict.fromkeys(variants))
+
+
+def normalize_variant(fmt: str, size: int) -> tuple:
+    return ("svg", 0) if fmt == "svg" else ("png", size)
+
+
+def variant_key(payload: str, options: Optional[dict], fmt: str, size: int) -> str:
+    spec = json.dumps([RENDER_VERSION, payload, options or {}, fmt, size], sort_keys=True, default=str)
+    return hashlib.sha256(spec.encode()).hexdigest()[:32]
+
+
+class MongoImageStore:
+    """
+    Images as small binary documents: serving one is a single find by _id.
+    Not GridFS, so an image must fit in a 16 MB document; a 2000 px PNG with
+    a photo logo stays around 1 MB.
+    """
+
+    async def get(self, qrcode_id, key: str, fmt: str) -> Optional[bytes]:
+        doc = await models.QRImage.get_motor_collection().find_one({"_id": key}, {"data": 1})
+        return bytes(doc["data"]) if doc else None
+
+    async def put(self, qrcode_id, key: str, fmt: str, size: int, data: bytes):
+        await models.QRImage.get_motor_collection().replace_one(
+            {"_id": key},
+            {"qrcode_id": qrcode_id, "format": fmt, "size": size, "data": data},
+            upsert=True
+        )
+
+    async def delete(self, qrcode_id, keep=()):
+        query = {"qrcode_id": qrcode_id}
+        if keep:
+            query["_id"] = {"$nin": list(keep)}
+        await models.QRImage.get_motor_collection().delete_many(query)
+
+    async def clear(self):
+        await models.QRImage.get_motor_collection().delete_many({})
+
+
+class LocalImageStore:
+    """Images as files under `root/<qrcode_id>/`, returned as paths for FileResponse."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, qrcode_id, key: str, fmt: str) -> str:
+        return os.path.join(self.root, str(qrcode_id), f"{key}.{fmt}")
+
+    async def get(self, qrcode_id, key: str, fmt: str) -> Optional[str]:
+        path = self._path(qrcode_id, key, fmt)
+        return path if os.path.exists(path) else None
+
+    async def put(self, qrcode_id, key: str, fmt: str, size: int, data: bytes):
+        path = self._path(qrcode_id, key, fmt)
+
+        def write():
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # write then rename, so a concurrent reader never sees a partial file
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+
+        await asyncio.to_thread(write)
+
+    async def delete(self, qrcode_id, keep=()):
+        directory = os.path.join(self.root, str(qrcode_id))
+
+        def remove():
+            if not os.path.isdir(directory):
+                return
+            for name in os.listdir(directory):
+                if name.split(".", 1)[0] not in keep:
+                    os.remove(os.path.join(directory, name))
+
+        await asyncio.to_thread(remove)
+
+    async def clear(self):
+        await asyncio.to_thread(shutil.rmtree, self.root, True)
+
+
+def build_image_store():
+    if IMAGE_STORE == "off":
+        return None
+    if IMAGE_STORE == "local":
+        return LocalImageStore(IMAGE_STORE_PATH)
+    return MongoImageStore()
+
+
+image_store = build_image_store()
+image_variants = parse_variants(IMAGE_VARIANTS)
+
+
+async def get_stored_image(qrcode_id, payload: str, options: Optional[dict], fmt: str, size: int) -> Union[bytes, str, None]:
+    """
+    Return a configured variant from the store (bytes, or a file path for the
+    local store), rendering and storing it on a miss. None for variants that
+    are not configured.
+    """
+    fmt, size = normalize_variant(fmt, size)
+    if image_store is None or (fmt, size) not in image_variants:
+        return None
+    key = variant_key(payload, options, fmt, size)
+    stored = await image_store.get(qrcode_id, key, fmt)
+    if stored is not None:
+        return stored
+
+    data = await asyncio.to_thread(render, payload, fmt, size, options)
+    await image_store.put(qrcode_id, key, fmt, size, data)
+    return data
+
+
+async def prerender_images(q: "models.QRCode", base_url: str):
+    """Render and store every configured variant of `q`, dropping variants of older content/options."""
+    if image_store is None or not image_variants:
+        return
+    payload = qr_payload(q.is_dynamic, q.slug, q.content, base_url)
+    keys = []
+    try:
+        for fmt, size in image_variants:
+            key = variant_key(payload, q.options, fmt, size)
+            data = await asyncio.to_thread(render, payload, fmt, size, q.options)
+            await image_store.put(q.id, key, fmt, size, data)
+            keys.append(key)
+        await image_store.delete(q.id, keep=keys)
+    except Exception as e:
+        # The image endpoint renders on a miss; never fail the write for this
+        logger.warning(f"Pre-rendering images for {q.slug} failed: {e}")
+
+
+async def delete_images(qrcode_id=None):
+    """Drop the stored variants of one code, or of all codes."""
+    if image_store is None:
+        return
+    if qrcode_id is None:
+        await image_store.clear()
+    else:
+        await image_store.delete(qrcode_id)
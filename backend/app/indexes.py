@@ -0,0 +1,132 @@
+"""
+Query plan diagnostics for the endpoint query shapes.
+
+The index set itself is declared on the models (Settings.indexes) and
+created by init_beanie at init_db. This module replays each hot query with
+explain() and reports which index it uses, flagging collection scans.
+
+    python -m backend.app.indexes
+"""
+import asyncio
+import re
+import sys
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from . import models
+
+
+def _plan_stages(plan: dict) -> list:
+    """Flatten a winningPlan tree into the list of its stage names (root first)."""
+    stages = []
+    while plan:
+        stages.append(plan.get("stage"))
+        if "inputStage" in plan:
+            plan = plan["inputStage"]
+        elif plan.get("inputStages"):
+            for child in plan["inputStages"]:
+                stages.extend(_plan_stages(child))
+            break
+        else:
+            break
+    return stages
+
+
+def _index_names(plan: dict) -> list:
+    names = []
+    if plan.get("indexName"):
+        names.append(plan["indexName"])
+    for child in [plan.get("inputStage")] + list(plan.get("inputStages") or []):
+        if child:
+            names.extend(_index_names(child))
+    return names
+
+
+async def _query_shapes():
+    """Return (name, model, filter, sort, note) for every query an endpoint issues."""
+    sample_qr = await models.QRCode.get_motor_collection().find_one({}, {"slug": 1, "owner_id": 1})
+    qrcode_id = sample_qr["_id"] if sample_qr else ObjectId()
+    slug = sample_qr["slug"] if sample_qr else "sample"
+    owner_id = (sample_qr or {}).get("owner_id") or ObjectId()
+    since = datetime.utcnow() - timedelta(days=30)
+    pattern = re.compile(".*sample.*", re.IGNORECASE)
+
+    return [
+        ("redirect_slug", models.QRCode, {"slug": slug}, None, None),
+        ("list_qrcodes (created_desc)", models.QRCode, {}, [("created_at", -1)], None),
+        ("list_qrcodes (title_asc)", models.QRCode, {}, [("title", 1)], None),
+        ("list_qrcodes (dynamic)", models.QRCode, {"is_dynamic": True}, [("created_at", -1)], None),
+        ("list_qrcodes (dynamic, title)", models.QRCode, {"is_dynamic": True}, [("title", 1)], None),
+        ("list_qrcodes (search)", models.QRCode,
+         {"$or": [{"title": {"$regex": pattern}}, {"slug": {"$regex": pattern}}, {"content": {"$regex": pattern}}]},
+         [("created_at", -1)], "unanchored case-insensitive regex on content cannot use an index"),
+        ("admin_stats (dynamic count)", models.QRCode, {"is_dynamic": True}, None, None),
+        ("list_my_qrcodes", models.QRCode, {"owner_id": owner_id}, [("created_at", -1)], None),
+        ("list_my_qrcodes (dynamic)", models.QRCode, {"owner_id": owner_id, "is_dynamic": True}, [("created_at", -1)], None),
+        ("my_stats (dynamic count)", models.QRCode, {"owner_id": owner_id, "is_dynamic": True}, None, None),
+        ("list_qrcodes (click counts)", models.Click, {"qrcode_id": {"$in": [qrcode_id]}}, None, None),
+        ("qrcode_clicks", models.Click, {"qrcode_id": qrcode_id}, [("timestamp", -1)], None),
+        ("qrcode_analytics", models.Click, {"qrcode_id": {"$in": [qrcode_id]}, "timestamp": {"$gte": since}}, None, None),
+        ("export_qrcode_clicks", models.Click, {"qrcode_id": qrcode_id, "timestamp": {"$gte": since}}, [("timestamp", 1)], None),
+        ("export_all_clicks", models.Click, {"timestamp": {"$gte": since}}, [("timestamp", 1)], None),
+        ("enrich_clicks", models.Click, {"enriched_at": None}, None, None),
+        ("analytics rollups", models.ClickRollup, {"qrcode_id": qrcode_id, "dimension": "country"}, None, None),
+        ("analytics unique sketches", models.UniqueSketch, {"qrcode_id": qrcode_id, "day": {"$gte": since}}, None, None),
+    ]
+
+
+async def explain_queries() -> list:
+    """Run explain() on every endpoint query shape and summarize the winning plans."""
+    report = []
+    for name, model, query, sort, note in await _query_shapes():
+        cursor = model.get_motor_collection().find(query).limit(100)
+        if sort:
+            cursor = cursor.sort(sort)
+        report.append(summarize_plan(name, model.get_settings().name, await cursor.explain(), note))
+    return report
+
+
+def summarize_plan(name: str, collection: str, explain: dict, note=None) -> dict:
+    """One report row from the output of explain()."""
+    planner = explain.get("queryPlanner", {})
+    winning = planner.get("winningPlan", {})
+    winning = winning.get("queryPlan", winning)  # slot-based engine nests the classic plan
+    stages = _plan_stages(winning)
+    stats = explain.get("executionStats", {})
+    return {
+        "query": name,
+        "collection": collection,
+        "stages": stages,
+        "indexes": _index_names(winning),
+        "collscan": "COLLSCAN" in stages,
+        "docs_examined": stats.get("totalDocsExamined"),
+        "returned": stats.get("nReturned"),
+        "note": note,
+    }
+
+
+async def _main() -> int:
+    from .db import init_db, close_db
+
+    await init_db()
+    try:
+        report = await explain_queries()
+    finally:
+        await close_db()
+
+    unexpected = 0
+    for row in report:
+        flag = "COLLSCAN" if row["collscan"] else "ok"
+        print(f"{flag:9} {row['collection']:13} {row['query']:32} {' > '.join(s for s in row['stages'] if s)}"
+              f"  [{', '.join(row['indexes']) or '-'}]")
+        if row["collscan"]:
+            if row["note"]:
+                print(f"          ({row['note']})")
+            else:
+                unexpected += 1
+    return 1 if unexpected else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main()))
@@ -0,0 +1,144 @@
+"""
+Cache invalidation bus shared by every worker and instance.
+
+Writers call `invalidation_bus.publish(scope, keys)` after changing data that
+a per-process cache may hold (scope "redirect": slugs, see redirect_cache.py).
+The writing process evicts at once; with CACHE_INVALIDATION=mongo the message
+is also appended to a small capped collection that every process tails with
+an awaitable tailable cursor, so the others evict within milliseconds
+instead of serving a stale entry until its TTL.
+
+A listener that loses its cursor clears its caches before tailing again,
+since it may have missed messages in between.
+"""
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid
+
+from . import db
+
+logger = logging.getLogger(__name__)
+
+# "mongo" to propagate evictions to the other workers / instances, "off" for this process only
+CACHE_INVALIDATION = os.getenv("CACHE_INVALIDATION", "off").lower()
+CACHE_INVALIDATION_COLLECTION = "cache_invalidations"
+CACHE_INVALIDATION_CAPPED_BYTES = int(os.getenv("CACHE_INVALIDATION_CAPPED_BYTES", 1024 * 1024))
+
+# Tells this process's own messages apart when they come back through the collection
+INSTANCE_ID = uuid.uuid4().hex
+
+
+class InvalidationBus:
+    def __init__(self):
+        self._handlers: Dict[str, List[Callable]] = {}
+
+    def register(self, scope: str, handler: Callable):
+        """`handler(keys)` evicts the given keys, or everything when keys is None."""
+        self._handlers.setdefault(scope, []).append(handler)
+
+    def apply(self, scope: str, keys: Optional[list]):
+        for handler in self._handlers.get(scope, ()):
+            handler(keys)
+
+    def clear_all(self):
+        for scope in self._handlers:
+            self.apply(scope, None)
+
+    async def publish(self, scope: str, keys: Optional[list] = None):
+        """Evict `keys` of `scope` here, then everywhere else (keys=None evicts the whole scope)."""
+        self.apply(scope, keys)
+        if CACHE_INVALIDATION != "mongo":
+            return
+        try:
+            await db.get_db()[CACHE_INVALIDATION_COLLECTION].insert_one({
+                "scope": scope,
+                "keys": keys,
+                "origin": INSTANCE_ID,
+                "at": datetime.utcnow(),
+            })
+        except Exception as e:
+            # the write already happened; other instances fall back to their TTL
+            logger.warning(f"Cache invalidation publish failed for {scope}: {e}")
+
+
+invalidation_bus = InvalidationBus()
+
+
+async def ensure_invalidation_collection():
+    database = db.get_db()
+    try:
+        await database.create_collection(
+            CACHE_INVALIDATION_COLLECTION, capped=True, size=CACHE_INVALIDATION_CAPPED_BYTES
+        )
+    except CollectionInvalid:
+        pass  # already exists
+    collection = database[CACHE_INVALIDATION_COLLECTION]
+    # a tailable cursor on an empty capped collection is dead at once
+    if await collection.find_one({}, {"_id": 1}) is None:
+        await collection.insert_one({"scope": None, "keys": [], "origin": None, "at": datetime.utcnow()})
+    return collection
+
+
+class TailPosition:
+    """
+    Where a listener's tailable cursor starts: right after `last_id`, the
+    last document in natural (insertion) order when tailing began.
+
+    The cursor reads the whole capped collection (1 MB at most) and messages
+    are skipped until that document has gone by, by identity rather than an
+    `_id` comparison: ObjectIds are made by each publisher, so one whose clock
+    lags would sort below any bound. Then only the other processes' messages
+    are kept.
+    """
+
+    def __init__(self, last_id):
+        self.last_id = last_id
+        self.started = last_id is None
+
+    def accept(self, message: dict) -> bool:
+        if not self.started:
+            self.started = message["_id"] == self.last_id
+            return False
+        return bool(message.get("scope")) and message.get("origin") != INSTANCE_ID
+
+    def caught_up(self, bus: "InvalidationBus"):
+        """The cursor has no more messages for now."""
+        if not self.started:
+            # the start document rolled out of the capped collection before the
+            # cursor reached it: what was published meanwhile cannot be told apart
+            self.started = True
+            bus.clear_all()
+
+
+async def tail_start(collection) -> TailPosition:
+    last = await collection.find_one({}, {"_id": 1}, sort=[("$natural", -1)])
+    return TailPosition(last["_id"] if last else None)
+
+
+async def run_invalidation_listener(bus: InvalidationBus = invalidation_bus, retry_delay: float = 1.0):
+    """Tail the invalidation collection and apply the messages published by other processes."""
+    while True:
+        try:
+            collection = await ensure_invalidation_collection()
+            position = await tail_start(collection)
+            cursor = collection.find({}, cursor_type=CursorType.TAILABLE_AWAIT)
+            while cursor.alive:
+                async for message in cursor:
+                    if position.accept(message):
+                        bus.apply(message["scope"], message.get("keys"))
+                position.caught_up(bus)
+                # no message within the server-side await; poll again
+                await asyncio.sleep(0.01)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Cache invalidation listener failed, retrying in {retry_delay:.0f} s: {e}")
+            await asyncio.sleep(retry_delay)
+        # messages may have been missed while the cursor was down
+        bus.clear_all()
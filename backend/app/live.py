@@ -0,0 +1,185 @@
+"""
+Live scan feed for the admin dashboard (GET /api/admin/live, Server-Sent Events).
+
+Clicks reach the in-process ClickBus from one of two sources (LIVE_SOURCE):
+
+- bus: the click buffer posts each batch right after inserting it; only
+  scans served by this instance are seen.
+- changestream: one MongoDB change stream on `clicks` per instance (needs a
+  replica set, a single-node one is enough), so scans recorded by any
+  instance are seen.
+
+Fan-out is in memory: each connected dashboard owns a bounded queue and the
+database is read once per batch whatever the number of subscribers (only to
+seed the running total of a code the bus has not seen yet). A subscriber that
+falls behind loses its oldest events instead of slowing the publisher.
+
+The click buffer flushes on the redirect path, so it only posts its batch
+(`ClickBus.post`); a background task seeds totals, resolves slugs and fans
+out, in order.
+"""
+import asyncio
+import logging
+import os
+from collections import deque
+from typing import Dict, Iterable, Optional, Set
+
+from . import models
+from .responses import dumps
+
+logger = logging.getLogger(__name__)
+
+# Where live click events come from: "bus" (this instance) or "changestream" (all instances)
+LIVE_SOURCE = os.getenv("LIVE_SOURCE", "bus").lower()
+# Events buffered per connected dashboard before the oldest are dropped
+LIVE_QUEUE_SIZE = int(os.getenv("LIVE_QUEUE_SIZE", 256))
+# Seconds between SSE keep-alive comments on an idle feed
+LIVE_HEARTBEAT = float(os.getenv("LIVE_HEARTBEAT", 15))
+
+
+class ClickBus:
+    def __init__(self, queue_size: int = LIVE_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: Set[asyncio.Queue] = set()
+        # running click totals and slugs of the codes seen while someone is listening
+        self._totals: Dict = {}
+        self._slugs: Dict = {}
+        # batches posted from the redirect path, published by _pump
+        self._posted = deque()
+        self._pump: Optional[asyncio.Task] = None
+
+    def __len__(self):
+        return len(self._subscribers)
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+        if not self._subscribers:
+            # nobody sees the totals go stale; reseed from the database next time
+            self._totals.clear()
+            self._slugs.clear()
+
+    def post(self, clicks: Iterable[tuple]):
+        """Queue stored clicks for `publish` in a background task: never waits on the database."""
+        if not self._subscribers:
+            return
+        self._posted.append(list(clicks))
+        if self._pump is None or self._pump.done():
+            self._pump = asyncio.get_running_loop().create_task(self._drain())
+
+    async def _drain(self):
+        while self._posted:
+            try:
+                await self.publish(self._posted.popleft())
+            except Exception as e:
+                logger.warning(f"Live click feed publish failed: {e}")
+
+    async def publish(self, clicks: Iterable[tuple]):
+        """Fan out already stored clicks given as (qrcode_id, slug, timestamp, country)."""
+        if not self._subscribers:
+            return
+        clicks = list(clicks)
+        for qrcode_id, slug, _, _ in clicks:
+            if slug:
+                self._slugs[qrcode_id] = slug
+        await self._seed(clicks)
+        await self._resolve_slugs(list({click[0] for click in clicks if click[0] not in self._slugs}))
+
+        for qrcode_id, _, timestamp, country in clicks:
+            # .get: the last subscriber may have left (clearing the totals) while seeding
+            total = self._totals[qrcode_id] = self._totals.get(qrcode_id, 0) + 1
+            event = {
+                "qrcode_id": str(qrcode_id),
+                "slug": self._slugs.get(qrcode_id),
+                "timestamp": timestamp,
+                "country": country,
+                "total": total,
+            }
+            for queue in self._subscribers:
+                self._offer(queue, event)
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, event: dict):
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(event)
+
+    async def _seed(self, clicks: list):
+        """
+        Start the total of each code not seen yet at its clicks stored before
+        this batch. Bounded by timestamp rather than by subtracting the batch:
+        later batches may already be stored when a posted batch is published.
+        """
+        firsts = {}
+        for qrcode_id, _, timestamp, _ in clicks:
+            if qrcode_id not in self._totals and (qrcode_id not in firsts or timestamp < firsts[qrcode_id]):
+                firsts[qrcode_id] = timestamp
+        if not firsts:
+            return
+        rows = await models.Click.aggregate([
+            {"$match": {"$or": [
+                # Mongo keeps milliseconds: truncate so the first click itself is not counted
+                {"qrcode_id": qrcode_id, "timestamp": {"$lt": first.replace(microsecond=first.microsecond // 1000 * 1000)}}
+                for qrcode_id, first in firsts.items()
+            ]}},
+            {"$group": {"_id": "$qrcode_id", "count": {"$sum": 1}}}
+        ]).to_list()
+        counts = {row["_id"]: row["count"] for row in rows}
+        for qrcode_id in firsts:
+            # publish() adds the batch back click by click
+            self._totals[qrcode_id] = counts.get(qrcode_id, 0)
+
+    async def _resolve_slugs(self, qrcode_ids: list):
+        if not qrcode_ids:
+            return
+        cursor = models.QRCode.get_motor_collection().find({"_id": {"$in": qrcode_ids}}, {"slug": 1})
+        async for doc in cursor:
+            self._slugs[doc["_id"]] = doc["slug"]
+
+
+click_bus = ClickBus()
+
+
+def format_event(event: dict, name: str = "click") -> str:
+    return f"event: {name}\ndata: {dumps(event).decode()}\n\n"
+
+
+async def live_events(request, bus: ClickBus = click_bus, heartbeat: float = LIVE_HEARTBEAT):
+    """SSE stream of one dashboard's subscription, with keep-alive comments while idle."""
+    queue = bus.subscribe()
+    try:
+        yield "retry: 3000\n" + format_event({"source": LIVE_SOURCE}, "ready")
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": keep-alive\n\n"
+                continue
+            yield format_event(event)
+    finally:
+        bus.unsubscribe(queue)
+
+
+async def run_change_stream(bus: ClickBus = click_bus, retry_delay: float = 5.0):
+    """Publish clicks inserted by any instance, read from a change stream on `clicks`."""
+    pipeline = [
+        {"$match": {"operationType": "insert"}},
+        {"$project": {"fullDocument.qrcode_id": 1, "fullDocument.timestamp": 1, "fullDocument.country": 1}}
+    ]
+    while True:
+        try:
+            async with models.Click.get_motor_collection().watch(pipeline) as stream:
+                async for change in stream:
+                    doc = change["fullDocument"]
+                    await bus.publish([(doc["qrcode_id"], None, doc["timestamp"], doc.get("country"))])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Click change stream failed, retrying in {retry_delay:.0f} s: {e}")
+            await asyncio.sleep(retry_delay)
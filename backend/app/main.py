@@ -1,6 +1,5 @@
-from fastapi import FastAPI, Request, BackgroundTasks
-from fastapi.templating import Jinja2Templates
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, HTTPException, Request, BackgroundTasks
+from fastapi.responses import PlainTextResponse
 from contextlib import asynccontextmanager
 from starlette.responses import RedirectResponse
 from .routes_auth import router as auth_router
@@ -8,9 +7,29 @@ from .routes_qr import router as qr_router
 from .qrcode_redirect import router as redirect_router
 from .routes_admin import router as admin_router
 from .routes_automation import router as automation_router
+from .routes_user import router as user_router
 from .auth import require_admin_from_request
 from .db import init_db, close_db
+from .enrichment import run_enrichment_loop
+from .geoip import GEOIP_DB_PATH, load_geoip
+from .click_buffer import click_buffer, run_flush_loop
+from .live import LIVE_SOURCE, run_change_stream
+from .invalidation import CACHE_INVALIDATION, run_invalidation_listener
+from .redirect_cache import REDIRECT_WARMUP_SLUGS, warm_up
+from .trending import TRENDING_FLUSH_INTERVAL, persist as persist_trending, run_trending_loop
+from .rendering import shutdown_render_pool
+from .metrics import METRICS_ENABLED, METRICS_TOKEN, MetricsMiddleware, render_metrics
+from .responses import GZIP_COMPRESS_LEVEL, GZIP_MINIMUM_SIZE, FastJSONResponse, StreamSafeGZipMiddleware
+from .static_assets import static_assets
+from .templating import TEMPLATES_DIR as templates_dir, templates
+import asyncio
+import hmac
 import os
+import time
+from typing import Optional
+
+# Seconds between two background click enrichment runs (0 = disabled, use the cron endpoint instead)
+CLICK_ENRICH_INTERVAL = float(os.getenv("CLICK_ENRICH_INTERVAL", 0))
 
 
 @asynccontextmanager
@@ -22,24 +41,60 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         print(f"✗ MongoDB initialization error: {e}")
         raise
+    if GEOIP_DB_PATH:
+        # parsed before traffic, in a thread, rather than on the first flushed click
+        started = time.perf_counter()
+        geo = await load_geoip()
+        if geo is not None:
+            print(f"✓ GeoIP index loaded ({len(geo)} ranges) in {(time.perf_counter() - started) * 1000:.0f} ms")
+    if REDIRECT_WARMUP_SLUGS > 0:
+        # Optional: preload the hottest slugs so a fresh instance does not send its first scans to Mongo
+        try:
+            started = time.perf_counter()
+            warmed = await warm_up()
+            print(f"✓ Redirect cache warmed with {warmed} slugs in {(time.perf_counter() - started) * 1000:.0f} ms")
+        except Exception as e:
+            print(f"✗ Redirect cache warm-up failed: {e}")
+    tasks = []
+    if CLICK_ENRICH_INTERVAL > 0:
+        tasks.append(asyncio.create_task(run_enrichment_loop(CLICK_ENRICH_INTERVAL)))
+    if click_buffer.max_size > 1:
+        tasks.append(asyncio.create_task(run_flush_loop()))
+    if LIVE_SOURCE == "changestream":
+        tasks.append(asyncio.create_task(run_change_stream()))
+    if CACHE_INVALIDATION == "mongo":
+        tasks.append(asyncio.create_task(run_invalidation_listener()))
+    if TRENDING_FLUSH_INTERVAL > 0:
+        tasks.append(asyncio.create_task(run_trending_loop()))
     yield
-    # Shutdown: Close connection
+    # Shutdown: Stop background work, write buffered clicks and close connection
+    for task in tasks:
+        task.cancel()
+    await click_buffer.flush()
+    await click_buffer.feed_sketches()
+    if TRENDING_FLUSH_INTERVAL > 0:
+        await persist_trending()
+    shutdown_render_pool()
     await close_db()
 
 
-app = FastAPI(title="QRGen API", lifespan=lifespan)
+app = FastAPI(title="QRGen API", lifespan=lifespan, default_response_class=FastJSONResponse)
+# Compress large responses for clients sending Accept-Encoding: gzip, except the streamed
+# ones (added first so metrics stay outermost)
+app.add_middleware(StreamSafeGZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE, compresslevel=GZIP_COMPRESS_LEVEL)
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
 
-# Configure templates (static files are handled by vercel.json rewrites)
-templates_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates")
+# Templates and static assets are loaded once at import (on Vercel, /static is served by the CDN)
 print(f"Templates directory: {templates_dir}")
 print(f"Templates directory exists: {os.path.exists(templates_dir)}")
-templates = Jinja2Templates(directory=templates_dir)
 
 app.include_router(auth_router)
 app.include_router(qr_router)
 app.include_router(redirect_router)
 app.include_router(admin_router)
 app.include_router(automation_router)
+app.include_router(user_router)
 
 
 @app.get("/health")
@@ -59,10 +114,21 @@ async def health_check():
     }
 
 
+@app.get("/metrics")
+async def metrics(request: Request):
+    """Prometheus metrics: METRICS_TOKEN as a Bearer token, or an admin token."""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics disabled")
+    auth_header = request.headers.get("Authorization", "")
+    if not (METRICS_TOKEN and hmac.compare_digest(auth_header, f"Bearer {METRICS_TOKEN}")):
+        require_admin_from_request(request)
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/")
 async def root(request: Request):
     """Serve a simple HTML frontend for creating QR codes and testing redirects."""
-    return templates.TemplateResponse("index.html", {"request": request})
+    return templates.TemplateResponse(request, "index.html")
 
 
 @app.get("/admin")
@@ -72,22 +138,17 @@ async def admin(request: Request):
         require_admin_from_request(request)
     except Exception:
         return RedirectResponse(url="/admin/login", status_code=302)
-    return templates.TemplateResponse("admin.html", {"request": request})
+    return templates.TemplateResponse(request, "admin.html")
 
 
 @app.get("/static/{file_path:path}")
-async def serve_static(file_path: str):
-    """Serve static files (CSS, JS, images)."""
+async def serve_static(file_path: str, request: Request, v: Optional[str] = None):
+    """Serve static files (CSS, JS, images) from memory, precompressed and cacheable."""
     # On Vercel, this should be handled by vercel.json rewrites for performance
     if os.getenv("VERCEL"):
-        from fastapi import HTTPException
         raise HTTPException(status_code=404, detail="Static files handled by Vercel CDN")
 
-    static_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "static")
-    file_location = os.path.join(static_dir, file_path)
-
-    if not os.path.exists(file_location):
-        from fastapi import HTTPException
+    response = static_assets.response(file_path, request.headers, v)
+    if response is None:
         raise HTTPException(status_code=404, detail="File not found")
-
-    return FileResponse(file_location)
+    return response
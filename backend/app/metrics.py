@@ -0,0 +1,283 @@
+"""
+Request and MongoDB instrumentation, exposed in Prometheus text format.
+
+- http_request_duration_seconds: per-route time until the response headers
+  are sent (ASGI middleware, labelled with the route template, not the raw
+  path, so slugs and ids do not create new series)
+- mongo_command_duration_seconds: per command / collection histogram, fed by
+  a pymongo CommandListener; commands slower than MONGO_SLOW_QUERY_MS are logged
+- mongo_pool_wait_seconds: time spent waiting for a pooled connection
+
+Recording is a bisect and a few integer increments under a lock; the text
+exposition is only built when /metrics is scraped.
+"""
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Tuple
+
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() not in ("0", "false", "no")
+# Bearer token for Prometheus scrapes; without it /metrics requires an admin token
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+# Mongo commands slower than this are logged with their collection and shape (0 = off)
+MONGO_SLOW_QUERY_MS = float(os.getenv("MONGO_SLOW_QUERY_MS", 100))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, label_names: tuple, buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple, value: float):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # per-bucket counts (+Inf last), then sum
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[i] += 1
+            series[-1] += value
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = [(labels, list(series)) for labels, series in self._series.items()]
+        for labels, series in sorted(snapshot):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                bucket_label = f'le="{le}"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, bucket_label)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {series[-1]}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, label_names: tuple):
+        self.name = name
+        self.help = help_text
+        self.label_names = label_names
+        self._series: Dict[Tuple, int] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: tuple, amount: int = 1):
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            snapshot = sorted(self._series.items())
+        for labels, value in snapshot:
+            lines.append(f"{self.name}{_labels(self.label_names, labels)} {value}")
+        return lines
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+http_requests = Counter(
+    "http_requests_total", "HTTP responses by route and status code.", ("method", "route", "status")
+)
+http_latency = Histogram(
+    "http_request_duration_seconds", "HTTP request latency (until response headers) by route.", ("method", "route")
+)
+mongo_latency = Histogram(
+    "mongo_command_duration_seconds", "MongoDB command duration by command and collection.",
+    ("command", "collection")
+)
+mongo_failures = Counter(
+    "mongo_command_failures_total", "Failed MongoDB commands by command and collection.",
+    ("command", "collection")
+)
+mongo_pool_wait = Histogram(
+    "mongo_pool_wait_seconds", "Time spent waiting to check a connection out of the pool.", ()
+)
+mongo_pool_timeouts = Counter(
+    "mongo_pool_checkout_failures_total", "Failed pool checkouts by reason.", ("reason",)
+)
+
+REGISTRY = [http_requests, http_latency, mongo_latency, mongo_failures, mongo_pool_wait, mongo_pool_timeouts]
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def _route_name(scope) -> str:
+    route = scope.get("route")
+    if route is not None and getattr(route, "path", None):
+        return route.path
+    endpoint = scope.get("endpoint")
+    return getattr(endpoint, "__name__", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware timing each HTTP request until its response starts
+    being sent (headers), not until the body ends: SSE feeds and streamed
+    exports would otherwise record their whole connection time.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        status = 500
+        latency = None
+
+        async def send_wrapper(message):
+            nonlocal status, latency
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                latency = time.perf_counter() - start
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = _route_name(scope)
+            method = scope["method"]
+            # no response started: the request failed, time it until then
+            http_latency.observe((method, route), time.perf_counter() - start if latency is None else latency)
+            http_requests.inc((method, route, str(status)))
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Records every command's duration by command name and collection, logs slow ones."""
+
+    def __init__(self):
+        self._pending: Dict[Tuple, tuple] = {}
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            # getMore carries the cursor id first and the collection apart
+            collection = event.command.get("collection", "-")
+        self._pending[(event.connection_id, event.request_id)] = (collection, event.command)
+
+    def _finish(self, event):
+        return self._pending.pop((event.connection_id, event.request_id), ("-", None))
+
+    def succeeded(self, event):
+        collection, command = self._finish(event)
+        seconds = event.duration_micros / 1e6
+        mongo_latency.observe((event.command_name, collection), seconds)
+        if MONGO_SLOW_QUERY_MS and seconds * 1000 >= MONGO_SLOW_QUERY_MS:
+            logger.warning(
+                f"Slow MongoDB {event.command_name} on {collection}: {seconds * 1000:.1f} ms "
+                f"{_command_shape(command)}"
+            )
+
+    def failed(self, event):
+        collection, _ = self._finish(event)
+        mongo_latency.observe((event.command_name, collection), event.duration_micros / 1e6)
+        mongo_failures.inc((event.command_name, collection))
+
+
+def _command_shape(command) -> str:
+    """Filter / pipeline keys of a command, without the values (no user data in logs)."""
+    if not command:
+        return ""
+
+    def keys(value):
+        if isinstance(value, dict):
+            return {k: keys(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [keys(v) for v in value[:3]]
+        return "?"
+
+    for field in ("filter", "pipeline", "q", "query"):
+        if field in command:
+            return f"{field}={keys(command[field])}"
+    return ""
+
+
+class MongoPoolMetrics(monitoring.ConnectionPoolListener):
+    """
+    Connection checkout wait time; the other pool events are ignored.
+
+    Checkout events carry `duration` since pymongo 4.7: with 4.6 (allowed by
+    backend/requirements.txt) the wait is not sampled, timeouts still are.
+    """
+
+    def connection_checked_out(self, event):
+        self._observe_wait(event)
+
+    def connection_check_out_failed(self, event):
+        self._observe_wait(event)
+        mongo_pool_timeouts.inc((str(event.reason),))
+
+    @staticmethod
+    def _observe_wait(event):
+        duration = getattr(event, "duration", None)
+        if duration is not None:
+            mongo_pool_wait.observe((), duration)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_checked_in(self, event):
+        pass
+
+
+def mongo_event_listeners() -> list:
+    return [MongoCommandMetrics(), MongoPoolMetrics()] if METRICS_ENABLED else []
@@ -1,7 +1,8 @@
 from beanie import Document, Indexed, PydanticObjectId
 from pydantic import Field, EmailStr
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import datetime
+from pymongo import IndexModel, ASCENDING, DESCENDING
 
 
 class User(Document):
@@ -9,6 +10,8 @@ class User(Document):
     hashed_password: str
     is_active: bool = False
     is_verified: bool = False
+    # Clicks on all of the user's QR codes, incremented at click flush
+    click_count: int = 0
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
     class Settings:
@@ -22,11 +25,24 @@ class QRCode(Document):
     owner_id: Optional[PydanticObjectId] = None
     is_dynamic: bool = False
     options: Dict[str, Any] = Field(default_factory=dict)
+    # Origin encoded in the images of a dynamic code, fixed at creation so a
+    # code looks the same (and has one set of stored images) from every host
+    base_url: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
     class Settings:
         name = "qrcodes"
+        # Index set for the list/stats query shapes (see indexes.py). Created at
+        # init_db; indexes not declared here (ops, Atlas) are left alone.
+        indexes = [
+            IndexModel([("created_at", DESCENDING)]),
+            IndexModel([("title", ASCENDING)]),
+            IndexModel([("is_dynamic", ASCENDING), ("created_at", DESCENDING)]),
+            IndexModel([("is_dynamic", ASCENDING), ("title", ASCENDING)]),
+            IndexModel([("owner_id", ASCENDING), ("created_at", DESCENDING)]),
+            IndexModel([("owner_id", ASCENDING), ("is_dynamic", ASCENDING), ("created_at", DESCENDING)]),
+        ]
 
 
 class Click(Document):
@@ -35,12 +51,104 @@ class Click(Document):
     ip: Optional[str] = None  # Stored as anonymized hash (GDPR compliance)
     user_agent: Optional[str] = None
     country: Optional[str] = None
+    # Filled in by the batch enrichment stage (see enrichment.py), never on redirect
+    device: Optional[str] = None
+    os: Optional[str] = None
+    browser: Optional[str] = None
+    enriched_at: Optional[datetime] = None
+    # Lease of the enrichment run working on this click, cleared once enriched
+    enrich_claim: Optional[str] = None
+    enrich_claimed_at: Optional[datetime] = None
 
     class Settings:
         name = "clicks"
+        # Per-code queries filter on qrcode_id then sort or range on timestamp;
+        # the compound index also covers qrcode_id alone (the former
+        # qrcode_id_1 index is redundant and can be dropped by hand).
+        indexes = [
+            IndexModel([("qrcode_id", ASCENDING), ("timestamp", DESCENDING)]),
+            IndexModel([("timestamp", ASCENDING)]),
+            IndexModel([("enriched_at", ASCENDING)]),
+        ]
+
+
+class ClickRollup(Document):
+    """Pre-aggregated click counts per QR code for one analytics dimension (device, os, browser...)."""
+    qrcode_id: PydanticObjectId
+    dimension: str
+    value: str
+    clicks: int = 0
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "click_rollups"
+        indexes = [
+            IndexModel(
+                [("qrcode_id", ASCENDING), ("dimension", ASCENDING), ("value", ASCENDING)],
+                unique=True,
+            ),
+        ]
+
+
+class RateLimitCounter(Document):
+    """Per-client redirect counter for one minute, shared between instances (see ratelimit.py)."""
+    id: str
+    hits: int = 0
+    expires_at: datetime
+
+    class Settings:
+        name = "rate_limits"
+        indexes = [
+            IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+        ]
+
+
+class QRImage(Document):
+    """Pre-rendered QR image variant, keyed by a hash of everything it depends on (see image_store.py)."""
+    id: str
+    qrcode_id: PydanticObjectId
+    format: str
+    size: int = 0
+    data: bytes
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "qr_images"
+        indexes = [
+            IndexModel([("qrcode_id", ASCENDING)]),
+        ]
+
+
+class UniqueSketch(Document):
+    """HyperLogLog sketch of the hashed scanner IPs of one QR code on one UTC day (see uniques.py)."""
+    id: str  # "<qrcode_id>:<YYYY-MM-DD>"
+    qrcode_id: PydanticObjectId
+    day: datetime
+    registers: bytes  # zlib-compressed HyperLogLog registers
+    version: int = 0  # bumped by every write, for compare-and-swap updates
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "unique_sketches"
+        indexes = [
+            IndexModel([("qrcode_id", ASCENDING), ("day", ASCENDING)]),
+        ]
+
+
+class TrendingSlot(Document):
+    """One instance's Space-Saving counters of scanned slugs for one time slot of a window (see trending.py)."""
+    id: str  # "<instance>:<window>:<slot start epoch>"
+    instance: str
+    window: str
+    start: datetime
+    counters: List[List[Any]] = Field(default_factory=list)  # [slug, count, error]
+    expires_at: datetime
+
+    class Settings:
+        name = "trending_slots"
         indexes = [
-            "qrcode_id",
-            "timestamp",
+            IndexModel([("window", ASCENDING), ("start", ASCENDING)]),
+            IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
         ]
 
 
@@ -1,22 +1,35 @@
 from fastapi import APIRouter, Request
-from starlette.responses import RedirectResponse
-from . import models
+from starlette.background import BackgroundTask
+from starlette.responses import RedirectResponse, PlainTextResponse
+from .redirect_cache import redirect_cache
+from .click_buffer import click_buffer, hash_ip
+from .ratelimit import scan_limiter, scan_dedup
+from .trending import trending
 
 router = APIRouter()
 
 
 @router.get("/q/{slug}")
+@router.get("/Q/{slug}")  # compact QR codes (QR_COMPACT_URLS)
 async def redirect_slug(slug: str, request: Request):
-    q = await models.QRCode.find_one(models.QRCode.slug == slug)
+    ip_raw = request.client.host if request.client else "unknown"
+    ip_hash = hash_ip(ip_raw)
+    # Throttle per client and code before touching Mongo: a client replaying one
+    # code is cut off without blocking the other codes scanned from its address
+    # (NAT, corporate proxies), which a per-client bucket would.
+    if scan_limiter is not None and not await scan_limiter.allow(f"{ip_hash}:{slug}"):
+        return PlainTextResponse("Too many requests", status_code=429, headers={"Retry-After": "60"})
+
+    q, cached = await redirect_cache.lookup(slug)
     if not q:
         return RedirectResponse(url="/", status_code=302)
-    # record click
-    import hashlib
-    ip_raw = request.client.host if request.client else "unknown"
-    # GDPR: Anonymize IP by hashing
-    ip_hash = hashlib.sha256(ip_raw.encode()).hexdigest()[:16] # Keep first 16 chars for brevity but anonymity
-    
-    ua = request.headers.get("user-agent")
-    click = models.Click(qrcode_id=q.id, ip=ip_hash, user_agent=ua)
-    await click.insert()
+    # record click, unless the same client scanned this code within the dedup window
+    # (country resolution happens when the buffer is flushed)
+    if not (scan_dedup is not None and scan_dedup.is_duplicate(f"{ip_hash}:{slug}")):
+        ua = request.headers.get("user-agent")
+        await click_buffer.record(q.id, ip_raw, ua, ip_hash=ip_hash, owner_id=q.owner_id, slug=slug,
+                                 verify=cached)
+        trending.offer(slug)
+        # unique-scanner sketches are updated once the redirect is sent
+        return RedirectResponse(url=q.content, background=BackgroundTask(click_buffer.feed_sketches))
     return RedirectResponse(url=q.content)
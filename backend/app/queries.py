@@ -0,0 +1,114 @@
+"""
+Lean read queries for the hot read-only paths (redirect, lists, click
+history, slug lookup).
+
+These go straight to the motor collections with a projection and wrap the
+raw documents in `__slots__` records instead of hydrating Beanie documents:
+no Pydantic validation, no per-field copy of `options`. Only use them for
+trusted reads of documents written by this app; writes still go through
+the models.
+"""
+from typing import Optional
+
+from . import models
+
+
+def _iso(value) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+class QRRecord:
+    __slots__ = ("id", "slug", "title", "content", "owner_id", "is_dynamic", "options", "created_at", "updated_at")
+
+    PROJECTION = {name: 1 for name in __slots__ if name != "id"}
+
+    def __init__(self, doc: dict):
+        self.id = doc["_id"]
+        self.slug = doc["slug"]
+        self.title = doc.get("title") or ""
+        self.content = doc["content"]
+        self.owner_id = doc.get("owner_id")
+        self.is_dynamic = doc.get("is_dynamic", False)
+        self.options = doc.get("options") or {}
+        self.created_at = doc.get("created_at")
+        self.updated_at = doc.get("updated_at")
+
+    def to_dict(self) -> dict:
+        return {
+            "id": str(self.id),
+            "slug": self.slug,
+            "title": self.title,
+            "content": self.content,
+            "is_dynamic": self.is_dynamic,
+            "options": self.options,
+            "created_at": _iso(self.created_at),
+            "updated_at": _iso(self.updated_at),
+        }
+
+
+class RedirectTarget:
+    """The three fields a redirect needs."""
+    __slots__ = ("id", "content", "owner_id")
+
+    PROJECTION = {"content": 1, "owner_id": 1}
+
+    def __init__(self, doc: dict):
+        self.id = doc["_id"]
+        self.content = doc["content"]
+        self.owner_id = doc.get("owner_id")
+
+
+class ClickRecord:
+    __slots__ = ("id", "timestamp", "ip", "user_agent", "country")
+
+    PROJECTION = {name: 1 for name in __slots__ if name != "id"}
+
+    def __init__(self, doc: dict):
+        self.id = doc["_id"]
+        self.timestamp = doc.get("timestamp")
+        self.ip = doc.get("ip")
+        self.user_agent = doc.get("user_agent")
+        self.country = doc.get("country")
+
+    def to_dict(self) -> dict:
+        return {
+            "id": str(self.id),
+            "timestamp": _iso(self.timestamp),
+            "ip": self.ip,
+            "user_agent": self.user_agent,
+            "country": self.country,
+        }
+
+
+async def find_redirect_target(slug: str) -> Optional[RedirectTarget]:
+    doc = await models.QRCode.get_motor_collection().find_one({"slug": slug}, RedirectTarget.PROJECTION)
+    return RedirectTarget(doc) if doc else None
+
+
+async def find_redirect_targets(query: dict) -> list:
+    """(slug, RedirectTarget) of the codes matching `query`, in one query."""
+    cursor = models.QRCode.get_motor_collection().find(query, {**RedirectTarget.PROJECTION, "slug": 1})
+    return [(doc["slug"], RedirectTarget(doc)) async for doc in cursor]
+
+
+async def find_qr_by_slug(slug: str) -> Optional[QRRecord]:
+    doc = await models.QRCode.get_motor_collection().find_one({"slug": slug}, QRRecord.PROJECTION)
+    return QRRecord(doc) if doc else None
+
+
+async def qr_exists(qrcode_id) -> bool:
+    return await models.QRCode.get_motor_collection().find_one({"_id": qrcode_id}, {"_id": 1}) is not None
+
+
+async def find_qrcodes(query: dict, sort: list, skip: int, limit: int) -> list:
+    cursor = models.QRCode.get_motor_collection().find(
+        query, QRRecord.PROJECTION, sort=sort, skip=skip, limit=limit
+    )
+    return [QRRecord(doc) async for doc in cursor]
+
+
+async def find_clicks(qrcode_id, skip: int, limit: int) -> list:
+    cursor = models.Click.get_motor_collection().find(
+        {"qrcode_id": qrcode_id}, ClickRecord.PROJECTION, sort=[("timestamp", -1)], skip=skip, limit=limit
+    )
+    return [ClickRecord(doc) async for doc in cursor]
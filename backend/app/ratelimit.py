@@ -0,0 +1,122 @@
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional
+
+from pymongo import ReturnDocument
+
+from . import models
+
+# Redirects allowed per client IP and minute (0 = no rate limiting). Disabled
+# by default: behind a proxy every scanner may share the same client address.
+RATE_LIMIT_PER_MINUTE = float(os.getenv("RATE_LIMIT_PER_MINUTE", 0))
+RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", 30))
+# "memory" (per process) or "mongo" (shared between instances, one extra write per scan)
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", 100_000))
+# Repeated scans of a slug by the same client within this window count as one click (0 = off)
+SCAN_DEDUP_SECONDS = float(os.getenv("SCAN_DEDUP_SECONDS", 0))
+SCAN_DEDUP_MAX_KEYS = int(os.getenv("SCAN_DEDUP_MAX_KEYS", 100_000))
+
+
+class TokenBucketLimiter:
+    """
+    In-process token bucket per key.
+
+    Buckets are kept in LRU order and the least recently seen ones are
+    evicted beyond `max_keys`, so memory stays bounded under a flood of
+    distinct clients.
+    """
+
+    def __init__(self, per_minute: float, burst: int, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.rate = per_minute / 60.0
+        self.burst = max(1, burst)
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+
+    def __len__(self):
+        return len(self._buckets)
+
+    async def allow(self, key: str, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = [float(self.burst), now]
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            tokens, last = bucket
+            bucket[0] = min(float(self.burst), tokens + (now - last) * self.rate)
+            bucket[1] = now
+
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return True
+        return False
+
+
+class MongoRateLimiter:
+    """
+    Fixed one-minute window counters in the `rate_limits` collection, shared by
+    every instance. Expired windows are removed by a TTL index.
+    """
+
+    def __init__(self, per_minute: float, burst: int):
+        self.limit = int(per_minute) + max(0, burst)
+
+    async def allow(self, key: str, now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        window = int(now // 60)
+        doc = await models.RateLimitCounter.get_motor_collection().find_one_and_update(
+            {"_id": f"{key}:{window}"},
+            {
+                "$inc": {"hits": 1},
+                "$setOnInsert": {"expires_at": datetime.utcfromtimestamp((window + 1) * 60) + timedelta(minutes=1)},
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return doc["hits"] <= self.limit
+
+
+class DedupWindow:
+    """
+    Remembers (client, slug) pairs for `window` seconds. Entries are kept in
+    insertion order, which is also expiry order, so cleanup is a pop from the
+    front; the oldest entries are dropped beyond `max_keys`.
+    """
+
+    def __init__(self, window: float, max_keys: int = SCAN_DEDUP_MAX_KEYS):
+        self.window = window
+        self.max_keys = max_keys
+        self._seen: "OrderedDict[str, float]" = OrderedDict()
+
+    def __len__(self):
+        return len(self._seen)
+
+    def is_duplicate(self, key: str, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        while self._seen and now - next(iter(self._seen.values())) >= self.window:
+            self._seen.popitem(last=False)
+
+        if key in self._seen:
+            return True
+        self._seen[key] = now
+        if len(self._seen) > self.max_keys:
+            self._seen.popitem(last=False)
+        return False
+
+
+def build_limiter():
+    if RATE_LIMIT_PER_MINUTE <= 0:
+        return None
+    if RATE_LIMIT_BACKEND == "mongo":
+        return MongoRateLimiter(RATE_LIMIT_PER_MINUTE, RATE_LIMIT_BURST)
+    return TokenBucketLimiter(RATE_LIMIT_PER_MINUTE, RATE_LIMIT_BURST)
+
+
+scan_limiter = build_limiter()
+scan_dedup = DedupWindow(SCAN_DEDUP_SECONDS) if SCAN_DEDUP_SECONDS > 0 else None
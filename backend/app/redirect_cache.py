@@ -0,0 +1,128 @@
+"""
+Per-process cache of redirect targets, so a scan of a hot slug skips MongoDB.
+Enabled by default only with CACHE_INVALIDATION=mongo.
+
+Entries expire after REDIRECT_CACHE_TTL seconds and the least recently used
+are evicted beyond REDIRECT_CACHE_SIZE. Updates and deletions evict the slug
+through the invalidation bus (invalidation.py): immediately in the writing
+process and, with CACHE_INVALIDATION=mongo, within milliseconds in every
+other worker and instance, which is what makes a long TTL safe.
+"""
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Iterable, Optional, Tuple
+
+from . import models
+from .invalidation import CACHE_INVALIDATION, invalidation_bus
+from .queries import RedirectTarget, find_redirect_target, find_redirect_targets
+from .trending import top_slugs
+
+# Cached slugs per process (0 = no cache). Off by default unless evictions reach every
+# worker / instance: otherwise an edited or deleted code keeps redirecting until the TTL
+REDIRECT_CACHE_SIZE = int(os.getenv("REDIRECT_CACHE_SIZE", 10_000 if CACHE_INVALIDATION == "mongo" else 0))
+# Seconds a cached target is trusted; keep it short unless CACHE_INVALIDATION=mongo
+REDIRECT_CACHE_TTL = float(os.getenv("REDIRECT_CACHE_TTL", 60))
+# Most scanned slugs preloaded at startup (0 = no warm-up), ranked over the last REDIRECT_WARMUP_HOURS
+REDIRECT_WARMUP_SLUGS = int(os.getenv("REDIRECT_WARMUP_SLUGS", 0))
+REDIRECT_WARMUP_HOURS = float(os.getenv("REDIRECT_WARMUP_HOURS", 24))
+
+
+class RedirectCache:
+    def __init__(self, max_size: int = REDIRECT_CACHE_SIZE, ttl: float = REDIRECT_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        # bumped by every eviction, so a lookup racing with one does not cache what it read
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, slug: str, now: Optional[float] = None) -> Optional[RedirectTarget]:
+        entry = self._entries.get(slug)
+        if entry is None:
+            return None
+        target, expires_at = entry
+        if (time.monotonic() if now is None else now) >= expires_at:
+            del self._entries[slug]
+            return None
+        self._entries.move_to_end(slug)
+        return target
+
+    def put(self, slug: str, target: RedirectTarget, now: Optional[float] = None):
+        if self.max_size <= 0:
+            return
+        self._entries[slug] = (target, (time.monotonic() if now is None else now) + self.ttl)
+        self._entries.move_to_end(slug)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def evict(self, slugs: Iterable[str]):
+        self._generation += 1
+        for slug in slugs:
+            self._entries.pop(slug, None)
+
+    def clear(self):
+        self._generation += 1
+        self._entries.clear()
+
+    def invalidate(self, slugs: Optional[Iterable[str]]):
+        """Invalidation bus handler: evict `slugs`, or everything when None."""
+        if slugs is None:
+            self.clear()
+        else:
+            self.evict(slugs)
+
+    async def lookup(self, slug: str) -> Tuple[Optional[RedirectTarget], bool]:
+        """The target of `slug` and whether it came from the cache (it may have been deleted since)."""
+        target = self.get(slug)
+        if target is not None:
+            self.hits += 1
+            return target, True
+        self.misses += 1
+        generation = self._generation
+        target = await find_redirect_target(slug)
+        if target is not None and generation == self._generation:
+            self.put(slug, target)
+        return target, False
+
+
+redirect_cache = RedirectCache()
+invalidation_bus.register("redirect", redirect_cache.invalidate)
+
+
+async def warm_up(cache: RedirectCache = redirect_cache, top: int = REDIRECT_WARMUP_SLUGS,
+                  hours: float = REDIRECT_WARMUP_HOURS) -> int:
+    """
+    Preload the `top` most scanned slugs into the cache; return how many.
+
+    Slugs are ranked by the shared trending counters of the last 24 h when
+    other instances have persisted some, else by the clicks of the last `hours`.
+    """
+    top = min(top, cache.max_size)
+    if top <= 0:
+        return 0
+    ranked_slugs = [row["slug"] for row in await top_slugs("24h", top)]
+    if ranked_slugs:
+        targets = await find_redirect_targets({"slug": {"$in": ranked_slugs}})
+        rank = {slug: i for i, slug in enumerate(ranked_slugs)}
+        order = lambda item: rank[item[0]]
+    else:
+        since = datetime.utcnow() - timedelta(hours=hours)
+        ranked = await models.Click.aggregate([
+            {"$match": {"timestamp": {"$gte": since}}},
+            {"$group": {"_id": "$qrcode_id", "clicks": {"$sum": 1}}},
+            {"$sort": {"clicks": -1}},
+            {"$limit": top}
+        ]).to_list()
+        targets = await find_redirect_targets({"_id": {"$in": [row["_id"] for row in ranked]}})
+        rank = {row["_id"]: i for i, row in enumerate(ranked)}
+        order = lambda item: rank[item[1].id]
+    # hottest last, so they are the last to be evicted
+    for slug, target in sorted(targets, key=order, reverse=True):
+        cache.put(slug, target)
+    return len(targets)
@@ -0,0 +1,330 @@
+"""
+QR image rendering shared by the image endpoint and the bulk exports.
+
+Render functions are plain module-level functions on picklable values so
+they can run in a worker process. Bulk renders are spread over a process
+pool in chunks; where processes are not available (e.g. serverless
+sandboxes without /dev/shm) they fall back to the default thread pool.
+"""
+import asyncio
+import base64
+import logging
+import multiprocessing
+import os
+import struct
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from html import escape
+from io import BytesIO
+from typing import AsyncIterator, NamedTuple, Optional
+from urllib.parse import urlsplit
+
+import numpy as np
+from PIL import Image, ImageColor, ImageDraw
+from segno import make as make_qr
+
+logger = logging.getLogger(__name__)
+
+# Worker processes for bulk renders (0 = render on the default thread pool)
+RENDER_PROCESSES = int(os.getenv("RENDER_PROCESSES", min(4, os.cpu_count() or 1)))
+# Codes rendered per worker task; larger chunks amortize inter-process overhead
+RENDER_CHUNK_SIZE = int(os.getenv("RENDER_CHUNK_SIZE", 25))
+
+# Decoded logos kept per process; resized variants get 4x as many slots
+LOGO_CACHE_SIZE = int(os.getenv("LOGO_CACHE_SIZE", 64))
+MAX_LOGO_BYTES = 512 * 1024
+# zlib level of the matrix PNG encoder; QR rows are very redundant, so 6 is
+# as small as 9 in practice and faster
+PNG_COMPRESS_LEVEL = int(os.getenv("PNG_COMPRESS_LEVEL", 6))
+
+IMAGE_FORMATS = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+}
+ERROR_LEVELS = {"L", "M", "Q", "H"}
+
+# Dynamic codes encode an uppercase /Q/{slug} URL that fits the QR alphanumeric mode
+QR_COMPACT_URLS = os.getenv("QR_COMPACT_URLS", "false").lower() in ("1", "true", "yes")
+# Public origin encoded in dynamic codes; unset, the host of the request creating the code
+BASE_URL = os.getenv("BASE_URL", "")
+# Alphanumeric mode: 45 characters at 5.5 bits each, against 8 bits per character in byte mode
+QR_ALPHANUMERIC = frozenset("0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ $%*+-./:")
+
+_render_pool = None
+_render_pool_failed = False
+
+
+class RenderOptions(NamedTuple):
+    dark: str = "#000"
+    light: str = "#fff"
+    border: int = 4
+    error: Optional[str] = None
+    logo: Optional[str] = None
+    logo_ratio: float = 0.2
+
+
+def _number(value, kind, name):
+    try:
+        return kind(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a number")
+
+
+def parse_options(options: Optional[dict]) -> RenderOptions:
+    """
+    Read the rendering keys of `QRCode.options` - `dark`, `light` (CSS-style
+    colors), `border` (quiet zone, in modules), `error` (L/M/Q/H), `logo`
+    (data:image/...;base64 URI) and `logo_size` (fraction of the symbol,
+    at most 0.3). Unknown keys are ignored; invalid values raise ValueError.
+    """
+    options = options or {}
+    values = {}
+    for key in ("dark", "light"):
+        if options.get(key):
+            color = str(options[key])
+            ImageColor.getrgb(color)  # raises ValueError on unknown colors
+            values[key] = color
+    if options.get("border") is not None:
+        border = _number(options["border"], int, "border")
+        if not 0 <= border <= 20:
+            raise ValueError("border must be between 0 and 20")
+        values["border"] = border
+    if options.get("error"):
+        error = str(options["error"]).upper()
+        if error not in ERROR_LEVELS:
+            raise ValueError("error must be one of L, M, Q, H")
+        values["error"] = error
+    if options.get("logo"):
+        logo = str(options["logo"])
+        if not logo.startswith("data:image/") or ";base64," not in logo:
+            raise ValueError("logo must be a base64 data:image URI")
+        if len(logo) > MAX_LOGO_BYTES * 4 // 3 + 64:
+            raise ValueError("logo is too large")
+        values["logo"] = logo
+        # A centered logo hides modules: default to the highest error correction
+        values.setdefault("error", "H")
+    if options.get("logo_size") is not None:
+        ratio = _number(options["logo_size"], float, "logo_size")
+        if not 0.05 <= ratio <= 0.3:
+            raise ValueError("logo_size must be between 0.05 and 0.3")
+        values["logo_ratio"] = ratio
+    return RenderOptions(**values)
+
+
+@lru_cache(maxsize=LOGO_CACHE_SIZE)
+def load_logo(logo: str) -> Image.Image:
+    """Decode a data-URI logo once; raises ValueError if it is not an image."""
+    try:
+        raw = base64.b64decode(logo.split(",", 1)[1], validate=True)
+        image = Image.open(BytesIO(raw))
+        image.load()
+    except Exception as e:
+        raise ValueError(f"logo is not a valid image: {e}")
+    return image.convert("RGBA")
+
+
+@lru_cache(maxsize=LOGO_CACHE_SIZE * 4)
+def logo_variant(logo: str, side: int) -> Image.Image:
+    """The decoded logo scaled to fit a `side` x `side` box."""
+    image = load_logo(logo).copy()
+    image.thumbnail((side, side), Image.LANCZOS)
+    return image
+
+
+def compact_redirect_url(slug: str, base_url: str) -> Optional[str]:
+    """
+    The redirect URL of `slug` written only with alphanumeric-mode characters
+    (`HTTPS://HOST/Q/SLUG`), or None when it cannot be: scheme and host are
+    case-insensitive, but a path prefix in `base_url` or a lowercase slug is not.
+    """
+    base = base_url.rstrip("/")
+    if urlsplit(base).path or slug != slug.upper():
+        return None
+    url = f"{base.upper()}/Q/{slug}"
+    return url if QR_ALPHANUMERIC.issuperset(url) else None
+
+
+def canonical_base_url(request_base_url: str) -> str:
+    return (BASE_URL or request_base_url).rstrip("/")
+
+
+def qr_payload(is_dynamic: bool, slug: str, content: str, base_url: str) -> str:
+    # For dynamic QR codes, encode the redirect URL; for static, encode the content directly
+    if is_dynamic:
+        if QR_COMPACT_URLS:
+            # segno then picks alphanumeric mode and, for the error level, a smaller version
+            compact = compact_redirect_url(slug, base_url)
+            if compact is not None:
+                return compact
+        return f"{base_url.rstrip('/')}/q/{slug}"
+    return content
+
+
+def _as_options(options) -> RenderOptions:
+    return options if isinstance(options, RenderOptions) else parse_options(options)
+
+
+def _png_chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+
+@lru_cache(maxsize=256)
+def _png_palette(dark: str, light: str) -> bytes:
+    """PLTE (index 0 = light, 1 = dark) plus tRNS when a color has alpha."""
+    colors = [ImageColor.getrgb(light), ImageColor.getrgb(dark)]
+    palette = _png_chunk(b"PLTE", bytes(c for color in colors for c in color[:3]))
+    if any(len(color) == 4 and color[3] != 255 for color in colors):
+        palette += _png_chunk(b"tRNS", bytes(color[3] if len(color) == 4 else 255 for color in colors))
+    return palette
+
+
+def encode_matrix_png(matrix, scale: int, border: int, dark: str = "#000", light: str = "#fff") -> bytes:
+    """
+    Encode a QR module matrix (rows of 0/1) as a 1-bit palette PNG.
+
+    Each module row is scaled and bit-packed once with NumPy, then repeated
+    `scale` times; zlib then only sees raw scanlines, no per-pixel Python.
+    """
+    modules = np.array(matrix, dtype=np.uint8)
+    if border:
+        modules = np.pad(modules, border)
+    rows = np.packbits(np.repeat(modules, scale, axis=1), axis=1)
+    # Filter type 0 (None) in front of every scanline
+    scanlines = np.repeat(np.hstack([np.zeros((rows.shape[0], 1), np.uint8), rows]), scale, axis=0)
+
+    height, width = modules.shape[0] * scale, modules.shape[1] * scale
+    return b"".join((
+        b"\x89PNG\r\n\x1a\n",
+        _png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 1, 3, 0, 0, 0)),
+        _png_palette(dark, light),
+        _png_chunk(b"IDAT", zlib.compress(scanlines.tobytes(), PNG_COMPRESS_LEVEL)),
+        _png_chunk(b"IEND", b""),
+    ))
+
+
+def render_png(data: str, size: int = 300, options=None) -> bytes:
+    opts = _as_options(options)
+    qr = make_qr(data, error=opts.error)
+    try:
+        modules_x, modules_y = qr.symbol_size(border=opts.border)
+        scale = max(1, int(size // max(modules_x, modules_y)))
+    except Exception:
+        scale = 1
+    png = encode_matrix_png(qr.matrix, scale, opts.border, opts.dark, opts.light)
+    if not opts.logo:
+        return png
+
+    image = Image.open(BytesIO(png)).convert("RGB")
+    side = int(min(image.size) * opts.logo_ratio)
+    logo = logo_variant(opts.logo, side)
+    x, y = (image.width - logo.width) // 2, (image.height - logo.height) // 2
+    pad = max(1, scale)
+    ImageDraw.Draw(image).rectangle(
+        (x - pad, y - pad, x + logo.width + pad - 1, y + logo.height + pad - 1), fill=opts.light
+    )
+    image.paste(logo, (x, y), logo)
+    out = BytesIO()
+    image.save(out, format="PNG")
+    return out.getvalue()
+
+
+def render_svg(data: str, options=None) -> bytes:
+    opts = _as_options(options)
+    qr = make_qr(data, error=opts.error)
+    out = BytesIO()
+    qr.save(out, kind="svg", dark=opts.dark, light=opts.light, border=opts.border)
+    if not opts.logo:
+        return out.getvalue()
+
+    # scale 1: one SVG user unit per module
+    width = qr.symbol_size(border=opts.border)[0]
+    side = width * opts.logo_ratio
+    xy = (width - side) / 2
+    overlay = (
+        f'<rect x="{xy - 0.5:g}" y="{xy - 0.5:g}" width="{side + 1:g}" height="{side + 1:g}" '
+        f'fill="{escape(opts.light, quote=True)}"/>'
+        f'<image x="{xy:g}" y="{xy:g}" width="{side:g}" height="{side:g}" '
+        f'preserveAspectRatio="xMidYMid meet" href="{escape(opts.logo, quote=True)}"/>'
+    )
+    return out.getvalue().replace(b"</svg>", overlay.encode() + b"</svg>")
+
+
+def render(data: str, fmt: str = "png", size: int = 300, options=None) -> bytes:
+    if fmt == "svg":
+        return render_svg(data, options)
+    return render_png(data, size, options)
+
+
+def _render_chunk(jobs: list, fmt: str, size: int) -> list:
+    return [render(data, fmt, size, options) for data, options in jobs]
+
+
+def get_render_pool() -> Optional[ProcessPoolExecutor]:
+    """Lazily start the render process pool; None means use the default thread pool."""
+    global _render_pool, _render_pool_failed
+    if _render_pool is not None or _render_pool_failed or RENDER_PROCESSES <= 0:
+        return _render_pool
+    try:
+        # spawn, not fork: the parent runs an event loop and driver threads
+        _render_pool = ProcessPoolExecutor(
+            max_workers=RENDER_PROCESSES, mp_context=multiprocessing.get_context("spawn")
+        )
+    except (OSError, NotImplementedError) as e:
+        logger.warning(f"Render process pool unavailable, rendering in threads: {e}")
+        _render_pool_failed = True
+    return _render_pool
+
+
+def shutdown_render_pool():
+    global _render_pool
+    if _render_pool is not None:
+        _render_pool.shutdown(wait=False, cancel_futures=True)
+        _render_pool = None
+
+
+async def render_many(
+    items: AsyncIterator[tuple],
+    fmt: str = "png",
+    size: int = 300,
+    chunk_size: int = RENDER_CHUNK_SIZE,
+) -> AsyncIterator[tuple]:
+    """
+    Render `(key, payload, options)` items and yield `(key, image bytes)`
+    in input order.
+
+    Chunks are submitted to the render pool as items arrive, with at most
+    two chunks per worker in flight, so memory stays bounded whatever the
+    number of codes.
+    """
+    loop = asyncio.get_running_loop()
+    executor = get_render_pool()
+    max_pending = 2 * max(1, RENDER_PROCESSES)
+    pending = deque()
+
+    def submit(chunk):
+        keys = [key for key, _, _ in chunk]
+        future = loop.run_in_executor(executor, _render_chunk, [(data, options) for _, data, options in chunk], fmt, size)
+        pending.append((keys, future))
+
+    try:
+        chunk = []
+        async for item in items:
+            chunk.append(item)
+            if len(chunk) >= chunk_size:
+                submit(chunk)
+                chunk = []
+            while len(pending) >= max_pending:
+                keys, future = pending.popleft()
+                for key, image in zip(keys, await future):
+                    yield key, image
+        if chunk:
+            submit(chunk)
+        while pending:
+            keys, future = pending.popleft()
+            for key, image in zip(keys, await future):
+                yield key, image
+    finally:
+        for _, future in pending:
+            future.cancel()
@@ -0,0 +1,97 @@
+"""
+Fast JSON responses.
+
+FastJSONResponse serializes with orjson when it is installed (datetimes,
+numpy arrays and ObjectIds handled natively or by `_default`) and falls
+back to the standard json module otherwise. It is the app's default
+response class; hot endpoints return it directly with native values so
+FastAPI's jsonable_encoder pass is skipped as well.
+
+`conditional_json` adds an ETag (hash of the body) and answers a matching
+If-None-Match with a bodiless 304.
+
+`StreamSafeGZipMiddleware` gzips large responses except the streamed ones.
+"""
+import hashlib
+import json
+import os
+import re
+from datetime import date, datetime
+
+from bson import ObjectId
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+# Responses smaller than this are sent uncompressed
+GZIP_MINIMUM_SIZE = int(os.getenv("GZIP_MINIMUM_SIZE", 1024))
+GZIP_COMPRESS_LEVEL = int(os.getenv("GZIP_COMPRESS_LEVEL", 5))
+# Streamed bodies (live SSE feed, click and image exports) are never compressed
+GZIP_EXCLUDED_PATHS = re.compile(r"^/api/admin/live$|/export$")
+
+
+def _default(obj):
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if hasattr(obj, "tolist"):  # numpy arrays and scalars
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(content) -> bytes:
+        return orjson.dumps(content, default=_default, option=_ORJSON_OPTIONS)
+else:
+    def dumps(content) -> bytes:
+        return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def etag_matches(if_none_match, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+def conditional_json(request, content, cache_control: str = "private, no-cache") -> Response:
+    """JSON response validated by an ETag; 304 without a body when the client already has it."""
+    body = dumps(content)
+    etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+class StreamSafeGZipMiddleware:
+    """
+    GZipMiddleware for every path but GZIP_EXCLUDED_PATHS. Depending on the
+    Starlette version, GZip buffers streamed chunks in its compressor (SSE
+    events would only reach the dashboard in blocks) and decides by content
+    type alone; the streaming routes are left out by path here, so they
+    stream uncompressed on every version.
+    """
+
+    def __init__(self, app, exclude_paths=GZIP_EXCLUDED_PATHS, **options):
+        self.app = app
+        self.gzip = GZipMiddleware(app, **options)
+        self.exclude_paths = exclude_paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and self.exclude_paths.search(scope["path"]):
+            await self.app(scope, receive, send)
+        else:
+            await self.gzip(scope, receive, send)
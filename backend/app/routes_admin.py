@@ -1,17 +1,28 @@
-from fastapi import APIRouter, Request, Form, HTTPException
-from fastapi.responses import RedirectResponse
+from fastapi import APIRouter, Depends, Request, Form, HTTPException, Query
+from fastapi.responses import RedirectResponse, StreamingResponse
+from typing import Optional
+from bson import ObjectId
+import asyncio
 import os
 from datetime import timedelta
-from . import auth, models
+from . import auth, models, queries
+from .enrichment import enrich_clicks
+from .indexes import explain_queries
+from .live import live_events
+from .trending import WINDOWS, top_slugs
+from .responses import conditional_json
+from .routes_qr import paginate_qrcodes
+from .templating import templates
 
 router = APIRouter()
 
+# Clicks per row sent with the dashboard: the page size of admin.html's click history
+DASHBOARD_CLICK_PREVIEW = 10
+
 
 @router.get("/admin/login")
 async def login_form(request: Request):
-    from fastapi.templating import Jinja2Templates
-    templates = Jinja2Templates(directory=os.path.join(os.path.dirname(__file__), '..', 'templates'))
-    return templates.TemplateResponse("admin_login.html", {"request": request})
+    return templates.TemplateResponse(request, "admin_login.html")
 
 
 @router.post("/admin/login")
@@ -41,11 +52,93 @@ async def logout():
     return resp
 
 
-@router.get('/api/admin/stats')
-async def api_admin_stats(request: Request):
+@router.get('/api/admin/stats', dependencies=[Depends(auth.require_admin)])
+async def api_admin_stats():
     """Compatibility endpoint for admin stats at /api/admin/stats"""
-    auth.require_admin_from_request(request)
-    total_qr = await models.QRCode.find().count()
-    dynamic_qr = await models.QRCode.find(models.QRCode.is_dynamic == True).count()
-    total_clicks = await models.Click.find().count()
+    return await admin_stats_counts()
+
+
+async def admin_stats_counts() -> dict:
+    total_qr, dynamic_qr, total_clicks = await asyncio.gather(
+        models.QRCode.find().count(),
+        models.QRCode.find(models.QRCode.is_dynamic == True).count(),
+        models.Click.find().count()
+    )
     return {"total_qr": total_qr, "dynamic_qr": dynamic_qr, "total_clicks": total_clicks}
+
+
+async def click_preview(qrcode_id: ObjectId, total: int) -> dict:
+    """Same shape as the first page of /api/qrcodes/{id}/clicks; `total` is the list's click_count."""
+    clicks = await queries.find_clicks(qrcode_id, 0, DASHBOARD_CLICK_PREVIEW)
+    return {
+        "total": total,
+        "page": 1,
+        "limit": DASHBOARD_CLICK_PREVIEW,
+        "pages": (total + DASHBOARD_CLICK_PREVIEW - 1) // DASHBOARD_CLICK_PREVIEW if total > 0 else 1,
+        "clicks": [c.to_dict() for c in clicks]
+    }
+
+
+@router.get('/api/admin/dashboard', dependencies=[Depends(auth.require_admin)])
+async def api_admin_dashboard(
+    request: Request,
+    dynamic: Optional[bool] = Query(None),
+    search: Optional[str] = Query(None),
+    page: int = Query(1, ge=1),
+    limit: int = Query(20, ge=1, le=100),
+    sort: str = Query("created_desc")
+):
+    """Everything the admin page shows on load in one round trip: stats, a page of QR codes
+    and the first page of click history of each listed code. Revalidated with an ETag."""
+    stats, listing = await asyncio.gather(
+        admin_stats_counts(),
+        paginate_qrcodes({} if dynamic is None else {"is_dynamic": dynamic}, search, page, limit, sort)
+    )
+    previews = await asyncio.gather(*(
+        click_preview(ObjectId(item["id"]), item["click_count"])
+        for item in listing["items"]
+    ))
+    return conditional_json(request, {
+        "stats": stats,
+        "qrcodes": listing,
+        "clicks": {item["id"]: preview for item, preview in zip(listing["items"], previews)}
+    })
+
+
+@router.post('/api/admin/enrich-clicks', dependencies=[Depends(auth.require_admin)])
+async def api_admin_enrich_clicks():
+    """Run the click enrichment stage (user-agent parsing + rollups). Meant to be called by a cron."""
+    return await enrich_clicks()
+
+
+@router.get('/api/admin/indexes', dependencies=[Depends(auth.require_admin)])
+async def api_admin_indexes():
+    """Explain every endpoint query shape and report which ones fall back to a COLLSCAN."""
+    report = await explain_queries()
+    return {
+        "collscans": sum(1 for row in report if row["collscan"]),
+        "queries": report
+    }
+
+
+@router.get('/api/admin/live', dependencies=[Depends(auth.require_admin)])
+async def api_admin_live(request: Request):
+    """Server-Sent Events feed of scans (slug, timestamp, country, running total of the code)."""
+    return StreamingResponse(
+        live_events(request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get('/api/admin/trending', dependencies=[Depends(auth.require_admin)])
+async def api_admin_trending(
+    window: Optional[str] = Query(None, description="5m, 1h or 24h (default: all three)"),
+    limit: int = Query(10, ge=1, le=100)
+):
+    """Most scanned slugs of the last 5 minutes / hour / day, from the Space-Saving counters (no click scan)."""
+    if window is not None and window not in WINDOWS:
+        raise HTTPException(status_code=400, detail=f"Unknown window, use one of {', '.join(WINDOWS)}")
+    names = [window] if window else list(WINDOWS)
+    tops = await asyncio.gather(*(top_slugs(name, limit) for name in names))
+    return dict(zip(names, tops))
@@ -15,7 +15,7 @@ async def register(data: schemas.UserCreate, background_tasks: BackgroundTasks):
     if user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    hashed = auth.get_password_hash(data.password)
+    hashed = await auth.get_password_hash_async(data.password)
     user = models.User(email=data.email, hashed_password=hashed, is_active=True, is_verified=False)
     await user.insert()
 
@@ -66,7 +66,7 @@ async def verify(token: Optional[str] = None):
 @router.post("/login")
 async def login(data: schemas.UserCreate):
     user = await models.User.find_one(models.User.email == data.email)
-    if not user or not auth.verify_password(data.password, user.hashed_password):
+    if not user or not await auth.verify_password_async(data.password, user.hashed_password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
     if not user.is_verified:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Email not verified")
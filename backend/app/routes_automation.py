@@ -4,6 +4,8 @@ from .dropbox_client import DropboxClient
 from . import models, schemas
 from .utils import generate_slug
 from .pdf_utils import add_qr_to_pdf
+from .image_store import prerender_images
+from .rendering import QR_COMPACT_URLS, canonical_base_url, qr_payload
 import os
 import tempfile
 import logging
@@ -62,7 +64,7 @@ async def dropbox_webhook_notification(request: Request):
     logger.info(f"Dropbox webhook notification received: {data}")
 
     # Traiter les changements immédiatement (Vercel serverless ne supporte pas bien les background tasks)
-    base_url = (os.getenv("BASE_URL") or str(request.base_url)).rstrip('/')
+    base_url = canonical_base_url(str(request.base_url))
 
     result = await process_dropbox_changes(base_url)
 
@@ -206,12 +208,12 @@ async def manual_process_pdf(request: Request, data: dict = Body(...)):
             dbx_client.download_file(target_entry.path_lower, input_path)
 
             # 3. Generate Dynamic QR Code in DB
-            slug = generate_slug(7)
+            slug = generate_slug(7, compact=QR_COMPACT_URLS)
             while await models.QRCode.find_one(models.QRCode.slug == slug):
-                slug = generate_slug(7)
+                slug = generate_slug(7, compact=QR_COMPACT_URLS)
 
-            # Use request URL to build base_url automatically
-            base_url = str(request.base_url).rstrip('/')
+            # BASE_URL, or the request URL when it is not set
+            base_url = canonical_base_url(str(request.base_url))
             # Default content - user should update this in admin
             default_content = "https://example.com"
 
@@ -219,12 +221,14 @@ async def manual_process_pdf(request: Request, data: dict = Body(...)):
                 slug=slug,
                 title=f"PDF: {target_entry.name}",
                 content=default_content,
-                is_dynamic=True
+                is_dynamic=True,
+                base_url=base_url
             )
             await q.insert()
+            await prerender_images(q, base_url)
             
             # 4. Preparation of QR Configs
-            dynamic_qr_url = f"{base_url}/q/{slug}"
+            dynamic_qr_url = qr_payload(True, slug, q.content, base_url)
             qr_configs = [
                 {'content': dynamic_qr_url, 'x': 450, 'y': 20, 'size': 80}
             ]
@@ -288,7 +292,7 @@ async def watch_folder(request: Request):
         raise HTTPException(status_code=500, detail="Dropbox not configured")
 
     # Priorité à BASE_URL (important pour le cron Vercel)
-    base_url = (os.getenv("BASE_URL") or str(request.base_url)).rstrip('/')
+    base_url = canonical_base_url(str(request.base_url))
     results = {"processed": [], "skipped": [], "errors": []}
 
     try:
@@ -369,21 +373,23 @@ async def _process_single_file(entry, base_url: str) -> dict:
         dbx_client.download_file(entry.path_lower, input_path)
 
         # Generate slug
-        slug = generate_slug(7)
+        slug = generate_slug(7, compact=QR_COMPACT_URLS)
         while await models.QRCode.find_one(models.QRCode.slug == slug):
-            slug = generate_slug(7)
+            slug = generate_slug(7, compact=QR_COMPACT_URLS)
 
         # Create QR code in DB
         q = models.QRCode(
             slug=slug,
             title=f"PDF: {entry.name}",
             content="https://example.com",  # Default, to be updated in admin
-            is_dynamic=True
+            is_dynamic=True,
+            base_url=base_url
         )
         await q.insert()
+        await prerender_images(q, base_url)
 
         # Add QR to PDF
-        dynamic_qr_url = f"{base_url}/q/{slug}"
+        dynamic_qr_url = qr_payload(True, slug, q.content, base_url)
         qr_configs = [{'content': dynamic_qr_url, 'x': 450, 'y': 20, 'size': 80}]
         add_qr_to_pdf(input_path, output_path, qr_configs)
 
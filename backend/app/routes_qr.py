@@ -1,31 +1,47 @@
-from fastapi import APIRouter, HTTPException, Query, Response, Request
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response, Request
 from typing import Optional
 from bson import ObjectId
-from . import schemas, models
-from .auth import require_admin_from_request
+from . import schemas, models, analytics, queries, uniques
+from .auth import require_admin, require_admin_from_request, optional_user_id
 from .utils import generate_slug
-from segno import make as make_qr
-from datetime import datetime, timedelta
-from io import BytesIO
-from starlette.responses import StreamingResponse
+from .enrichment import ROLLUP_DIMENSIONS
+from .click_buffer import COUNTRY_DIMENSION
+from .exports import (
+    EXPORT_FORMATS, IMAGE_EXPORT_FORMATS, IMAGE_EXPORT_MAX_CODES, PDF_EXPORT_MAX_CODES,
+    click_export_filter, stream_clicks, stream_qr_pdf, stream_qr_zip
+)
+from .image_store import delete_images, get_stored_image, prerender_images
+from .invalidation import invalidation_bus
+from .rendering import IMAGE_FORMATS, QR_COMPACT_URLS, canonical_base_url, parse_options, qr_payload, render
+from .responses import FastJSONResponse
+from datetime import datetime
+from starlette.responses import FileResponse, StreamingResponse
+import asyncio
 import re
 
 router = APIRouter(prefix="/api/qrcodes", tags=["qrcodes"])
 
+MAX_COMPARE_CODES = 50
+
 
 @router.post("/")
-async def create_qr(data: schemas.QRCreate):
-    slug = generate_slug(7)
+async def create_qr(data: schemas.QRCreate, request: Request, background_tasks: BackgroundTasks,
+                    user_id: Optional[ObjectId] = Depends(optional_user_id)):
+    slug = generate_slug(7, compact=QR_COMPACT_URLS)
     while await models.QRCode.find_one(models.QRCode.slug == slug):
-        slug = generate_slug(7)
+        slug = generate_slug(7, compact=QR_COMPACT_URLS)
     q = models.QRCode(
         slug=slug,
         title=data.title or "",
         content=data.content,
+        owner_id=user_id,
         is_dynamic=data.is_dynamic,
-        options=data.options or {}
+        options=data.options or {},
+        base_url=canonical_base_url(str(request.base_url))
     )
     await q.insert()
+    # after the response: the image endpoint renders on a miss until this is done
+    background_tasks.add_task(prerender_images, q, q.base_url)
     return {"id": str(q.id), "slug": q.slug}
 
 
@@ -45,22 +61,27 @@ async def list_qrcodes(
             raise HTTPException(status_code=401, detail="Not authenticated")
         require_admin_from_request(request)
 
-    # Build query filter
     query_filter = {}
-
     if dynamic is not None:
         query_filter["is_dynamic"] = dynamic
 
-    if search:
-        pattern = re.compile(f".*{re.escape(search)}.*", re.IGNORECASE)
-        query_filter["$or"] = [
-            {"title": {"$regex": pattern}},
-            {"slug": {"$regex": pattern}},
-            {"content": {"$regex": pattern}}
-        ]
+    return FastJSONResponse(await paginate_qrcodes(query_filter, search, page, limit, sort))
 
-    # Get total count
-    total = await models.QRCode.find(query_filter).count()
+
+def search_filter(search: Optional[str]) -> dict:
+    if not search:
+        return {}
+    pattern = re.compile(f".*{re.escape(search)}.*", re.IGNORECASE)
+    return {"$or": [
+        {"title": {"$regex": pattern}},
+        {"slug": {"$regex": pattern}},
+        {"content": {"$regex": pattern}}
+    ]}
+
+
+async def paginate_qrcodes(query_filter: dict, search: Optional[str], page: int, limit: int, sort: str) -> dict:
+    """Run a paginated, searchable and sorted QR code listing on top of `query_filter`."""
+    query_filter = {**query_filter, **search_filter(search)}
 
     # Sorting
     sort_field = "created_at"
@@ -74,11 +95,12 @@ async def list_qrcodes(
         sort_field = "title"
         sort_dir = -1
 
-    # Pagination
+    # Pagination (the total count runs concurrently with the page read)
     offset = (page - 1) * limit
-    results = await models.QRCode.find(query_filter).sort(
-        [(sort_field, sort_dir)]
-    ).skip(offset).limit(limit).to_list()
+    total, results = await asyncio.gather(
+        models.QRCode.find(query_filter).count(),
+        queries.find_qrcodes(query_filter, [(sort_field, sort_dir)], offset, limit)
+    )
 
     # Get click counts via aggregation
     click_counts = {}
@@ -97,24 +119,14 @@ async def list_qrcodes(
         "limit": limit,
         "pages": (total + limit - 1) // limit if total > 0 else 1,
         "items": [
-            {
-                "id": str(r.id),
-                "slug": r.slug,
-                "title": r.title,
-                "content": r.content,
-                "is_dynamic": r.is_dynamic,
-                "options": r.options,
-                "created_at": r.created_at.isoformat() if r.created_at else None,
-                "updated_at": r.updated_at.isoformat() if r.updated_at else None,
-                "click_count": click_counts.get(r.id, 0)
-            }
+            {**r.to_dict(), "click_count": click_counts.get(r.id, 0)}
             for r in results
         ]
     }
 
 
-@router.patch("/{qrcode_id}")
-async def update_qr(qrcode_id: str, data: schemas.QRUpdate, request: Request):
+@router.patch("/{qrcode_id}", dependencies=[Depends(require_admin)])
+async def update_qr(qrcode_id: str, data: schemas.QRUpdate, request: Request, background_tasks: BackgroundTasks):
     if not ObjectId.is_valid(qrcode_id):
         raise HTTPException(status_code=400, detail="Invalid QRCode ID")
 
@@ -125,9 +137,9 @@ async def update_qr(qrcode_id: str, data: schemas.QRUpdate, request: Request):
     if not q.is_dynamic:
         raise HTTPException(status_code=403, detail="QRCode is not dynamic")
 
-    if request is None:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    require_admin_from_request(request)
+    # codes created before base_url existed get the canonical one on their first save
+    base_url = q.base_url = q.base_url or canonical_base_url(str(request.base_url))
+    rendered = (qr_payload(q.is_dynamic, q.slug, q.content, base_url), q.options)
 
     if data.title is not None:
         q.title = data.title
@@ -140,6 +152,11 @@ async def update_qr(qrcode_id: str, data: schemas.QRUpdate, request: Request):
 
     q.updated_at = datetime.utcnow()
     await q.save()
+    await invalidation_bus.publish("redirect", [q.slug])
+    # Only dynamic codes get here, and their image encodes the slug, not the
+    # target: re-render only when options change or the code becomes static
+    if (qr_payload(q.is_dynamic, q.slug, q.content, base_url), q.options) != rendered:
+        background_tasks.add_task(prerender_images, q, base_url)
     return {
         "id": str(q.id),
         "slug": q.slug,
@@ -152,18 +169,78 @@ async def update_qr(qrcode_id: str, data: schemas.QRUpdate, request: Request):
     }
 
 
-@router.get('/admin/stats')
-async def admin_stats(request: Request):
-    require_admin_from_request(request)
+@router.get('/admin/stats', dependencies=[Depends(require_admin)])
+async def admin_stats():
     total_qr = await models.QRCode.find().count()
     dynamic_qr = await models.QRCode.find(models.QRCode.is_dynamic == True).count()
     total_clicks = await models.Click.find().count()
     return {"total_qr": total_qr, "dynamic_qr": dynamic_qr, "total_clicks": total_clicks}
 
 
+@router.get('/analytics/compare')
+async def compare_analytics(
+    ids: str = Query(..., description="Comma-separated QR code IDs"),
+    days: int = Query(30, ge=1, le=365),
+    granularity: str = Query("day"),
+    tz: str = Query("UTC")
+):
+    """Return click timeseries for several qrcodes on the same buckets."""
+    qrcode_ids = list(dict.fromkeys(i.strip() for i in ids.split(",") if i.strip()))
+    if not qrcode_ids or len(qrcode_ids) > MAX_COMPARE_CODES:
+        raise HTTPException(status_code=400, detail=f"Provide between 1 and {MAX_COMPARE_CODES} QR code IDs")
+    if not all(ObjectId.is_valid(i) for i in qrcode_ids):
+        raise HTTPException(status_code=400, detail="Invalid QRCode ID")
+
+    object_ids = [ObjectId(i) for i in qrcode_ids]
+    try:
+        labels, matrix = await analytics.click_timeseries(object_ids, days, granularity, tz)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return FastJSONResponse({
+        "granularity": granularity,
+        "timezone": tz,
+        "labels": labels,
+        "series": {qid: row for qid, row in zip(qrcode_ids, matrix)},
+        "totals": {qid: total for qid, total in zip(qrcode_ids, matrix.sum(axis=1).tolist())}
+    })
+
+
 @router.get('/{qrcode_id}/analytics')
-async def qrcode_analytics(qrcode_id: str, days: int = Query(30, ge=1, le=365)):
-    """Return timeseries of clicks per day for the given qrcode."""
+async def qrcode_analytics(
+    qrcode_id: str,
+    days: int = Query(30, ge=1, le=365),
+    granularity: str = Query("day"),
+    tz: str = Query("UTC")
+):
+    """Return timeseries of clicks per hour/day/week/month for the given qrcode."""
+    if not ObjectId.is_valid(qrcode_id):
+        raise HTTPException(status_code=400, detail="Invalid QRCode ID")
+
+    q = await models.QRCode.get(qrcode_id)
+    if not q:
+        raise HTTPException(status_code=404, detail="QRCode not found")
+
+    try:
+        labels, matrix = await analytics.click_timeseries([q.id], days, granularity, tz)
+        unique = await uniques.unique_timeseries(q.id, days, granularity, tz)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return FastJSONResponse(analytics_payload(granularity, tz, labels, matrix[0], unique))
+
+
+def analytics_payload(granularity: str, tz: str, labels: list, series, unique) -> dict:
+    """Click series, plus the unique scanner series and total when sketches cover the granularity."""
+    payload = {"granularity": granularity, "timezone": tz, "labels": labels, "series": series}
+    if unique is not None:
+        _, payload["unique"], payload["unique_total"] = unique
+    return payload
+
+
+@router.get('/{qrcode_id}/analytics/devices')
+async def qrcode_device_analytics(qrcode_id: str):
+    """Return device / OS / browser breakdowns for the given qrcode, read from the enrichment rollups."""
     if not ObjectId.is_valid(qrcode_id):
         raise HTTPException(status_code=400, detail="Invalid QRCode ID")
 
@@ -171,29 +248,42 @@ async def qrcode_analytics(qrcode_id: str, days: int = Query(30, ge=1, le=365)):
     if not q:
         raise HTTPException(status_code=404, detail="QRCode not found")
 
-    cutoff = datetime.utcnow() - timedelta(days=days)
+    rows = await models.ClickRollup.find(
+        models.ClickRollup.qrcode_id == q.id,
+        {"dimension": {"$in": list(ROLLUP_DIMENSIONS)}}
+    ).to_list()
+
+    breakdown = {dimension: [] for dimension in ROLLUP_DIMENSIONS}
+    for r in rows:
+        breakdown[r.dimension].append({"label": r.value, "count": r.clicks})
+    for items in breakdown.values():
+        items.sort(key=lambda item: item["count"], reverse=True)
+
+    return {
+        "total": sum(item["count"] for item in breakdown["device"]),
+        **breakdown
+    }
+
 
-    pipeline = [
-        {"$match": {
-            "qrcode_id": q.id,
-            "timestamp": {"$gte": cutoff}
-        }},
-        {"$group": {
-            "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$timestamp"}},
-            "count": {"$sum": 1}
-        }},
-        {"$sort": {"_id": 1}}
-    ]
+@router.get('/{qrcode_id}/analytics/countries')
+async def qrcode_country_analytics(qrcode_id: str):
+    """Return clicks per country for the given qrcode, read from the GeoIP rollups."""
+    if not ObjectId.is_valid(qrcode_id):
+        raise HTTPException(status_code=400, detail="Invalid QRCode ID")
 
-    rows = await models.Click.aggregate(pipeline).to_list()
-    counts = {r["_id"]: r["count"] for r in rows}
+    q = await models.QRCode.get(qrcode_id)
+    if not q:
+        raise HTTPException(status_code=404, detail="QRCode not found")
 
-    # Build timeseries for all days
-    days_list = [(datetime.utcnow() - timedelta(days=i)).date() for i in range(days-1, -1, -1)]
-    series = [counts.get(d.isoformat(), 0) for d in days_list]
-    labels = [d.isoformat() for d in days_list]
+    rows = await models.ClickRollup.find(
+        models.ClickRollup.qrcode_id == q.id,
+        models.ClickRollup.dimension == COUNTRY_DIMENSION
+    ).sort([("clicks", -1)]).to_list()
 
-    return {"labels": labels, "series": series}
+    return {
+        "total": sum(r.clicks for r in rows),
+        "countries": [{"label": r.value, "count": r.clicks} for r in rows]
+    }
 
 
 @router.get('/{qrcode_id}/clicks')
@@ -206,39 +296,53 @@ async def qrcode_clicks(
     if not ObjectId.is_valid(qrcode_id):
         raise HTTPException(status_code=400, detail="Invalid QRCode ID")
 
-    q = await models.QRCode.get(qrcode_id)
-    if not q:
+    qid = ObjectId(qrcode_id)
+    if not await queries.qr_exists(qid):
         raise HTTPException(status_code=404, detail="QRCode not found")
 
     # Get total count
-    total = await models.Click.find(models.Click.qrcode_id == q.id).count()
+    total = await models.Click.find(models.Click.qrcode_id == qid).count()
 
     # Get paginated clicks
     offset = (page - 1) * limit
-    clicks = await models.Click.find(
-        models.Click.qrcode_id == q.id
-    ).sort([("timestamp", -1)]).skip(offset).limit(limit).to_list()
+    clicks = await queries.find_clicks(qid, offset, limit)
 
-    return {
+    return FastJSONResponse({
         "total": total,
         "page": page,
         "limit": limit,
         "pages": (total + limit - 1) // limit if total > 0 else 1,
-        "clicks": [
-            {
-                "id": str(c.id),
-                "timestamp": c.timestamp.isoformat() if c.timestamp else None,
-                "ip": c.ip,
-                "user_agent": c.user_agent,
-                "country": c.country
-            }
-            for c in clicks
-        ]
-    }
+        "clicks": [c.to_dict() for c in clicks]
+    })
 
 
-@router.get("/{qrcode_id}/image")
-async def get_image(qrcode_id: str, request: Request, format: str = Query("png"), size: int = Query(300)):
+@router.get('/clicks/export', dependencies=[Depends(require_admin)])
+async def export_all_clicks(
+    format: str = Query("csv"),
+    start: Optional[datetime] = Query(None),
+    end: Optional[datetime] = Query(None)
+):
+    """Stream the click history of all QR codes as CSV or NDJSON. Requires admin authentication."""
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Unsupported export format")
+
+    return StreamingResponse(
+        stream_clicks(click_export_filter(start=start, end=end), format),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="clicks.{format}"'}
+    )
+
+
+@router.get('/{qrcode_id}/clicks/export', dependencies=[Depends(require_admin)])
+async def export_qrcode_clicks(
+    qrcode_id: str,
+    format: str = Query("csv"),
+    start: Optional[datetime] = Query(None),
+    end: Optional[datetime] = Query(None)
+):
+    """Stream the full click history of a QR code as CSV or NDJSON. Requires admin authentication."""
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Unsupported export format")
     if not ObjectId.is_valid(qrcode_id):
         raise HTTPException(status_code=400, detail="Invalid QRCode ID")
 
@@ -246,53 +350,93 @@ async def get_image(qrcode_id: str, request: Request, format: str = Query("png")
     if not q:
         raise HTTPException(status_code=404, detail="QRCode not found")
 
-    # For dynamic QR codes, encode the redirect URL; for static, encode the content directly
-    if q.is_dynamic:
-        base_url = str(request.base_url).rstrip('/')
-        qr_url = f"{base_url}/q/{q.slug}"
-    else:
-        qr_url = q.content
-
-    qr = make_qr(qr_url)
-    if format == "svg":
-        svg_io = BytesIO()
-        qr.save(svg_io, kind="svg")
-        svg_io.seek(0)
-        return Response(content=svg_io.read(), media_type="image/svg+xml")
+    return StreamingResponse(
+        stream_clicks(click_export_filter(q.id, start, end), format),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="clicks-{q.slug}.{format}"'}
+    )
+
+
+@router.post('/images/export', dependencies=[Depends(require_admin)])
+async def export_images(data: schemas.QRImageExport, request: Request):
+    """
+    Render many QR codes at once, selected by `ids` or by the list filters,
+    streamed as a ZIP of PNG/SVG files or an A4 label-sheet PDF. Requires
+    admin authentication.
+    """
+    if data.format not in IMAGE_EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Unsupported export format")
+    if data.image_format not in IMAGE_FORMATS or (data.format == "pdf" and data.image_format != "png"):
+        raise HTTPException(status_code=400, detail="Unsupported image format")
+
+    query_filter = search_filter(data.search)
+    if data.ids is not None:
+        if not all(ObjectId.is_valid(i) for i in data.ids):
+            raise HTTPException(status_code=400, detail="Invalid QRCode ID")
+        query_filter["_id"] = {"$in": [ObjectId(i) for i in data.ids]}
+    if data.dynamic is not None:
+        query_filter["is_dynamic"] = data.dynamic
+
+    total = await models.QRCode.find(query_filter).count()
+    if not total:
+        raise HTTPException(status_code=404, detail="QRCode not found")
+    max_codes = PDF_EXPORT_MAX_CODES if data.format == "pdf" else IMAGE_EXPORT_MAX_CODES
+    if total > max_codes:
+        raise HTTPException(status_code=400, detail=f"Too many QR codes for one export (max {max_codes})")
+
+    base_url = canonical_base_url(str(request.base_url))
+    if data.format == "pdf":
+        body = stream_qr_pdf(query_filter, base_url, data.size, data.columns, data.rows)
     else:
-        png_io = BytesIO()
-        try:
-            modules_x, modules_y = qr.symbol_size()
-            scale = max(1, int(size // max(modules_x, modules_y)))
-        except Exception:
-            scale = 1
-        qr.save(png_io, kind="png", scale=scale)
-        png_io.seek(0)
-        return StreamingResponse(png_io, media_type="image/png")
+        body = stream_qr_zip(query_filter, base_url, data.image_format, data.size)
+
+    return StreamingResponse(
+        body,
+        media_type=IMAGE_EXPORT_FORMATS[data.format],
+        headers={"Content-Disposition": f'attachment; filename="qrcodes.{data.format}"'}
+    )
+
+
+@router.get("/{qrcode_id}/image")
+async def get_image(qrcode_id: str, request: Request, format: str = Query("png"),
+                    size: int = Query(300, ge=32, le=2000)):
+    if not ObjectId.is_valid(qrcode_id):
+        raise HTTPException(status_code=400, detail="Invalid QRCode ID")
+
+    q = await models.QRCode.get(qrcode_id)
+    if not q:
+        raise HTTPException(status_code=404, detail="QRCode not found")
+
+    # the stored variants were rendered for q.base_url, whatever host serves this request
+    qr_url = qr_payload(q.is_dynamic, q.slug, q.content, q.base_url or canonical_base_url(str(request.base_url)))
+    try:
+        options = parse_options(q.options)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid rendering options: {e}")
+
+    stored = await get_stored_image(q.id, qr_url, q.options, format, size)
+    media_type = IMAGE_FORMATS["svg" if format == "svg" else "png"]
+    if isinstance(stored, str):
+        return FileResponse(stored, media_type=media_type)
+    if stored is not None:
+        return Response(content=stored, media_type=media_type)
+
+    # cold render off the event loop, so a large image does not stall every other request
+    fmt = "svg" if format == "svg" else "png"
+    return Response(content=await asyncio.to_thread(render, qr_url, fmt, size, options), media_type=media_type)
 
 
 @router.get("/slug/{slug}")
 async def get_qr_by_slug(slug: str):
-    q = await models.QRCode.find_one(models.QRCode.slug == slug)
+    q = await queries.find_qr_by_slug(slug)
     if not q:
         raise HTTPException(status_code=404, detail="QRCode not found")
-    return {
-        "id": str(q.id),
-        "slug": q.slug,
-        "title": q.title,
-        "content": q.content,
-        "is_dynamic": q.is_dynamic,
-        "options": q.options,
-        "created_at": q.created_at.isoformat() if q.created_at else None,
-        "updated_at": q.updated_at.isoformat() if q.updated_at else None
-    }
+    return q.to_dict()
 
 
-@router.delete("/{qrcode_id}")
-async def delete_qr(qrcode_id: str, request: Request):
+@router.delete("/{qrcode_id}", dependencies=[Depends(require_admin)])
+async def delete_qr(qrcode_id: str):
     """Delete a single QR code by ID. Requires admin authentication."""
-    require_admin_from_request(request)
-
     if not ObjectId.is_valid(qrcode_id):
         raise HTTPException(status_code=400, detail="Invalid QRCode ID")
 
@@ -300,21 +444,32 @@ async def delete_qr(qrcode_id: str, request: Request):
     if not q:
         raise HTTPException(status_code=404, detail="QRCode not found")
 
-    # Delete associated clicks first
+    # Delete associated clicks first, and take them off the owner's click counter
+    if q.owner_id:
+        deleted_clicks = await models.Click.find(models.Click.qrcode_id == q.id).count()
+        if deleted_clicks:
+            await models.User.find_one(models.User.id == q.owner_id).update({"$inc": {"click_count": -deleted_clicks}})
     await models.Click.find(models.Click.qrcode_id == q.id).delete()
+    await models.ClickRollup.find(models.ClickRollup.qrcode_id == q.id).delete()
+    await delete_images(q.id)
+    await uniques.delete_sketches(q.id)
     await q.delete()
+    await invalidation_bus.publish("redirect", [q.slug])
 
     return {"message": "QR code deleted successfully"}
 
 
-@router.delete("/")
-async def delete_all_qrcodes(request: Request):
+@router.delete("/", dependencies=[Depends(require_admin)])
+async def delete_all_qrcodes():
     """Delete all QR codes. Requires admin authentication."""
-    require_admin_from_request(request)
-
     # Delete all clicks first
     await models.Click.delete_all()
+    await models.ClickRollup.delete_all()
+    await models.User.find_all().update({"$set": {"click_count": 0}})
+    await delete_images()
+    await uniques.delete_sketches()
     # Delete all QR codes
     result = await models.QRCode.delete_all()
+    await invalidation_bus.publish("redirect")
 
     return {"message": f"All QR codes deleted successfully"}
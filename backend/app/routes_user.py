@@ -0,0 +1,74 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Optional
+from bson import ObjectId
+from . import models, analytics, uniques
+from .auth import require_user_id
+from .responses import FastJSONResponse
+from .routes_qr import analytics_payload, paginate_qrcodes
+
+router = APIRouter(prefix="/api/me", tags=["user"])
+
+
+async def get_owned_qr(qrcode_id: str, user_id: ObjectId) -> models.QRCode:
+    if not ObjectId.is_valid(qrcode_id):
+        raise HTTPException(status_code=400, detail="Invalid QRCode ID")
+
+    q = await models.QRCode.find_one({"_id": ObjectId(qrcode_id), "owner_id": user_id})
+    if not q:
+        raise HTTPException(status_code=404, detail="QRCode not found")
+    return q
+
+
+@router.get("/qrcodes")
+async def list_my_qrcodes(
+    dynamic: Optional[bool] = Query(None),
+    search: Optional[str] = Query(None),
+    page: int = Query(1, ge=1),
+    limit: int = Query(20, ge=1, le=100),
+    sort: str = Query("created_desc"),
+    user_id: ObjectId = Depends(require_user_id)
+):
+    """List the caller's QR codes, served by the (owner_id, [is_dynamic,] created_at) indexes."""
+    query_filter = {"owner_id": user_id}
+    if dynamic is not None:
+        query_filter["is_dynamic"] = dynamic
+
+    return FastJSONResponse(await paginate_qrcodes(query_filter, search, page, limit, sort))
+
+
+@router.get("/stats")
+async def my_stats(user_id: ObjectId = Depends(require_user_id)):
+    """Counts for the caller's dashboard; clicks come from the per-user counter, not the clicks collection."""
+    user = await models.User.get(user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    total = await models.QRCode.find({"owner_id": user_id}).count()
+    dynamic = await models.QRCode.find({"owner_id": user_id, "is_dynamic": True}).count()
+
+    return {
+        "total_qrcodes": total,
+        "dynamic_qrcodes": dynamic,
+        "static_qrcodes": total - dynamic,
+        "total_clicks": user.click_count
+    }
+
+
+@router.get("/qrcodes/{qrcode_id}/analytics")
+async def my_qrcode_analytics(
+    qrcode_id: str,
+    days: int = Query(30, ge=1, le=365),
+    granularity: str = Query("day"),
+    tz: str = Query("UTC"),
+    user_id: ObjectId = Depends(require_user_id)
+):
+    """Click timeseries for one of the caller's QR codes (404 for codes owned by someone else)."""
+    q = await get_owned_qr(qrcode_id, user_id)
+
+    try:
+        labels, matrix = await analytics.click_timeseries([q.id], days, granularity, tz)
+        unique = await uniques.unique_timeseries(q.id, days, granularity, tz)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return FastJSONResponse(analytics_payload(granularity, tz, labels, matrix[0], unique))
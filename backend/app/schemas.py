@@ -1,8 +1,9 @@
 from pydantic import BaseModel, EmailStr, Field, field_validator, ConfigDict
-from typing import Optional, Any, Dict, Annotated
+from typing import Optional, Any, Dict, List, Annotated
 from datetime import datetime
 from urllib.parse import urlparse
 from bson import ObjectId
+from .rendering import load_logo, parse_options
 
 # Blocked URL schemes that could be used for phishing or attacks
 BLOCKED_SCHEMES = {'javascript', 'data', 'vbscript', 'file'}
@@ -11,6 +12,15 @@ BLOCKED_SCHEMES = {'javascript', 'data', 'vbscript', 'file'}
 BLOCKED_DOMAINS = set()
 
 
+def validate_render_options(options: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Reject colors, border, error level or logo that the renderer cannot apply."""
+    if options:
+        opts = parse_options(options)
+        if opts.logo:
+            load_logo(opts.logo)
+    return options
+
+
 def validate_url_safety(url: str) -> str:
     """Validate that URL is safe (no javascript:, data:, etc.)"""
     if not url:
@@ -76,6 +86,11 @@ class QRCreate(BaseModel):
     def validate_content(cls, v):
         return validate_url_safety(v)
 
+    @field_validator('options')
+    @classmethod
+    def validate_options(cls, v):
+        return validate_render_options(v)
+
 
 class QRUpdate(BaseModel):
     title: Optional[str] = None
@@ -90,6 +105,22 @@ class QRUpdate(BaseModel):
             return validate_url_safety(v)
         return v
 
+    @field_validator('options')
+    @classmethod
+    def validate_options(cls, v):
+        return validate_render_options(v)
+
+
+class QRImageExport(BaseModel):
+    ids: Optional[List[str]] = None
+    dynamic: Optional[bool] = None
+    search: Optional[str] = None
+    format: str = "zip"
+    image_format: str = "png"
+    size: int = Field(300, ge=50, le=2000)
+    columns: int = Field(4, ge=1, le=10)
+    rows: int = Field(5, ge=1, le=15)
+
 
 class QROut(BaseModel):
     id: str
@@ -0,0 +1,115 @@
+"""
+In-memory static assets for deployments where the app serves /static itself
+(on Vercel the CDN does it, see vercel.json).
+
+Every file under STATIC_DIR is read once, hashed and, for text types,
+precompressed with gzip (and brotli when the `brotli` package is installed).
+Responses carry a strong ETag and are revalidated with If-None-Match;
+versioned URLs built with `static_url()` (`/static/style.css?v=<hash>`) are
+cached as immutable, since a content change yields a new URL.
+"""
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+from typing import Dict, NamedTuple, Optional
+
+from starlette.responses import Response
+
+try:
+    import brotli
+except ImportError:  # optional, gzip only
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "static")
+# Cache lifetime of unversioned /static URLs (revalidated with the ETag after that)
+STATIC_MAX_AGE = int(os.getenv("STATIC_MAX_AGE", 300))
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml", "image/x-icon",
+                      "image/vnd.microsoft.icon")
+
+
+class StaticAsset(NamedTuple):
+    body: bytes
+    media_type: str
+    version: str
+    etag: str
+    gzip: Optional[bytes]
+    br: Optional[bytes]
+
+
+def _compress(body: bytes, media_type: str):
+    if not media_type.startswith(COMPRESSIBLE_TYPES):
+        return None, None
+    gz = gzip.compress(body, compresslevel=9, mtime=0)
+    br = brotli.compress(body, quality=11) if brotli is not None else None
+    # keep a variant only when it actually saves bytes
+    return (gz if len(gz) < len(body) else None), (br if br is not None and len(br) < len(body) else None)
+
+
+def load_asset(body: bytes, name: str) -> StaticAsset:
+    media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    version = hashlib.sha256(body).hexdigest()[:16]
+    return StaticAsset(body, media_type, version, f'"{version}"', *_compress(body, media_type))
+
+
+class StaticAssets:
+    def __init__(self, directory: str = STATIC_DIR):
+        self.directory = directory
+        self.assets: Dict[str, StaticAsset] = {}
+        self.load()
+
+    def load(self):
+        assets = {}
+        for root, _, files in os.walk(self.directory):
+            for filename in files:
+                full_path = os.path.join(root, filename)
+                name = os.path.relpath(full_path, self.directory).replace(os.sep, "/")
+                with open(full_path, "rb") as f:
+                    assets[name] = load_asset(f.read(), name)
+        self.assets = assets
+        logger.info(f"Loaded {len(assets)} static assets from {self.directory}")
+
+    def __len__(self):
+        return len(self.assets)
+
+    def url(self, name: str) -> str:
+        """Versioned URL of an asset, for templates."""
+        asset = self.assets.get(name)
+        return f"/static/{name}?v={asset.version}" if asset is not None else f"/static/{name}"
+
+    def response(self, name: str, headers, version: Optional[str] = None) -> Optional[Response]:
+        """Response for `name` given the request headers, or None when the asset does not exist."""
+        asset = self.assets.get(name)
+        if asset is None:
+            return None
+
+        accepted = {part.split(";")[0].strip() for part in headers.get("accept-encoding", "").lower().split(",")}
+        body, encoding = asset.body, None
+        if asset.br is not None and "br" in accepted:
+            body, encoding = asset.br, "br"
+        elif asset.gzip is not None and "gzip" in accepted:
+            body, encoding = asset.gzip, "gzip"
+
+        response_headers = {
+            # one strong ETag per representation: "<hash>", "<hash>-gzip", "<hash>-br"
+            "ETag": f'"{asset.version}-{encoding}"' if encoding else asset.etag,
+            "Cache-Control": IMMUTABLE if version == asset.version else f"public, max-age={STATIC_MAX_AGE}",
+            "Vary": "Accept-Encoding",
+        }
+        if_none_match = headers.get("if-none-match")
+        if if_none_match and (if_none_match.strip() == "*" or asset.version in [
+            tag.strip().removeprefix("W/").strip('"').split("-")[0] for tag in if_none_match.split(",")
+        ]):
+            return Response(status_code=304, headers=response_headers)
+
+        if encoding:
+            response_headers["Content-Encoding"] = encoding
+        return Response(content=body, media_type=asset.media_type, headers=response_headers)
+
+
+static_assets = StaticAssets()
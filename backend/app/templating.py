@@ -0,0 +1,26 @@
+"""
+The single Jinja2 environment shared by every HTML route.
+
+Templates are compiled once at import and `auto_reload` is off, so
+rendering never stats or re-parses the template files.
+"""
+import os
+
+from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from .static_assets import static_assets
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates")
+
+env = Environment(
+    loader=FileSystemLoader(TEMPLATES_DIR),
+    autoescape=select_autoescape(),
+    auto_reload=False,
+)
+env.globals["static_url"] = static_assets.url
+
+templates = Jinja2Templates(env=env)
+
+for name in env.list_templates():
+    env.get_template(name)
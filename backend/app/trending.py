@@ -0,0 +1,131 @@
+"""
+Trending QR codes: the most scanned slugs of the last 5 minutes, hour and day.
+
+The redirect path offers each counted scan to an in-process tracker that
+keeps, per window, a ring of time slots (5 x 1 min, 12 x 5 min, 24 x 1 h),
+each one a Space-Saving summary of TRENDING_CAPACITY counters; memory is
+constant whatever the traffic. A window's top slugs merge the summaries of
+its slots.
+
+Every TRENDING_FLUSH_INTERVAL seconds the slots that changed are written to
+`trending_slots` (one document per instance and slot, expired by a TTL
+index), and queries merge the other instances' slots with the local ones.
+"""
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from functools import reduce
+from typing import Dict, List, Optional
+
+from pymongo import ReplaceOne
+
+from . import models
+from .invalidation import INSTANCE_ID
+from .sketches import SpaceSaving
+
+logger = logging.getLogger(__name__)
+
+# Counters per time slot; slugs scanned less than 1/capacity of a slot's scans may be missed
+TRENDING_CAPACITY = int(os.getenv("TRENDING_CAPACITY", 200))
+# Seconds between two writes of the local slots to MongoDB (0 = this process only)
+TRENDING_FLUSH_INTERVAL = float(os.getenv("TRENDING_FLUSH_INTERVAL", 30))
+
+# window -> (slot span in seconds, number of slots)
+WINDOWS = {"5m": (60, 5), "1h": (300, 12), "24h": (3600, 24)}
+
+
+class TrendingTracker:
+    def __init__(self, capacity: int = TRENDING_CAPACITY, windows: Dict[str, tuple] = WINDOWS):
+        self.capacity = capacity
+        self.windows = windows
+        self._rings: Dict[str, Dict[int, SpaceSaving]] = {name: {} for name in windows}
+        self._dirty = set()
+
+    def offer(self, slug: str, now: Optional[float] = None):
+        now = time.time() if now is None else now
+        for name, (span, slots) in self.windows.items():
+            start = int(now // span) * span
+            ring = self._rings[name]
+            summary = ring.get(start)
+            if summary is None:
+                summary = ring[start] = SpaceSaving(self.capacity)
+                for old in [s for s in ring if s <= start - slots * span]:
+                    del ring[old]
+            summary.offer(slug)
+            self._dirty.add((name, start))
+
+    def window_start(self, name: str, now: Optional[float] = None) -> int:
+        """Start of the oldest slot of the window (the newest one is still filling)."""
+        span, slots = self.windows[name]
+        now = time.time() if now is None else now
+        return int(now // span) * span - (slots - 1) * span
+
+    def summary(self, name: str, now: Optional[float] = None, others: List[SpaceSaving] = ()) -> SpaceSaving:
+        cutoff = self.window_start(name, now)
+        local = [summary for start, summary in self._rings[name].items() if start >= cutoff]
+        return reduce(SpaceSaving.merge, local + list(others), SpaceSaving(self.capacity))
+
+    def take_dirty(self) -> list:
+        """(window, slot start, summary) of the live slots changed since the last call."""
+        dirty, self._dirty = self._dirty, set()
+        return [(name, start, self._rings[name][start]) for name, start in dirty if start in self._rings[name]]
+
+
+trending = TrendingTracker()
+
+
+async def persist(tracker: TrendingTracker = trending) -> int:
+    """Write the changed slots of this instance; return how many."""
+    slots = tracker.take_dirty()
+    if not slots:
+        return 0
+    try:
+        await write_slots(tracker, slots)
+    except Exception:
+        tracker._dirty.update((name, start) for name, start, _ in slots)  # retried next time
+        raise
+    return len(slots)
+
+
+async def write_slots(tracker: TrendingTracker, slots: list):
+    await models.TrendingSlot.get_motor_collection().bulk_write([
+        ReplaceOne({"_id": f"{INSTANCE_ID}:{name}:{start}"}, {
+            "instance": INSTANCE_ID,
+            "window": name,
+            "start": datetime.utcfromtimestamp(start),
+            "counters": summary.to_list(),
+            "expires_at": datetime.utcfromtimestamp(start + tracker.windows[name][0] * tracker.windows[name][1]),
+        }, upsert=True)
+        for name, start, summary in slots
+    ], ordered=False)
+
+
+async def top_slugs(window: str, limit: int, tracker: TrendingTracker = trending,
+                    shared: bool = TRENDING_FLUSH_INTERVAL > 0) -> list:
+    """Heaviest slugs of `window` as dicts, merged with the other instances' slots when `shared`."""
+    others = []
+    if shared:
+        cursor = models.TrendingSlot.get_motor_collection().find({
+            "window": window,
+            "start": {"$gte": datetime.utcfromtimestamp(tracker.window_start(window))},
+            "instance": {"$ne": INSTANCE_ID},
+        }, {"counters": 1})
+        others = [SpaceSaving.from_list(tracker.capacity, doc["counters"]) async for doc in cursor]
+    return [
+        {"slug": slug, "scans": count, "error": error}
+        for slug, count, error in tracker.summary(window, others=others).top(limit)
+    ]
+
+
+async def run_trending_loop(interval: float = TRENDING_FLUSH_INTERVAL, tracker: TrendingTracker = trending):
+    """Persist the local trending slots every `interval` seconds until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await persist(tracker)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Trending slots persist failed: {e}")
@@ -0,0 +1,114 @@
+"""
+Unique scanners per QR code, from one HyperLogLog sketch per code and UTC day
+(`unique_sketches` collection, see sketches.py).
+
+The click buffer feeds the hashed IPs of each flushed batch; a sketch is
+updated by compare-and-swap on its `version` so concurrent flushes from
+several instances never lose each other's registers. Series merge the daily
+sketches of each bucket, without reading raw clicks.
+"""
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+from pymongo.errors import DuplicateKeyError
+
+from . import models
+from .analytics import bucket_edges, bucket_labels, get_timezone
+from .sketches import HLL_REGISTERS, hll_add, hll_counts, hll_dumps, hll_loads, hll_new
+
+logger = logging.getLogger(__name__)
+
+CAS_ATTEMPTS = 5
+
+
+def sketch_day(timestamp: datetime) -> datetime:
+    return datetime(timestamp.year, timestamp.month, timestamp.day)
+
+
+def sketch_id(qrcode_id, day: datetime) -> str:
+    return f"{qrcode_id}:{day:%Y-%m-%d}"
+
+
+async def add_scanners(clicks: Iterable[Tuple]) -> int:
+    """Fold (qrcode_id, timestamp, ip_hash) clicks into the daily sketches; return sketches written."""
+    groups = defaultdict(list)
+    for qrcode_id, timestamp, ip_hash in clicks:
+        if ip_hash:
+            groups[(qrcode_id, sketch_day(timestamp))].append(ip_hash)
+    if not groups:
+        return 0
+
+    collection = models.UniqueSketch.get_motor_collection()
+    ids = {sketch_id(qrcode_id, day): (qrcode_id, day) for qrcode_id, day in groups}
+    current = {doc["_id"]: doc async for doc in collection.find({"_id": {"$in": list(ids)}})}
+
+    for _id, (qrcode_id, day) in ids.items():
+        hashes = groups[(qrcode_id, day)]
+        doc = current.get(_id)
+        for _ in range(CAS_ATTEMPTS):
+            if doc is None:
+                try:
+                    await collection.insert_one({
+                        "_id": _id, "qrcode_id": qrcode_id, "day": day,
+                        "registers": hll_dumps(hll_add(hll_new(), hashes)),
+                        "version": 1, "updated_at": datetime.utcnow(),
+                    })
+                    break
+                except DuplicateKeyError:
+                    pass  # created concurrently: merge into it
+            else:
+                before = hll_loads(doc["registers"])
+                registers = hll_add(before.copy(), hashes)
+                if np.array_equal(before, registers):
+                    break  # every scanner already counted
+                result = await collection.update_one(
+                    {"_id": _id, "version": doc["version"]},
+                    {"$set": {"registers": hll_dumps(registers), "updated_at": datetime.utcnow()},
+                     "$inc": {"version": 1}}
+                )
+                if result.modified_count:
+                    break
+            doc = await collection.find_one({"_id": _id})
+        else:
+            logger.warning(f"Unique sketch {_id} not updated after {CAS_ATTEMPTS} concurrent attempts")
+    return len(ids)
+
+
+async def unique_timeseries(qrcode_id, days: int, granularity: str = "day",
+                            tz_name: str = "UTC") -> Optional[Tuple[list, np.ndarray, int]]:
+    """
+    Unique scanners per bucket, plus the unique total over the whole range.
+
+    Sketches are per UTC day, so buckets are made of whole UTC days (the
+    timezone only decides which days are in range) and hourly series are
+    not available (None).
+    """
+    if granularity == "hour":
+        return None
+    tz = get_timezone(tz_name)
+    edges, start_utc = bucket_edges(days, granularity, tz)
+
+    cursor = models.UniqueSketch.get_motor_collection().find(
+        {"qrcode_id": qrcode_id, "day": {"$gte": sketch_day(start_utc)}},
+        {"day": 1, "registers": 1}
+    )
+    stack = np.zeros((len(edges) + 1, HLL_REGISTERS), dtype=np.uint8)  # last row: whole range
+    day_edges = edges.astype("datetime64[D]")
+    async for doc in cursor:
+        bucket = np.searchsorted(day_edges, np.datetime64(doc["day"], "D"), side="right") - 1
+        if bucket < 0:
+            continue
+        registers = hll_loads(doc["registers"])
+        np.maximum(stack[bucket], registers, out=stack[bucket])
+        np.maximum(stack[-1], registers, out=stack[-1])
+
+    counts = hll_counts(stack)
+    return bucket_labels(edges), counts[:-1], int(counts[-1])
+
+
+async def delete_sketches(qrcode_id=None):
+    query = {} if qrcode_id is None else {"qrcode_id": qrcode_id}
+    await models.UniqueSketch.get_motor_collection().delete_many(query)
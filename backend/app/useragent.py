@@ -0,0 +1,61 @@
+import re
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+# Scanners are dominated by a handful of phone camera apps and browsers, so
+# the same user-agent strings come back over and over: memoize the parse.
+UA_CACHE_SIZE = 4096
+
+_BOT_RE = re.compile(r"bot|crawler|spider|crawling|slurp|facebookexternalhit|preview|curl|wget|python-requests|httpx", re.IGNORECASE)
+_TABLET_RE = re.compile(r"ipad|tablet|kindle|silk|playbook|(android(?!.*mobile))", re.IGNORECASE)
+_MOBILE_RE = re.compile(r"mobi|iphone|ipod|android|windows phone|blackberry|opera mini", re.IGNORECASE)
+
+# (label, pattern) - first match wins, so order matters (e.g. iOS before macOS,
+# Android before Linux).
+_OS_RULES = [
+    ("Windows Phone", re.compile(r"Windows Phone")),
+    ("iOS", re.compile(r"iPhone|iPad|iPod|CPU (?:iPhone )?OS")),
+    ("Android", re.compile(r"Android")),
+    ("ChromeOS", re.compile(r"CrOS")),
+    ("Windows", re.compile(r"Windows")),
+    ("macOS", re.compile(r"Mac OS X|Macintosh")),
+    ("Linux", re.compile(r"Linux|X11")),
+]
+
+_BROWSER_RULES = [
+    ("Edge", re.compile(r"Edg(?:e|A|iOS)?/")),
+    ("Opera", re.compile(r"OPR/|Opera")),
+    ("Samsung Internet", re.compile(r"SamsungBrowser/")),
+    ("Firefox", re.compile(r"Firefox/|FxiOS/")),
+    ("Chrome", re.compile(r"Chrome/|CriOS/")),
+    ("Safari", re.compile(r"Safari/")),
+]
+
+
+class UserAgentInfo(NamedTuple):
+    device: str
+    os: str
+    browser: str
+
+
+UNKNOWN = UserAgentInfo(device="unknown", os="unknown", browser="unknown")
+
+
+@lru_cache(maxsize=UA_CACHE_SIZE)
+def parse_user_agent(ua: Optional[str]) -> UserAgentInfo:
+    """Normalize a raw User-Agent header into device / os / browser labels."""
+    if not ua:
+        return UNKNOWN
+
+    if _BOT_RE.search(ua):
+        device = "bot"
+    elif _TABLET_RE.search(ua):
+        device = "tablet"
+    elif _MOBILE_RE.search(ua):
+        device = "mobile"
+    else:
+        device = "desktop"
+
+    os_name = next((label for label, rx in _OS_RULES if rx.search(ua)), "other")
+    browser = next((label for label, rx in _BROWSER_RULES if rx.search(ua)), "other")
+    return UserAgentInfo(device=device, os=os_name, browser=browser)
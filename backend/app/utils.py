@@ -3,8 +3,9 @@ import string
 from typing import Optional
 
 
-def generate_slug(length: int = 7) -> str:
-    alphabet = string.ascii_letters + string.digits
+def generate_slug(length: int = 7, compact: bool = False) -> str:
+    # compact slugs (uppercase and digits) keep the redirect URL in QR alphanumeric mode
+    alphabet = string.ascii_uppercase + string.digits if compact else string.ascii_letters + string.digits
     return ''.join(secrets.choice(alphabet) for _ in range(length))
 
 
@@ -0,0 +1,54 @@
+"""
+Timeseries assembly cost for the analytics engine.
+
+Simulates the aggregation output of a dense 1-year hourly comparison across
+50 QR codes and times gap filling + series assembly + label building.
+
+    python benchmarks/bench_analytics.py --codes 50 --days 365 --granularity hour
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend.app import analytics
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--codes", type=int, default=50)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--granularity", default="hour", choices=analytics.GRANULARITIES)
+    parser.add_argument("--tz", default="Europe/Paris")
+    parser.add_argument("--fill", type=float, default=0.6, help="fraction of non-empty buckets")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    tz = analytics.get_timezone(args.tz)
+    edges, _ = analytics.bucket_edges(args.days, args.granularity, tz)
+    key_unit = "h" if args.granularity == "hour" else "D"
+    key_space = np.arange(edges[0].astype(f"datetime64[{key_unit}]"), edges[-1].astype(f"datetime64[{key_unit}]") + 1)
+
+    # One aggregation row per (code, non-empty key), as returned by Mongo
+    n_rows = int(len(key_space) * args.codes * args.fill)
+    flat = rng.choice(len(key_space) * args.codes, size=n_rows, replace=False)
+    code_index = (flat // len(key_space)).astype(np.intp)
+    keys = key_space[flat % len(key_space)]
+    counts = rng.integers(1, 50, size=n_rows)
+
+    t0 = time.perf_counter()
+    matrix = analytics.assemble_series(edges, args.granularity, code_index, keys, counts, args.codes)
+    labels = analytics.bucket_labels(edges)
+    series = matrix.tolist()
+    elapsed = time.perf_counter() - t0
+
+    print(f"buckets:       {len(labels)} x {len(series)} codes")
+    print(f"rows:          {n_rows}")
+    print(f"assembly:      {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Admin authentication overhead per request.
+
+Compares require_admin_from_request with the verification cache disabled
+(every call runs jwt.decode, the previous behaviour) and enabled (the same
+cookie verified once, then served from the cache).
+
+    python benchmarks/bench_auth.py --requests 20000
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from starlette.requests import Request
+
+from backend.app import auth
+
+
+def make_request(token: str) -> Request:
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/api/admin/stats",
+        "headers": [(b"cookie", f"admin_token={token}".encode())],
+    }
+    return Request(scope)
+
+
+def run(token: str, n: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(n):
+        # A fresh Request per call, like one dashboard API call each
+        auth.require_admin_from_request(make_request(token))
+    return (time.perf_counter() - t0) / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    token = auth.create_access_token({"admin": True}, expires_delta=timedelta(days=1))
+
+    cache_size = auth.TOKEN_CACHE_SIZE
+    auth.TOKEN_CACHE_SIZE = 0
+    auth._token_cache.clear()
+    uncached = run(token, args.requests)
+
+    auth.TOKEN_CACHE_SIZE = cache_size or 1024
+    cached = run(token, args.requests)
+
+    print(f"requests:      {args.requests}")
+    print(f"no cache:      {uncached * 1e6:.1f} us/request")
+    print(f"token cache:   {cached * 1e6:.1f} us/request")
+    print(f"speedup:       {uncached / cached:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""
+Endpoint load test: throughput and latency percentiles of the hot routes.
+
+Boots the app in-process (httpx ASGI transport) against a local mongod or,
+with --mock, an in-process mongomock database; seeds --codes QR codes and
+--clicks clicks into a dedicated database (dropped afterwards unless --keep),
+then drives each scenario with --concurrency concurrent clients:
+
+    redirect        GET /q/{slug}
+    create          POST /api/qrcodes/
+    list            GET /api/qrcodes/ (first page)
+    list_search     GET /api/qrcodes/?search=...
+    list_deep       GET /api/qrcodes/?page=<last pages>
+    analytics       GET /api/qrcodes/{id}/analytics
+    image           GET /api/qrcodes/{id}/image (pre-rendered size)
+    image_render    GET /api/qrcodes/{id}/image?size=600 (rendered per request)
+
+Results are printed and written as JSON (with the git commit) so runs can be
+compared between commits with --compare:
+
+    python benchmarks/bench_endpoints.py --mock --codes 2000 --clicks 50000
+    MONGODB_URL=mongodb://localhost:27017 python benchmarks/bench_endpoints.py \\
+        --output results/main.json
+    python benchmarks/bench_endpoints.py --mock --compare results/main.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+SCENARIOS = ("redirect", "create", "list", "list_search", "list_deep", "analytics", "image", "image_render")
+
+
+def percentile(values, p):
+    values = sorted(values)
+    k = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+    return values[k]
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(__file__), text=True
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+async def seed(models, n_codes: int, n_clicks: int) -> list:
+    """Insert codes and clicks with raw bulk writes; return the codes as (id, slug) pairs."""
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    codes = []
+    for start in range(0, n_codes, 5000):
+        docs = [{
+            "slug": f"b{i:07d}",
+            "title": f"Bench code {i}",
+            "content": f"https://example.com/landing/{i}",
+            "owner_id": None,
+            "is_dynamic": i % 2 == 0,
+            "options": {},
+            "created_at": now - timedelta(minutes=i),
+            "updated_at": now - timedelta(minutes=i),
+        } for i in range(start, min(n_codes, start + 5000))]
+        result = await models.QRCode.get_motor_collection().insert_many(docs)
+        codes.extend(zip(result.inserted_ids, (d["slug"] for d in docs)))
+
+    for start in range(0, n_clicks, 10000):
+        docs = [{
+            "qrcode_id": rng.choice(codes)[0],
+            "timestamp": now - timedelta(seconds=rng.randrange(30 * 86400)),
+            "ip": f"{rng.getrandbits(64):016x}",
+            "user_agent": "Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X)",
+            "country": None,
+        } for _ in range(min(n_clicks, start + 10000) - start)]
+        await models.Click.get_motor_collection().insert_many(docs, ordered=False)
+    return codes
+
+
+def scenario_requests(name: str, codes: list, n_codes: int, rng: random.Random):
+    """Return a function producing the (method, path, json) of the next request."""
+    last_page = max(1, n_codes // 20)
+
+    def pick():
+        return rng.choice(codes)
+
+    return {
+        "redirect": lambda: ("GET", f"/q/{pick()[1]}", None),
+        "create": lambda: ("POST", "/api/qrcodes/", {"content": f"https://example.com/new/{rng.getrandbits(32)}"}),
+        "list": lambda: ("GET", "/api/qrcodes/?limit=20", None),
+        "list_search": lambda: ("GET", f"/api/qrcodes/?search=code%20{rng.randrange(100)}&limit=20", None),
+        "list_deep": lambda: ("GET", f"/api/qrcodes/?limit=20&page={max(1, last_page - rng.randrange(10))}", None),
+        "analytics": lambda: ("GET", f"/api/qrcodes/{pick()[0]}/analytics?days=30", None),
+        "image": lambda: ("GET", f"/api/qrcodes/{pick()[0]}/image", None),
+        "image_render": lambda: ("GET", f"/api/qrcodes/{pick()[0]}/image?size=600", None),
+    }[name]
+
+
+async def run_scenario(client, next_request, n_requests: int, concurrency: int) -> dict:
+    latencies = []
+    errors = 0
+    remaining = n_requests
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            method, path, body = next_request()
+            t0 = time.perf_counter()
+            r = await client.request(method, path, json=body, follow_redirects=False)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            if r.status_code >= 400:
+                errors += 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "max_ms": round(max(latencies), 3),
+    }
+
+
+def print_results(results: dict, baseline: dict = None):
+    header = f"{'scenario':14} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}"
+    if baseline:
+        header += f" {'req/s vs base':>14} {'p95 vs base':>12}"
+    print(header)
+    for name, row in results.items():
+        line = (f"{name:14} {row['rps']:9.1f} {row['p50_ms']:9.2f} {row['p95_ms']:9.2f} "
+                f"{row['p99_ms']:9.2f} {row['errors']:7}")
+        base = (baseline or {}).get(name)
+        if base:
+            line += f" {row['rps'] / base['rps'] - 1:+13.1%} {row['p95_ms'] / base['p95_ms'] - 1:+11.1%}"
+        print(line)
+
+
+async def main(args):
+    import httpx
+    from backend.app import db, models
+    from backend.app.main import app
+
+    if args.mock:
+        from mongomock_motor import AsyncMongoMockClient
+        db.AsyncIOMotorClient = lambda *a, **k: AsyncMongoMockClient()
+    os.environ["MONGODB_DB_NAME"] = args.db
+    await db.init_db()
+
+    try:
+        t0 = time.perf_counter()
+        codes = await seed(models, args.codes, args.clicks)
+        print(f"seeded {args.codes} codes and {args.clicks} clicks in {time.perf_counter() - t0:.1f} s")
+
+        rng = random.Random(7)
+        results = {}
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name in args.scenarios:
+                next_request = scenario_requests(name, codes, args.codes, rng)
+                await run_scenario(client, next_request, min(50, args.requests), args.concurrency)  # warm-up
+                results[name] = await run_scenario(client, next_request, args.requests, args.concurrency)
+    finally:
+        if not args.keep:
+            await db.get_db().client.drop_database(args.db)
+        await db.close_db()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+    print_results(results, baseline)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.utcnow().isoformat(),
+            "database": "mongomock" if args.mock else "mongod",
+            "codes": args.codes,
+            "clicks": args.clicks,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "python": platform.python_version(),
+        },
+        "results": results,
+    }
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--codes", type=int, default=2000)
+    parser.add_argument("--clicks", type=int, default=50000)
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--mock", action="store_true", help="use an in-process mongomock database")
+    parser.add_argument("--db", default="qrgen_bench", help="database to seed (dropped at the end)")
+    parser.add_argument("--keep", action="store_true", help="keep the seeded database")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of a previous run to compare against")
+    asyncio.run(main(parser.parse_args()))
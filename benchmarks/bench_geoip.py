@@ -0,0 +1,53 @@
+"""
+GeoIP lookup throughput.
+
+Builds a synthetic range table the size of a real country database
+(~300k IPv4 ranges by default) and measures how many lookups per second the
+in-memory bisect index sustains.
+
+    python benchmarks/bench_geoip.py --ranges 300000 --lookups 200000
+"""
+import argparse
+import os
+import random
+import socket
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend.app.geoip import GeoIPIndex
+
+COUNTRIES = ["FR", "US", "DE", "GB", "ES", "IT", "BE", "CH", "CA", "JP", "BR", "IN"]
+
+
+def build_ranges(n: int):
+    bounds = sorted(random.sample(range(1, 0xFFFFFFFF), n * 2))
+    return [(bounds[i], bounds[i + 1], random.choice(COUNTRIES)) for i in range(0, len(bounds), 2)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ranges", type=int, default=300_000)
+    parser.add_argument("--lookups", type=int, default=200_000)
+    args = parser.parse_args()
+
+    random.seed(42)
+    t0 = time.perf_counter()
+    index = GeoIPIndex(build_ranges(args.ranges))
+    build_s = time.perf_counter() - t0
+
+    ips = [socket.inet_ntoa(struct.pack(">I", random.getrandbits(32))) for _ in range(args.lookups)]
+    t0 = time.perf_counter()
+    hits = sum(1 for ip in ips if index.lookup(ip))
+    elapsed = time.perf_counter() - t0
+
+    print(f"ranges:        {len(index)}")
+    print(f"build:         {build_s * 1000:.1f} ms")
+    print(f"lookups:       {args.lookups} ({hits} resolved)")
+    print(f"throughput:    {args.lookups / elapsed:,.0f} lookups/s")
+    print(f"per lookup:    {elapsed / args.lookups * 1e6:.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Serialization time and response size of the admin dashboard's heaviest
+JSON payloads: stdlib JSONResponse behind FastAPI's jsonable_encoder (what a
+plain dict return costs) vs FastJSONResponse returned directly.
+
+Payloads are built in memory with the shapes the endpoints return:
+
+    list        GET /api/qrcodes/?limit=100
+    clicks      GET /api/qrcodes/{id}/clicks?limit=100
+    hourly      GET /api/qrcodes/{id}/analytics?days=365&granularity=hour
+    compare     GET /api/qrcodes/analytics/compare (20 codes, 365 days)
+
+Sizes are reported raw and gzipped at GZIP_COMPRESS_LEVEL.
+
+    python benchmarks/bench_json.py --repeat 200
+"""
+import argparse
+import gzip
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from bson import ObjectId
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def payloads(rows: int) -> dict:
+    from backend.app.queries import ClickRecord, QRRecord
+
+    now = datetime.utcnow()
+    rng = np.random.default_rng(42)
+    options = {"dark": "#1a237e", "light": "#ffffff", "border": 2, "error": "Q"}
+    codes = [QRRecord({
+        "_id": ObjectId(), "slug": f"json{i:05d}", "title": f"Campaign poster {i}",
+        "content": f"https://example.com/landing/{i}?utm_source=qr", "is_dynamic": True,
+        "options": options, "created_at": now - timedelta(minutes=i), "updated_at": now,
+    }) for i in range(rows)]
+    clicks = [ClickRecord({
+        "_id": ObjectId(), "timestamp": now - timedelta(seconds=i), "ip": f"{i:016x}",
+        "user_agent": "Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X)", "country": "FR",
+    }) for i in range(rows)]
+    hours = [(now - timedelta(hours=h)).strftime("%Y-%m-%dT%H:00") for h in range(365 * 24)][::-1]
+    days = [(now - timedelta(days=d)).strftime("%Y-%m-%d") for d in range(365)][::-1]
+    hourly = rng.integers(0, 50, size=(1, len(hours)))
+    daily = rng.integers(0, 500, size=(20, len(days)))
+    ids = [str(ObjectId()) for _ in range(20)]
+
+    page = {"total": 5000, "page": 1, "limit": rows, "pages": 5000 // rows}
+    return {
+        "list": {**page, "items": [{**r.to_dict(), "click_count": 12} for r in codes]},
+        "clicks": {**page, "clicks": [c.to_dict() for c in clicks]},
+        "hourly": {"granularity": "hour", "timezone": "UTC", "labels": hours, "series": hourly[0]},
+        "compare": {
+            "granularity": "day", "timezone": "UTC", "labels": days,
+            "series": dict(zip(ids, daily)),
+            "totals": dict(zip(ids, daily.sum(axis=1).tolist())),
+        },
+    }
+
+
+def as_plain(value):
+    # what the endpoints returned before: numpy arrays converted with tolist()
+    if isinstance(value, dict):
+        return {k: as_plain(v) for k, v in value.items()}
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return value
+
+
+def per_call_ms(fn, repeat: int) -> float:
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat * 1000
+
+
+def main(args):
+    from fastapi.encoders import jsonable_encoder
+    from starlette.responses import JSONResponse
+    from backend.app.responses import GZIP_COMPRESS_LEVEL, FastJSONResponse, orjson
+
+    print(f"serializer: {'orjson ' + orjson.__version__ if orjson else 'json (orjson not installed)'}")
+    print(f"{'payload':9} {'encoder+json ms':>16} {'fast ms':>8} {'speedup':>8} {'bytes':>9} {'gzip bytes':>11}")
+    for name, content in payloads(args.rows).items():
+        plain = as_plain(content)
+        before = per_call_ms(lambda: JSONResponse(jsonable_encoder(plain)).body, args.repeat)
+        after = per_call_ms(lambda: FastJSONResponse(content).body, args.repeat)
+        body = FastJSONResponse(content).body
+        compressed = gzip.compress(body, compresslevel=GZIP_COMPRESS_LEVEL)
+        print(f"{name:9} {before:16.3f} {after:8.3f} {before / after:7.1f}x {len(body):9} {len(compressed):11}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100, help="rows per list / clicks page")
+    parser.add_argument("--repeat", type=int, default=200)
+    main(parser.parse_args())
@@ -0,0 +1,133 @@
+"""
+Per-row cost of reading QR codes and clicks: Beanie document hydration vs
+the lean projection records of queries.py.
+
+"hydrate" times only the conversion of already-fetched raw documents into
+response dicts (Beanie parse + hand-built dict vs __slots__ record +
+to_dict); "query" times a full page read through the database as well.
+
+    python benchmarks/bench_lean.py --mock --page 100
+    MONGODB_URL=mongodb://localhost:27017 python benchmarks/bench_lean.py --page 100
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def qr_dict(r):
+    # the dict the list endpoint used to build from Beanie documents
+    return {
+        "id": str(r.id),
+        "slug": r.slug,
+        "title": r.title,
+        "content": r.content,
+        "is_dynamic": r.is_dynamic,
+        "options": r.options,
+        "created_at": r.created_at.isoformat() if r.created_at else None,
+        "updated_at": r.updated_at.isoformat() if r.updated_at else None,
+    }
+
+
+def click_dict(c):
+    return {
+        "id": str(c.id),
+        "timestamp": c.timestamp.isoformat() if c.timestamp else None,
+        "ip": c.ip,
+        "user_agent": c.user_agent,
+        "country": c.country,
+    }
+
+
+def per_row_us(fn, rows: int, repeat: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / (repeat * rows) * 1e6
+
+
+async def per_row_us_async(fn, rows: int, repeat: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        await fn()
+    return (time.perf_counter() - t0) / (repeat * rows) * 1e6
+
+
+async def main(args):
+    from beanie.odm.utils.parsing import parse_obj
+    from backend.app import db, models, queries
+
+    if args.mock:
+        from mongomock_motor import AsyncMongoMockClient
+        db.AsyncIOMotorClient = lambda *a, **k: AsyncMongoMockClient()
+    os.environ["MONGODB_DB_NAME"] = args.db
+    await db.init_db()
+
+    now = datetime.utcnow()
+    options = {"dark": "#1a237e", "light": "#ffffff", "border": 2, "error": "Q"}
+    codes = [{
+        "slug": f"lean{i:05d}", "title": f"Lean code {i}", "content": f"https://example.com/{i}",
+        "owner_id": None, "is_dynamic": True, "options": options,
+        "created_at": now - timedelta(minutes=i), "updated_at": now,
+    } for i in range(args.page)]
+    qr_ids = (await models.QRCode.get_motor_collection().insert_many(codes)).inserted_ids
+    clicks = [{
+        "qrcode_id": qr_ids[0], "timestamp": now - timedelta(seconds=i), "ip": f"{i:016x}",
+        "user_agent": "Mozilla/5.0 (Linux; Android 14)", "country": "FR",
+        "device": None, "os": None, "browser": None, "enriched_at": None,
+    } for i in range(args.page)]
+    await models.Click.get_motor_collection().insert_many(clicks)
+
+    try:
+        raw_codes = await models.QRCode.get_motor_collection().find({"_id": {"$in": qr_ids}}).to_list(None)
+        raw_clicks = await models.Click.get_motor_collection().find({"qrcode_id": qr_ids[0]}).to_list(None)
+        n = args.page
+
+        rows = [
+            ("QR hydrate", per_row_us(lambda: [qr_dict(parse_obj(models.QRCode, d)) for d in raw_codes], n, args.repeat),
+             per_row_us(lambda: [queries.QRRecord(d).to_dict() for d in raw_codes], n, args.repeat)),
+            ("click hydrate", per_row_us(lambda: [click_dict(parse_obj(models.Click, d)) for d in raw_clicks], n, args.repeat),
+             per_row_us(lambda: [queries.ClickRecord(d).to_dict() for d in raw_clicks], n, args.repeat)),
+        ]
+
+        async def beanie_qr_page():
+            docs = await models.QRCode.find({"_id": {"$in": qr_ids}}).sort([("created_at", -1)]).limit(n).to_list()
+            return [qr_dict(d) for d in docs]
+
+        async def lean_qr_page():
+            records = await queries.find_qrcodes({"_id": {"$in": qr_ids}}, [("created_at", -1)], 0, n)
+            return [r.to_dict() for r in records]
+
+        async def beanie_click_page():
+            docs = await models.Click.find(models.Click.qrcode_id == qr_ids[0]).sort([("timestamp", -1)]).limit(n).to_list()
+            return [click_dict(d) for d in docs]
+
+        async def lean_click_page():
+            return [c.to_dict() for c in await queries.find_clicks(qr_ids[0], 0, n)]
+
+        query_repeat = max(1, args.repeat // 10)
+        rows.append(("QR query", await per_row_us_async(beanie_qr_page, n, query_repeat),
+                     await per_row_us_async(lean_qr_page, n, query_repeat)))
+        rows.append(("click query", await per_row_us_async(beanie_click_page, n, query_repeat),
+                      await per_row_us_async(lean_click_page, n, query_repeat)))
+    finally:
+        await db.get_db().client.drop_database(args.db)
+        await db.close_db()
+
+    print(f"page size: {args.page} rows ({'mongomock' if args.mock else 'mongod'})")
+    print(f"{'':14} {'beanie us/row':>14} {'lean us/row':>12} {'speedup':>8}")
+    for label, before, after in rows:
+        print(f"{label:14} {before:14.2f} {after:12.2f} {before / after:7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--mock", action="store_true", help="use an in-process mongomock database")
+    parser.add_argument("--db", default="qrgen_bench", help="scratch database (dropped at the end)")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,107 @@
+"""
+Redirect latency during a login storm.
+
+Measures /q/{slug} latency percentiles on an idle app, then keeps issuing
+redirects for as long as a burst of concurrent /auth/login calls (bcrypt
+verification) is running.
+With --inline, bcrypt runs on the event loop like before the thread pool
+offload, for comparison.
+
+    python benchmarks/bench_login_storm.py --mock --logins 20 --redirects 200
+    MONGODB_URL=mongodb://localhost:27017 python benchmarks/bench_login_storm.py
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def percentile(values, p):
+    values = sorted(values)
+    k = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+    return values[k]
+
+
+async def measure_redirects(client, slug, n, until=None, interval=0.005):
+    """
+    Issue a redirect every `interval` seconds (open loop, like independent
+    scanners) - `n` of them, or until the `until` future is done - and return
+    their latencies. A blocked event loop shows up as queued, slow requests.
+    """
+    latencies = []
+
+    async def one():
+        t0 = time.perf_counter()
+        r = await client.get(f"/q/{slug}", follow_redirects=False)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        assert r.status_code in (302, 307)
+
+    tasks = []
+    while (until is not None and not until.done()) or (until is None and len(tasks) < n):
+        tasks.append(asyncio.create_task(one()))
+        await asyncio.sleep(interval)
+    await asyncio.gather(*tasks)
+    return latencies
+
+
+def report(label, latencies):
+    print(f"{label:24} p50={statistics.median(latencies):7.2f} ms  "
+          f"p99={percentile(latencies, 99):7.2f} ms  max={max(latencies):7.2f} ms")
+
+
+async def main(args):
+    import httpx
+    from backend.app import auth, db, models
+    from backend.app.main import app
+
+    if args.mock:
+        from mongomock_motor import AsyncMongoMockClient
+        db.AsyncIOMotorClient = lambda *a, **k: AsyncMongoMockClient()
+    os.environ.setdefault("MONGODB_DB_NAME", "qrgen_bench")
+    await db.init_db()
+
+    if args.inline:
+        async def inline_verify(plain, hashed):
+            return auth.verify_password(plain, hashed)
+        auth.verify_password_async = inline_verify
+
+    email, password = "storm@example.com", "correct horse"
+    await models.User.find(models.User.email == email).delete()
+    await models.User(email=email, hashed_password=auth.get_password_hash(password), is_active=True, is_verified=True).insert()
+    q = models.QRCode(slug="benchstorm", content="https://example.com", is_dynamic=True)
+    await models.QRCode.find(models.QRCode.slug == q.slug).delete()
+    await q.insert()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await measure_redirects(client, q.slug, 20)  # warm-up
+        report("idle", await measure_redirects(client, q.slug, args.redirects))
+
+        async def login():
+            r = await client.post("/auth/login", json={"email": email, "password": password})
+            assert r.status_code == 200, r.text
+
+        t0 = time.perf_counter()
+        storm = asyncio.gather(*(login() for _ in range(args.logins)))
+        latencies = await measure_redirects(client, q.slug, 0, until=storm)
+        await storm
+        mode = "inline bcrypt" if args.inline else "bcrypt pool"
+        report(f"{args.logins} logins ({mode})", latencies)
+        print(f"{'':24} {len(latencies)} redirects served during {time.perf_counter() - t0:.2f} s of logins")
+
+    await models.QRCode.find(models.QRCode.slug == q.slug).delete()
+    await models.User.find(models.User.email == email).delete()
+    await db.close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=20)
+    parser.add_argument("--redirects", type=int, default=200)
+    parser.add_argument("--mock", action="store_true", help="use an in-process mongomock database")
+    parser.add_argument("--inline", action="store_true", help="verify passwords on the event loop (old behaviour)")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,58 @@
+"""
+PNG encoding time for QR images: segno's generic writer vs the NumPy
+matrix encoder used by the image endpoint.
+
+The segno column is the previous path (qr.save(kind="png") into a BytesIO);
+both start from the same QR symbol, so only encoding is timed.
+
+    python benchmarks/bench_png.py --repeat 200 --sizes 100 300 600 1000 2000
+"""
+import argparse
+import os
+import sys
+import time
+from io import BytesIO
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from segno import make as make_qr
+
+from backend.app.rendering import encode_matrix_png
+
+
+def timed(fn, repeat: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 300, 600, 1000, 2000])
+    parser.add_argument("--data", default="https://qrgen.example.com/q/Ab3xYz9")
+    args = parser.parse_args()
+
+    qr = make_qr(args.data)
+    modules = qr.symbol_size()[0]
+    print(f"symbol:  version {qr.version}, {modules} modules with border")
+    print(f"{'size':>6} {'scale':>6} {'segno ms':>10} {'numpy ms':>10} {'speedup':>8} {'segno B':>8} {'numpy B':>8}")
+    for size in args.sizes:
+        scale = max(1, size // modules)
+
+        def segno_png():
+            out = BytesIO()
+            qr.save(out, kind="png", scale=scale)
+            return out.getvalue()
+
+        def numpy_png():
+            return encode_matrix_png(qr.matrix, scale, 4)
+
+        old = timed(segno_png, args.repeat)
+        new = timed(numpy_png, args.repeat)
+        print(f"{size:6} {scale:6} {old * 1000:10.3f} {new * 1000:10.3f} {old / new:7.1f}x "
+              f"{len(segno_png()):8} {len(numpy_png()):8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Symbol size and render time of dynamic QR codes: the byte-mode redirect URL
+(`https://host/q/AbC1x9Z`) vs the compact one (`HTTPS://HOST/Q/ABC1X9Z`,
+QR_COMPACT_URLS=true) that fits the alphanumeric mode.
+
+For each error-correction level, prints the symbol version segno picks
+(the smallest that holds the payload at that level), the modules per side,
+the PNG size and the time of a full render (encoding + PNG).
+
+    python benchmarks/bench_qr_compact.py --base-url https://dynamique-qrcode.vercel.app --renders 300
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from segno import make as make_qr
+
+from backend.app import rendering
+from backend.app.utils import generate_slug
+
+
+def run(payloads: list, size: int, error: str) -> tuple:
+    opts = rendering.RenderOptions(error=error)
+    t0 = time.perf_counter()
+    total = 0
+    for payload in payloads:
+        total += len(rendering.render_png(payload, size, opts))
+    elapsed = time.perf_counter() - t0
+    return elapsed / len(payloads) * 1000, total // len(payloads)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="https://dynamique-qrcode.vercel.app")
+    parser.add_argument("--renders", type=int, default=300)
+    parser.add_argument("--size", type=int, default=300)
+    args = parser.parse_args()
+
+    base = args.base_url.rstrip("/")
+    slugs = [generate_slug(7, compact=True) for _ in range(args.renders)]
+    # same slugs in both columns, so only the encoding mode differs
+    byte_urls = [f"{base}/q/{slug[:3].lower()}{slug[3:]}" for slug in slugs]
+    compact_urls = [rendering.compact_redirect_url(slug, base) for slug in slugs]
+    if compact_urls[0] is None:
+        sys.exit(f"{base} has a path prefix or non-alphanumeric characters: no compact URL")
+
+    print(f"payloads:  {byte_urls[0]}  vs  {compact_urls[0]}")
+    print(f"renders:   {args.renders} x {args.size}px PNG per cell")
+    print(f"{'level':6}{'mode':14}{'version':>8}{'modules':>9}{'PNG bytes':>11}{'ms/image':>10}")
+    for error in ("L", "M", "Q", "H"):
+        for urls in (byte_urls, compact_urls):
+            qr = make_qr(urls[0], error=error)
+            ms, png_bytes = run(urls, args.size, error)
+            print(f"{error:6}{qr.mode:14}{qr.version:>8}{qr.symbol_size(border=0)[0]:>9}{png_bytes:>11,}{ms:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
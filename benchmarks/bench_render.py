@@ -0,0 +1,63 @@
+"""
+QR image render throughput with and without rendering options.
+
+Renders PNGs of distinct URLs with the default style, with custom colors,
+with a centered logo (decoded once, resized variants cached) and with a
+logo whose caches are cleared before every render (decode + resize per
+request, the cost the caches remove).
+
+    python benchmarks/bench_render.py --renders 300 --size 300
+"""
+import argparse
+import base64
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from PIL import Image, ImageDraw
+
+from backend.app import rendering
+
+
+def make_logo(side: int = 512) -> str:
+    image = Image.new("RGBA", (side, side), (0, 0, 0, 0))
+    ImageDraw.Draw(image).ellipse((0, 0, side - 1, side - 1), fill=(220, 40, 60, 255))
+    out = io.BytesIO()
+    image.save(out, format="PNG")
+    return "data:image/png;base64," + base64.b64encode(out.getvalue()).decode()
+
+
+def run(n: int, size: int, options: dict, clear_cache: bool = False) -> float:
+    opts = rendering.parse_options(options)
+    t0 = time.perf_counter()
+    for i in range(n):
+        if clear_cache:
+            rendering.load_logo.cache_clear()
+            rendering.logo_variant.cache_clear()
+        rendering.render_png(f"https://example.com/q/{i:07d}", size, opts)
+    return n / (time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--renders", type=int, default=300)
+    parser.add_argument("--size", type=int, default=300)
+    args = parser.parse_args()
+
+    logo = make_logo()
+    cases = [
+        ("default", {}, False),
+        ("colors", {"dark": "#1a237e", "light": "#fffde7", "border": 2}, False),
+        ("logo (cached)", {"logo": logo}, False),
+        ("logo (no cache)", {"logo": logo}, True),
+    ]
+    print(f"renders:       {args.renders} x {args.size}px PNG")
+    for label, options, clear_cache in cases:
+        rate = run(args.renders, args.size, options, clear_cache)
+        print(f"{label + ':':15}{rate:8,.0f} images/s  {1000 / rate:6.2f} ms/image")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,35 @@
 import sys
 import os
+import asyncio
 import pytest
 
 # make sure the repository root is on sys.path for test collection
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-# Use a dedicated test sqlite file for consistency across the TestClient and app imports
-import os
-test_db_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.test.db'))
-os.environ.setdefault('DATABASE_URL', f'sqlite:///{test_db_path}')
+# Tests run against a dedicated database: a real mongod when MONGODB_URL is
+# set, otherwise an in-process mongomock (pip install -r requirements-dev.txt).
+os.environ.setdefault("MONGODB_DB_NAME", "qrgen_test")
+os.environ.setdefault("ADMIN_PASSWORD", "pw")
+
+from backend.app import db
 
-from backend.app.db import Base, engine
-from backend.app import models  # Ensure models are imported so table metadata is registered
+if not (os.getenv("MONGODB_URL") or os.getenv("MONGODB_URI")):
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        # without it every test would wait for a server-selection timeout on localhost
+        pytest.exit(
+            "No test database: pip install -r requirements-dev.txt (mongomock-motor), "
+            "or set MONGODB_URL to a disposable mongod",
+            returncode=4,
+        )
+    db.AsyncIOMotorClient = lambda *args, **kwargs: AsyncMongoMockClient()
 
 
 @pytest.fixture(scope="session", autouse=True)
 def prepare_db():
-    # Create tables for tests and drop them at the end
-    Base.metadata.create_all(bind=engine)
+    # Initialize Beanie once for module-level TestClients, drop the test database at the end
+    asyncio.run(db.init_db())
     yield
-    Base.metadata.drop_all(bind=engine)
+    asyncio.run(db._client.drop_database(os.environ["MONGODB_DB_NAME"]))
+    asyncio.run(db.close_db())
@@ -6,7 +6,6 @@ from fastapi.testclient import TestClient
 
 # ensure project root is importable
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from backend.app.db import Base, engine
 
 from backend.app.main import app
 client = TestClient(app)
@@ -30,13 +29,13 @@ def test_admin_login_and_protected_routes(monkeypatch):
     assert r3.status_code == 401 or r3.status_code == 403
 
     # login as admin (form submit)
-    r4 = client.post('/admin/login', data={'password': 'secretpw'}, allow_redirects=False)
+    r4 = client.post('/admin/login', data={'password': 'secretpw'}, follow_redirects=False)
     assert r4.status_code in (302, 307)
     assert 'admin_token' in r4.cookies
 
     # follow redirect and access dashboard
     client.cookies.set('admin_token', r4.cookies['admin_token'])
-    r5 = client.get('/dashboard')
+    r5 = client.get('/admin')
     assert r5.status_code == 200
 
     # call stats endpoint
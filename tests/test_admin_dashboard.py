@@ -0,0 +1,54 @@
+import sys
+import os
+import asyncio
+from datetime import datetime
+
+from fastapi.testclient import TestClient
+
+# ensure project root is importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("ADMIN_PASSWORD", "testpass")
+from backend.app.main import app
+from backend.app import models
+
+client = TestClient(app)
+
+
+def admin_client():
+    r = client.post("/admin/login", data={"password": os.environ["ADMIN_PASSWORD"]}, follow_redirects=False)
+    client.cookies.set("admin_token", r.cookies["admin_token"])
+    return client
+
+
+def test_dashboard_bundles_stats_list_and_click_previews():
+    c = admin_client()
+    qid = c.post("/api/qrcodes/", json={"content": "https://example.com/dash", "title": "dashboard", "is_dynamic": True}).json()["id"]
+    code = asyncio.run(models.QRCode.get(qid))
+    asyncio.run(models.Click.insert_many([
+        models.Click(qrcode_id=code.id, timestamp=datetime.utcnow(), ip=f"{i:016x}") for i in range(12)
+    ]))
+
+    r = c.get("/api/admin/dashboard?search=dashboard")
+    assert r.status_code == 200
+    data = r.json()
+    assert data["stats"]["total_clicks"] >= 12
+    assert [item["id"] for item in data["qrcodes"]["items"]] == [qid]
+    preview = data["clicks"][qid]
+    assert preview["total"] == 12 and preview["pages"] == 2
+    assert preview["clicks"] == c.get(f"/api/qrcodes/{qid}/clicks?page=1&limit=10").json()["clicks"]
+
+
+def test_dashboard_revalidates_with_etag():
+    c = admin_client()
+    r = c.get("/api/admin/dashboard")
+    etag = r.headers["etag"]
+    r = c.get("/api/admin/dashboard", headers={"If-None-Match": etag})
+    assert r.status_code == 304 and r.content == b""
+
+    c.post("/api/qrcodes/", json={"content": "https://example.com/changed"})
+    r = c.get("/api/admin/dashboard", headers={"If-None-Match": etag})
+    assert r.status_code == 200 and r.headers["etag"] != etag
+
+
+def test_dashboard_requires_admin():
+    assert TestClient(app).get("/api/admin/dashboard").status_code == 401
@@ -0,0 +1,39 @@
+import sys
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+
+# ensure project root is importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend.app import analytics
+
+NOW = datetime(2026, 10, 19, 9, 30, tzinfo=timezone.utc)
+
+
+def test_daily_edges_and_gap_filling():
+    edges, start = analytics.bucket_edges(5, "day", analytics.get_timezone("UTC"), now=NOW)
+    assert analytics.bucket_labels(edges) == ["2026-10-15", "2026-10-16", "2026-10-17", "2026-10-18", "2026-10-19"]
+    assert start == datetime(2026, 10, 15)
+
+    keys = np.array(["2026-10-16", "2026-10-19", "2026-10-19"], dtype="datetime64[D]")
+    matrix = analytics.assemble_series(edges, "day", np.array([0, 0, 1]), keys, np.array([4, 2, 7]), 2)
+    assert matrix.tolist() == [[0, 4, 0, 0, 2], [0, 0, 0, 0, 7]]
+
+
+def test_hourly_edges_are_local():
+    edges, start = analytics.bucket_edges(1, "hour", analytics.get_timezone("Europe/Paris"), now=NOW)
+    labels = analytics.bucket_labels(edges)
+    assert labels[0] == "2026-10-19T00" and labels[-1] == "2026-10-19T11"
+    assert start == datetime(2026, 10, 18, 22)
+
+
+def test_week_and_month_buckets_fold_days():
+    edges, _ = analytics.bucket_edges(14, "week", analytics.get_timezone("UTC"), now=NOW)
+    assert analytics.bucket_labels(edges) == ["2026-10-05", "2026-10-12", "2026-10-19"]
+
+    edges, _ = analytics.bucket_edges(40, "month", analytics.get_timezone("UTC"), now=NOW)
+    keys = np.array(["2026-09-10", "2026-09-30", "2026-10-01"], dtype="datetime64[D]")
+    matrix = analytics.assemble_series(edges, "month", np.zeros(3, dtype=np.intp), keys, np.array([1, 2, 3]), 1)
+    assert analytics.bucket_labels(edges) == ["2026-09", "2026-10"]
+    assert matrix.tolist() == [[3, 3]]
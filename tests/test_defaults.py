@@ -6,30 +6,14 @@ import pytest
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from backend.app import models, schemas
-from backend.app.db import Base, engine, SessionLocal
-
-
-def setup_module(module):
-    # create tables in a temporary sqlite file
-    Base.metadata.create_all(bind=engine)
-
-
-def teardown_module(module):
-    # drop tables
-    Base.metadata.drop_all(bind=engine)
 
 
 def test_qrcode_options_default_is_dict():
-    db = SessionLocal()
-    try:
-        q = models.QRCode(slug="abc1234", title="t", content="https://example.com")
-        db.add(q)
-        db.commit()
-        db.refresh(q)
-        assert isinstance(q.options, dict)
-        assert q.options == {}
-    finally:
-        db.close()
+    q = models.QRCode(slug="abc1234", title="t", content="https://example.com")
+    assert isinstance(q.options, dict)
+    assert q.options == {}
+    # each document gets its own dict
+    assert models.QRCode(slug="abc1235", content="https://example.com").options is not q.options
 
 
 def test_pydantic_qrcreate_options_default():
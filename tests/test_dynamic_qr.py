@@ -4,9 +4,9 @@ from fastapi.testclient import TestClient
 
 # ensure project root is importable
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from backend.app.db import Base, engine
 
 from backend.app.main import app
+from backend.app import rendering, routes_qr
 
 client = TestClient(app)
 
@@ -21,18 +21,34 @@ def test_dynamic_qr_update_flow():
     slug = data['slug']
 
     # ensure redirect is original
-    r2 = client.get(f"/q/{slug}", allow_redirects=False)
+    r2 = client.get(f"/q/{slug}", follow_redirects=False)
     assert r2.status_code in (302, 307)
     assert r2.headers['location'] == 'https://original.example'
 
-    # update the QR content
+    # update the QR content (admin only)
+    login = client.post('/admin/login', data={'password': os.environ['ADMIN_PASSWORD']}, follow_redirects=False)
+    client.cookies.set('admin_token', login.cookies['admin_token'])
     up = {"content": "https://updated.example"}
     r3 = client.patch(f"/api/qrcodes/{qid}", json=up)
     assert r3.status_code == 200
 
     # ensure redirect now uses updated content
-    r4 = client.get(f"/q/{slug}", allow_redirects=False)
+    r4 = client.get(f"/q/{slug}", follow_redirects=False)
     assert r4.status_code in (302, 307)
     assert r4.headers['location'] == 'https://updated.example'
 
     # cleanup not needed (uses sqlite dev.db)
+
+
+def test_compact_qr_redirect(monkeypatch):
+    monkeypatch.setattr(routes_qr, "QR_COMPACT_URLS", True)
+    monkeypatch.setattr(rendering, "QR_COMPACT_URLS", True)
+    r = client.post('/api/qrcodes/', json={"content": "https://compact.example", "is_dynamic": True})
+    assert r.status_code == 200
+    slug = r.json()['slug']
+    assert slug == slug.upper()
+
+    r2 = client.get(f"/Q/{slug}", follow_redirects=False)
+    assert r2.status_code in (302, 307)
+    assert r2.headers['location'] == 'https://compact.example'
+    assert client.get(f"/q/{slug}", follow_redirects=False).headers['location'] == 'https://compact.example'
@@ -0,0 +1,52 @@
+import sys
+import os
+import asyncio
+from datetime import datetime, timedelta
+
+# ensure project root is importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend.app import enrichment, models
+
+FIREFOX = "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:124.0) Gecko/20100101 Firefox/124.0"
+
+
+async def device_rollups(code) -> dict:
+    rows = await models.ClickRollup.get_motor_collection().find(
+        {"qrcode_id": code.id, "dimension": "device"}
+    ).to_list(length=None)
+    return {row["value"]: row["clicks"] for row in rows}
+
+
+def test_concurrent_runs_count_each_click_once():
+    async def scenario():
+        code = models.QRCode(slug="enrichrace", content="https://example.com/enrich")
+        await code.insert()
+        await models.Click.insert_many([models.Click(qrcode_id=code.id, user_agent=FIREFOX) for _ in range(5)])
+
+        # small batches so the two runs interleave
+        await asyncio.gather(enrichment.enrich_clicks(batch_size=2), enrichment.enrich_clicks(batch_size=2))
+        assert await device_rollups(code) == {"desktop": 5}
+        clicks = await models.Click.get_motor_collection().find({"qrcode_id": code.id}).to_list(length=None)
+        assert all(c["device"] == "desktop" and c["enriched_at"] for c in clicks)
+        assert not any("enrich_claim" in c for c in clicks)
+
+    asyncio.run(scenario())
+
+
+def test_abandoned_claims_are_taken_over_after_the_lease():
+    async def scenario():
+        code = models.QRCode(slug="enrichlease", content="https://example.com/lease")
+        await code.insert()
+        stale, fresh = (
+            models.Click(qrcode_id=code.id, user_agent=FIREFOX, enrich_claim="crashed", enrich_claimed_at=claimed_at)
+            for claimed_at in (datetime.utcnow() - timedelta(seconds=enrichment.ENRICH_CLAIM_TTL + 1),
+                               datetime.utcnow())
+        )
+        await stale.insert()
+        await fresh.insert()
+
+        await enrichment.enrich_clicks()
+        assert await device_rollups(code) == {"desktop": 1}  # the fresh claim is left to its run
+        assert (await models.Click.get(fresh.id)).enriched_at is None
+
+    asyncio.run(scenario())
@@ -0,0 +1,106 @@
+import sys
+import os
+import asyncio
+import csv
+import io
+import json
+from datetime import datetime
+
+from bson import ObjectId
+from fastapi.testclient import TestClient
+
+# ensure project root is importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("ADMIN_PASSWORD", "testpass")
+from backend.app.main import app
+from backend.app import models
+
+client = TestClient(app)
+
+
+def admin_client():
+    r = client.post("/admin/login", data={"password": os.environ["ADMIN_PASSWORD"]}, follow_redirects=False)
+    client.cookies.set("admin_token", r.cookies["admin_token"])
+    return client
+
+
+def code_with_clicks():
+    """A code with one click on each of 2024-03-01, 03-02 and 03-03 (noon UTC)."""
+    c = admin_client()
+    qid = c.post("/api/qrcodes/", json={"content": "https://example.com/export", "is_dynamic": True}).json()["id"]
+    code = asyncio.run(models.QRCode.get(qid))
+    asyncio.run(models.Click.insert_many([
+        models.Click(qrcode_id=code.id, timestamp=datetime(2024, 3, day, 12), ip=f"{day:016x}",
+                     user_agent="agent, with comma", country="FR")
+        for day in (1, 2, 3)
+    ]))
+    return c, code
+
+
+def test_csv_export_body_and_headers():
+    c, code = code_with_clicks()
+    r = c.get(f"/api/qrcodes/{code.id}/clicks/export")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/csv")
+    assert r.headers["content-disposition"] == f'attachment; filename="clicks-{code.slug}.csv"'
+    rows = list(csv.DictReader(io.StringIO(r.text)))
+    assert [row["timestamp"] for row in rows] == [f"2024-03-0{day}T12:00:00" for day in (1, 2, 3)]
+    assert rows[0]["user_agent"] == "agent, with comma"  # quoted, not split
+    assert {row["qrcode_id"] for row in rows} == {str(code.id)}
+
+
+def test_ndjson_export_with_date_range():
+    c, code = code_with_clicks()
+    r = c.get(f"/api/qrcodes/{code.id}/clicks/export",
+              params={"format": "ndjson", "start": "2024-03-02T00:00:00", "end": "2024-03-03T00:00:00"})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    assert r.headers["content-disposition"].endswith('.ndjson"')
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert [row["timestamp"] for row in rows] == ["2024-03-02T12:00:00"]  # end is exclusive
+    assert rows[0]["country"] == "FR" and rows[0]["ip"] == f"{2:016x}"
+
+    # timezone-aware bounds are compared in UTC
+    r = c.get(f"/api/qrcodes/{code.id}/clicks/export",
+              params={"format": "ndjson", "start": "2024-03-03T13:00:00+02:00"})
+    assert [json.loads(line)["timestamp"] for line in r.text.splitlines()] == ["2024-03-03T12:00:00"]
+
+
+def test_all_clicks_export():
+    c, code = code_with_clicks()
+    r = c.get("/api/qrcodes/clicks/export", params={"format": "ndjson"})
+    assert r.status_code == 200
+    assert r.headers["content-disposition"] == 'attachment; filename="clicks.ndjson"'
+    assert sum(json.loads(line)["qrcode_id"] == str(code.id) for line in r.text.splitlines()) == 3
+
+
+def test_export_errors():
+    c, code = code_with_clicks()
+    assert c.get(f"/api/qrcodes/{code.id}/clicks/export?format=xml").status_code == 400
+    assert c.get("/api/qrcodes/clicks/export?format=xml").status_code == 400
+    assert c.get("/api/qrcodes/not-an-id/clicks/export").status_code == 400
+    assert c.get(f"/api/qrcodes/{ObjectId()}/clicks/export").status_code == 404
+
+
+def test_export_requires_admin():
+    _, code = code_with_clicks()
+    anonymous = TestClient(app)
+    assert anonymous.get(f"/api/qrcodes/{code.id}/clicks/export").status_code == 401
+    assert anonymous.get("/api/qrcodes/clicks/export").status_code == 401
+
+
+def test_pdf_sheet_has_its_own_cap(monkeypatch):
+    from backend.app import rendering, routes_qr
+
+    c = admin_client()
+    for i in range(2):
+        c.post("/api/qrcodes/", json={"content": f"https://example.com/sheet{i}", "title": f"pdfcap {i}"})
+    monkeypatch.setattr(routes_qr, "PDF_EXPORT_MAX_CODES", 1)
+    monkeypatch.setattr(rendering, "RENDER_PROCESSES", 0)  # render on the thread pool
+
+    r = c.post("/api/qrcodes/images/export", json={"format": "pdf", "search": "pdfcap"})
+    assert r.status_code == 400 and "max 1" in r.json()["detail"]
+    assert c.post("/api/qrcodes/images/export", json={"format": "zip", "search": "pdfcap"}).status_code == 200
+
+    r = c.post("/api/qrcodes/images/export", json={"format": "pdf", "search": "pdfcap 1", "size": 2000})
+    assert r.status_code == 200 and r.content.startswith(b"%PDF")
@@ -4,7 +4,6 @@ from fastapi.testclient import TestClient
 
 # ensure project root is importable
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from backend.app.db import Base, engine
 
 from backend.app.main import app
 
@@ -26,7 +25,7 @@ def test_create_qr_and_redirect_and_image():
 
     slug = data["slug"]
     # check redirect
-    r2 = client.get(f"/q/{slug}", allow_redirects=False)
+    r2 = client.get(f"/q/{slug}", follow_redirects=False)
     assert r2.status_code in (302, 307)
     assert r2.headers.get("location") == "https://example.com"
 
@@ -34,3 +33,6 @@ def test_create_qr_and_redirect_and_image():
     r3 = client.get(f"/api/qrcodes/{data['id']}/image?size=200")
     assert r3.status_code == 200
     assert r3.headers["content-type"] in ("image/png", "image/svg+xml")
+    # sizes are bounded like the exports: no multi-gigabyte matrix on a crafted request
+    assert client.get(f"/api/qrcodes/{data['id']}/image?size=200000").status_code == 422
+    assert client.get(f"/api/qrcodes/{data['id']}/image?size=1").status_code == 422
@@ -0,0 +1,57 @@
+import sys
+import os
+
+# ensure project root is importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend.app.geoip import GeoIPIndex
+
+
+def test_geoip_csv_lookup(tmp_path):
+    db = tmp_path / "ranges.csv"
+    db.write_text(
+        "ip_start,ip_end,country\n"
+        "1.0.0.0,1.0.0.255,au\n"
+        "10.0.0.0,10.255.255.255,FR\n"
+        "2001:db8::,2001:db8::ffff,DE\n"
+        "16777216,16777471,AU\n"
+    )
+    index = GeoIPIndex.from_csv(str(db))
+
+    assert index.lookup("10.1.2.3") == "FR"
+    assert index.lookup("1.0.0.42") == "AU"
+    assert index.lookup("::ffff:10.0.0.1") == "FR"
+    assert index.lookup("2001:db8::5") == "DE"
+
+
+def test_geoip_unknown_addresses():
+    index = GeoIPIndex([(167772160, 184549375, "FR")])
+    assert index.lookup("8.8.8.8") is None
+    assert index.lookup("9.255.255.255") is None
+    assert index.lookup("not-an-ip") is None
+    assert index.lookup("unknown") is None
+
+
+def test_load_geoip_parses_off_the_event_loop(tmp_path, monkeypatch):
+    import asyncio
+    import threading
+    from backend.app import geoip
+
+    db = tmp_path / "ranges.csv"
+    db.write_text("ip_start,ip_end,country\n1.0.0.0,1.0.0.255,AU\n")
+    monkeypatch.setattr(geoip, "GEOIP_DB_PATH", str(db))
+    monkeypatch.setattr(geoip, "_index", None)
+    monkeypatch.setattr(geoip, "_loaded", False)
+    threads = []
+    from_csv = GeoIPIndex.from_csv.__func__
+    monkeypatch.setattr(GeoIPIndex, "from_csv", classmethod(
+        lambda cls, path: threads.append(threading.current_thread()) or from_csv(cls, path)
+    ))
+
+    async def scenario():
+        first = await geoip.load_geoip()
+        assert await geoip.load_geoip() is first  # parsed once
+        return first
+
+    index = asyncio.run(scenario())
+    assert index.lookup("1.0.0.7") == "AU"
+    assert len(threads) == 1 and threads[0] is not threading.main_thread()
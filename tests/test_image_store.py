@@ -0,0 +1,62 @@
+import sys
+import os
+import asyncio
+
+# ensure project root is importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend.app import image_store
+
+
+def test_parse_variants():
+    assert image_store.parse_variants("png:300, PNG:600,svg,svg:100,png:300") == (("png", 300), ("png", 600), ("svg", 0))
+    assert image_store.parse_variants("") == ()
+
+
+def test_variant_key_tracks_what_is_rendered():
+    key = image_store.variant_key("https://host/q/abc", {"dark": "red"}, "png", 300)
+    assert key == image_store.variant_key("https://host/q/abc", {"dark": "red"}, "png", 300)
+    assert key != image_store.variant_key("https://host/q/abd", {"dark": "red"}, "png", 300)
+    assert key != image_store.variant_key("https://host/q/abc", {"dark": "blue"}, "png", 300)
+    assert key != image_store.variant_key("https://host/q/abc", {"dark": "red"}, "png", 600)
+
+
+def test_local_store_roundtrip(tmp_path):
+    store = image_store.LocalImageStore(str(tmp_path))
+
+    async def scenario():
+        await store.put("code1", "k1", "png", 300, b"one")
+        await store.put("code1", "k2", "svg", 0, b"two")
+        path = await store.get("code1", "k1", "png")
+        with open(path, "rb") as f:
+            assert f.read() == b"one"
+        await store.delete("code1", keep=["k2"])
+        assert await store.get("code1", "k1", "png") is None
+        assert await store.get("code1", "k2", "svg") is not None
+        await store.clear()
+        assert not tmp_path.exists()
+
+    asyncio.run(scenario())
+
+
+def test_stored_variants_keep_the_creation_origin():
+    from fastapi.testclient import TestClient
+    from backend.app import models
+    from backend.app.main import app
+
+    os.environ.setdefault("ADMIN_PASSWORD", "testpass")
+    alpha, beta = TestClient(app, base_url="http://alpha.test"), TestClient(app, base_url="https://beta.test")
+    for client in (alpha, beta):
+        r = client.post("/admin/login", data={"password": os.environ["ADMIN_PASSWORD"]}, follow_redirects=False)
+        client.cookies.set("admin_token", r.cookies["admin_token"])
+    created = alpha.post("/api/qrcodes/", json={"content": "https://example.com/origin", "is_dynamic": True}).json()
+
+    async def stored_keys():
+        cursor = models.QRImage.get_motor_collection().find({"qrcode_id": models.PydanticObjectId(created["id"])})
+        return sorted([doc["_id"] async for doc in cursor])
+
+    prerendered = asyncio.run(stored_keys())
+    assert image_store.variant_key(f"http://alpha.test/q/{created['slug']}", {}, "png", 300) in prerendered
+    # another host or scheme is served the same variants, not a new set
+    assert beta.get(f"/api/qrcodes/{created['id']}/image").status_code == 200
+    beta.put(f"/api/qrcodes/{created['id']}", json={"title": "renamed"})
+    assert asyncio.run(stored_keys()) == prerendered
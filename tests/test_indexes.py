@@ -0,0 +1,90 @@
+import sys
+import os
+import asyncio
+
+from beanie import init_beanie
+from fastapi.testclient import TestClient
+
+# ensure project root is importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("ADMIN_PASSWORD", "testpass")
+from backend.app.main import app
+from backend.app import db, indexes, models, routes_admin
+
+# explain() output shapes of a mongod (mongomock has no explain)
+CLASSIC_IXSCAN = {
+    "queryPlanner": {"winningPlan": {
+        "stage": "LIMIT",
+        "inputStage": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "qrcode_id_1_timestamp_-1"}},
+    }},
+    "executionStats": {"totalDocsExamined": 10, "nReturned": 10},
+}
+SBE_COLLSCAN = {
+    "queryPlanner": {"winningPlan": {"queryPlan": {
+        "stage": "SORT",
+        "inputStage": {"stage": "COLLSCAN"},
+    }}},
+    "executionStats": {"totalDocsExamined": 5000, "nReturned": 100},
+}
+OR_PLAN = {
+    "queryPlanner": {"winningPlan": {
+        "stage": "SUBPLAN",
+        "inputStage": {"stage": "OR", "inputStages": [
+            {"stage": "IXSCAN", "indexName": "title_1"},
+            {"stage": "IXSCAN", "indexName": "slug_1"},
+        ]},
+    }},
+}
+
+
+def test_summarize_plan():
+    row = indexes.summarize_plan("qrcode_clicks", "clicks", CLASSIC_IXSCAN)
+    assert row["stages"] == ["LIMIT", "FETCH", "IXSCAN"]
+    assert row["indexes"] == ["qrcode_id_1_timestamp_-1"]
+    assert not row["collscan"] and (row["docs_examined"], row["returned"]) == (10, 10)
+
+    row = indexes.summarize_plan("export_all_clicks", "clicks", SBE_COLLSCAN, note="expected")
+    assert row["collscan"] and row["stages"] == ["SORT", "COLLSCAN"] and row["note"] == "expected"
+
+    row = indexes.summarize_plan("list_qrcodes (search)", "qrcodes", OR_PLAN)
+    assert row["indexes"] == ["title_1", "slug_1"] and row["docs_examined"] is None
+
+
+def test_declared_indexes_are_created_and_others_kept():
+    async def scenario():
+        clicks = db.get_db()[models.Click.get_settings().name]
+        await clicks.create_index("ops_added_field", name="ops_added_field_1")
+        # what init_db runs at every cold start: it must not drop indexes it does not declare
+        await init_beanie(database=db.get_db(), document_models=[models.Click])
+        names = set((await clicks.index_information()).keys())
+        assert {"qrcode_id_1_timestamp_-1", "timestamp_1", "ops_added_field_1"} <= names
+        await clicks.drop_index("ops_added_field_1")
+
+    asyncio.run(scenario())
+
+
+def test_indexes_endpoint(monkeypatch):
+    async def fake_explain_queries():
+        return [
+            indexes.summarize_plan("qrcode_clicks", "clicks", CLASSIC_IXSCAN),
+            indexes.summarize_plan("export_all_clicks", "clicks", SBE_COLLSCAN),
+        ]
+
+    monkeypatch.setattr(routes_admin, "explain_queries", fake_explain_queries)
+    client = TestClient(app)
+    assert client.get("/api/admin/indexes").status_code == 401
+
+    r = client.post("/admin/login", data={"password": os.environ["ADMIN_PASSWORD"]}, follow_redirects=False)
+    client.cookies.set("admin_token", r.cookies["admin_token"])
+    data = client.get("/api/admin/indexes").json()
+    assert data["collscans"] == 1
+    assert [row["query"] for row in data["queries"]] == ["qrcode_clicks", "export_all_clicks"]
+
+
+def test_query_shapes_cover_the_endpoints():
+    shapes = asyncio.run(indexes._query_shapes())
+    names = [name for name, *_ in shapes]
+    assert len(names) == len(set(names))
+    assert {"redirect_slug", "qrcode_clicks", "export_qrcode_clicks"} <= set(names)
+    # only the unanchored search is allowed to scan
+    assert [name for name, *_, note in shapes if note] == ["list_qrcodes (search)"]
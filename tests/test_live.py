@@ -0,0 +1,171 @@
+import sys
+import os
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+# ensure project root is importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend.app import models
+from backend.app.click_buffer import ClickBuffer
+from backend.app.live import ClickBus, click_bus, live_events
+
+
+class FakeRequest:
+    async def is_disconnected(self):
+        return True
+
+
+def test_bus_fans_out_with_running_totals():
+    async def scenario():
+        code = models.QRCode(slug="livebus", content="https://example.com/live")
+        await code.insert()
+        now = datetime.utcnow()
+        await models.Click(qrcode_id=code.id, timestamp=now - timedelta(seconds=3), ip="x").insert()
+
+        bus = ClickBus(queue_size=2)
+        first, second = bus.subscribe(), bus.subscribe()
+        # the batch is already stored when published, as the click buffer does
+        batch = [models.Click(qrcode_id=code.id, timestamp=now - timedelta(seconds=s), ip="y") for s in (2, 1)]
+        await models.Click.insert_many(batch)
+        # and so is a later one: the seed only counts clicks older than the batch
+        later = models.Click(qrcode_id=code.id, timestamp=now, ip="y")
+        await later.insert()
+        await bus.publish([(code.id, None, batch[0].timestamp, "FR"), (code.id, None, batch[1].timestamp, None)])
+        await bus.publish([(code.id, "livebus", later.timestamp, "DE")])
+
+        # queue_size=2: the oldest event was dropped for both subscribers
+        for queue in (first, second):
+            events = [queue.get_nowait() for _ in range(queue.qsize())]
+            assert [(e["slug"], e["country"], e["total"]) for e in events] == [("livebus", None, 3), ("livebus", "DE", 4)]
+
+        bus.unsubscribe(first)
+        bus.unsubscribe(second)
+        assert len(bus) == 0
+        await bus.publish([(code.id, "livebus", datetime.utcnow(), None)])  # nobody listening: no-op
+        bus.post([(code.id, "livebus", datetime.utcnow(), None)])
+        assert bus._pump is None
+
+    asyncio.run(scenario())
+
+
+def test_click_buffer_flush_publishes_to_live_feed():
+    async def scenario():
+        code = models.QRCode(slug="liveflush", content="https://example.com/flush")
+        await code.insert()
+        stream = live_events(FakeRequest(), heartbeat=0.5)
+        assert "event: ready" in await stream.__anext__()
+
+        buffer = ClickBuffer(max_size=1)
+        await buffer.record(code.id, "203.0.113.9", "test-agent", slug="liveflush")
+        chunk = await stream.__anext__()
+        assert chunk.startswith("event: click\n")
+        event = json.loads(chunk.split("data: ", 1)[1])
+        assert event["slug"] == "liveflush" and event["total"] == 1 and event["qrcode_id"] == str(code.id)
+
+        # idle and disconnected: the stream ends and unsubscribes
+        assert [chunk async for chunk in stream] == []
+        assert len(click_bus) == 0
+
+    asyncio.run(scenario())
+
+
+async def open_live_feed(headers):
+    """Call /api/admin/live on the app in this event loop; return (messages queue, disconnect, task)."""
+    from backend.app.main import app
+
+    scope = {
+        "type": "http", "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": "/api/admin/live", "raw_path": b"/api/admin/live", "query_string": b"", "root_path": "",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+        "client": ("203.0.113.5", 50000), "server": ("testserver", 80),
+    }
+    messages = asyncio.Queue()
+    disconnect = asyncio.Event()
+
+    async def receive():
+        await disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    task = asyncio.create_task(app(scope, receive, messages.put))
+    return messages, disconnect, task
+
+
+async def next_body(messages) -> str:
+    while True:
+        message = await asyncio.wait_for(messages.get(), 5)
+        if message["type"] == "http.response.body" and message.get("body"):
+            return message["body"].decode()
+
+
+def test_live_endpoint_requires_admin():
+    from fastapi.testclient import TestClient
+    from backend.app import auth
+    from backend.app.main import app
+
+    client = TestClient(app)
+    assert client.get("/api/admin/live").status_code == 401
+    user_token = auth.create_access_token({"sub": "someone"})
+    assert client.get("/api/admin/live", headers={"Authorization": f"Bearer {user_token}"}).status_code == 403
+
+
+def test_live_endpoint_streams_ready_then_clicks():
+    from backend.app import auth
+
+    async def scenario():
+        code = models.QRCode(slug="livehttp", content="https://example.com/livehttp")
+        await code.insert()
+        token = auth.create_access_token({"admin": True})
+        messages, disconnect, task = await open_live_feed({"Authorization": f"Bearer {token}"})
+
+        start = await asyncio.wait_for(messages.get(), 5)
+        assert start["type"] == "http.response.start" and start["status"] == 200
+        headers = {name.decode(): value.decode() for name, value in start["headers"]}
+        assert headers["content-type"].startswith("text/event-stream")
+        assert headers["cache-control"] == "no-cache" and "content-encoding" not in headers
+
+        ready = await next_body(messages)
+        assert ready.startswith("retry: 3000\nevent: ready\ndata: ") and ready.endswith("\n\n")
+
+        click = models.Click(qrcode_id=code.id, ip="z")
+        await click.insert()
+        await click_bus.publish([(code.id, "livehttp", click.timestamp, "FR")])
+        event = await next_body(messages)
+        name, data = event.rstrip("\n").split("\n")
+        assert name == "event: click"
+        payload = json.loads(data[len("data: "):])
+        assert payload["slug"] == "livehttp" and payload["country"] == "FR" and payload["total"] == 1
+
+        disconnect.set()
+        await asyncio.wait_for(task, 5)
+        assert len(click_bus) == 0  # unsubscribed on disconnect
+
+    asyncio.run(scenario())
+
+
+def test_flush_only_posts_to_the_live_feed(monkeypatch):
+    async def scenario():
+        code = models.QRCode(slug="livepost", content="https://example.com/post")
+        await code.insert()
+        queue = click_bus.subscribe()
+        published = asyncio.Event()
+        publish = ClickBus.publish
+
+        async def slow_publish(self, clicks):
+            await asyncio.sleep(0.05)  # a slow seed must not hold the flush
+            await publish(self, clicks)
+            published.set()
+
+        monkeypatch.setattr(ClickBus, "publish", slow_publish)
+        buffer = ClickBuffer(max_size=1)
+        await buffer.record(code.id, "203.0.113.9", "test-agent", slug="livepost")
+        await buffer.record(code.id, "203.0.113.10", "test-agent", slug="livepost")
+        assert queue.empty()
+
+        await asyncio.wait_for(published.wait(), 5)
+        await asyncio.wait_for(click_bus._pump, 5)
+        events = [queue.get_nowait() for _ in range(queue.qsize())]
+        assert [e["total"] for e in events] == [1, 2]  # in order, each batch seeded once
+        click_bus.unsubscribe(queue)
+
+    asyncio.run(scenario())
@@ -0,0 +1,99 @@
+import sys
+import os
+import logging
+from types import SimpleNamespace
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# ensure project root is importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend.app import metrics
+
+
+def test_histogram_render_is_cumulative():
+    h = metrics.Histogram("demo_seconds", "Demo.", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        h.observe(("/q/{slug}",), value)
+    lines = h.render()
+    assert 'demo_seconds_bucket{route="/q/{slug}",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{route="/q/{slug}",le="1.0"} 3' in lines
+    assert 'demo_seconds_bucket{route="/q/{slug}",le="+Inf"} 4' in lines
+    assert 'demo_seconds_count{route="/q/{slug}"} 4' in lines
+
+
+def test_middleware_labels_by_route_template():
+    app = FastAPI()
+    app.add_middleware(metrics.MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: str):
+        return {"id": item_id}
+
+    metrics.http_requests.clear()
+    client = TestClient(app)
+    for item_id in ("a", "b", "c"):
+        client.get(f"/items/{item_id}")
+    client.get("/missing")
+    assert metrics.http_requests._series[("GET", "/items/{item_id}", "200")] == 3
+    assert metrics.http_requests._series[("GET", "unmatched", "404")] == 1
+
+
+def test_streaming_responses_timed_until_headers():
+    import asyncio
+    from starlette.responses import StreamingResponse
+
+    app = FastAPI()
+    app.add_middleware(metrics.MetricsMiddleware)
+
+    @app.get("/stream")
+    async def stream():
+        async def body():
+            for _ in range(3):
+                await asyncio.sleep(0.2)
+                yield b"data: x\n\n"
+        return StreamingResponse(body(), media_type="text/event-stream")
+
+    metrics.http_latency.clear()
+    assert TestClient(app).get("/stream").text.count("data:") == 3
+    observed = metrics.http_latency._series[("GET", "/stream")]
+    assert observed[-1] < 0.2  # the 0.6 s body is not part of the latency
+
+
+def test_command_listener_records_and_logs_slow_queries(caplog):
+    listener = metrics.MongoCommandMetrics()
+    metrics.mongo_latency.clear()
+
+    def run(command, duration_ms, request_id):
+        name = next(iter(command))
+        listener.started(SimpleNamespace(command=command, command_name=name, connection_id=("h", 1), request_id=request_id))
+        listener.succeeded(SimpleNamespace(command_name=name, connection_id=("h", 1), request_id=request_id,
+                                           duration_micros=duration_ms * 1000))
+
+    with caplog.at_level(logging.WARNING, logger=metrics.__name__):
+        run({"find": "qrcodes", "filter": {"slug": "secret-slug"}}, 2, 1)
+        run({"getMore": 12345, "collection": "clicks"}, 1, 2)
+        run({"aggregate": "clicks", "pipeline": [{"$match": {"qrcode_id": 1}}]}, metrics.MONGO_SLOW_QUERY_MS + 1, 3)
+
+    assert ("find", "qrcodes") in metrics.mongo_latency._series
+    assert ("getMore", "clicks") in metrics.mongo_latency._series
+    assert not listener._pending
+    slow = [r.getMessage() for r in caplog.records]
+    assert len(slow) == 1 and "aggregate on clicks" in slow[0]
+    # filter values never reach the log
+    assert "$match" in slow[0] and "qrcode_id" in slow[0] and "secret" not in slow[0]
+
+
+def test_pool_listener_without_checkout_duration():
+    listener = metrics.MongoPoolMetrics()
+    metrics.mongo_pool_wait.clear()
+    metrics.mongo_pool_timeouts.clear()
+
+    # pymongo 4.6 checkout events have no `duration`
+    listener.connection_checked_out(SimpleNamespace(address=("h", 1), connection_id=1))
+    listener.connection_check_out_failed(SimpleNamespace(address=("h", 1), reason="timeout"))
+    assert not metrics.mongo_pool_wait._series
+    assert metrics.mongo_pool_timeouts._series == {("timeout",): 1}
+
+    listener.connection_checked_out(SimpleNamespace(address=("h", 1), connection_id=1, duration=0.002))
+    assert metrics.mongo_pool_wait._series[()][-1] == 0.002
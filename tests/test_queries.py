@@ -0,0 +1,36 @@
+import sys
+import os
+from datetime import datetime
+
+from bson import ObjectId
+
+# ensure project root is importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend.app import queries
+
+
+def test_qr_record_matches_endpoint_shape():
+    oid = ObjectId()
+    created = datetime(2026, 1, 2, 3, 4, 5)
+    record = queries.QRRecord({
+        "_id": oid, "slug": "abc1234", "title": None, "content": "https://example.com",
+        "is_dynamic": True, "created_at": created,
+    })
+    assert record.to_dict() == {
+        "id": str(oid),
+        "slug": "abc1234",
+        "title": "",
+        "content": "https://example.com",
+        "is_dynamic": True,
+        "options": {},
+        "created_at": "2026-01-02T03:04:05",
+        "updated_at": None,
+    }
+
+
+def test_records_use_slots_and_projections():
+    assert not hasattr(queries.QRRecord({"_id": 1, "slug": "s", "content": "c"}), "__dict__")
+    assert "options" in queries.QRRecord.PROJECTION
+    assert {"content", "owner_id"} <= set(queries.RedirectTarget.PROJECTION) <= {"_id", "content", "owner_id"}
+    click = queries.ClickRecord({"_id": ObjectId(), "ip": "ab12", "country": "FR"})
+    assert click.to_dict()["timestamp"] is None and click.to_dict()["country"] == "FR"
@@ -0,0 +1,56 @@
+import sys
+import os
+import asyncio
+
+# ensure project root is importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend.app.ratelimit import TokenBucketLimiter, DedupWindow
+
+
+def test_token_bucket_burst_and_refill():
+    limiter = TokenBucketLimiter(per_minute=60, burst=3)
+
+    async def scans(now, n):
+        return [await limiter.allow("ip", now=now) for _ in range(n)]
+
+    assert asyncio.run(scans(0.0, 4)) == [True, True, True, False]
+    # one token per second at 60/min
+    assert asyncio.run(scans(2.0, 3)) == [True, True, False]
+
+
+def test_token_bucket_is_bounded():
+    limiter = TokenBucketLimiter(per_minute=60, burst=1, max_keys=100)
+    for i in range(1000):
+        asyncio.run(limiter.allow(f"ip-{i}", now=0.0))
+    assert len(limiter) == 100
+
+
+def test_dedup_window_counts_repeats_once():
+    dedup = DedupWindow(window=10, max_keys=100)
+    assert dedup.is_duplicate("ip:slug", now=0.0) is False
+    assert dedup.is_duplicate("ip:slug", now=5.0) is True
+    assert dedup.is_duplicate("ip:other", now=5.0) is False
+    assert dedup.is_duplicate("ip:slug", now=10.0) is False
+
+
+def test_dedup_window_is_bounded():
+    dedup = DedupWindow(window=60, max_keys=10)
+    for i in range(50):
+        dedup.is_duplicate(f"k{i}", now=float(i) / 100)
+    assert len(dedup) == 10
+
+
+def test_redirect_bucket_is_per_client_and_code(monkeypatch):
+    from fastapi.testclient import TestClient
+    from backend.app import models, qrcode_redirect
+    from backend.app.main import app
+
+    for slug in ("limita", "limitb"):
+        asyncio.run(models.QRCode(slug=slug, content=f"https://example.com/{slug}").insert())
+    monkeypatch.setattr(qrcode_redirect, "scan_limiter", TokenBucketLimiter(per_minute=0, burst=2))
+    client = TestClient(app)
+
+    statuses = [client.get("/q/limita", follow_redirects=False).status_code for _ in range(3)]
+    assert statuses == [307, 307, 429]
+    # the same client still reaches its other codes
+    assert client.get("/q/limitb", follow_redirects=False).status_code == 307
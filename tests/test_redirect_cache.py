@@ -0,0 +1,205 @@
+import sys
+import os
+import asyncio
+
+# ensure project root is importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend.app import db, invalidation, models
+from backend.app.invalidation import InvalidationBus
+from backend.app.queries import RedirectTarget
+from backend.app.redirect_cache import RedirectCache
+
+
+def target(content):
+    return RedirectTarget({"_id": content, "content": content})
+
+
+def test_ttl_and_lru_eviction():
+    cache = RedirectCache(max_size=2, ttl=10)
+    cache.put("a", target("A"), now=0)
+    cache.put("b", target("B"), now=0)
+    assert cache.get("a", now=5).content == "A"  # refreshes a's LRU position
+    cache.put("c", target("C"), now=5)
+    assert cache.get("b", now=5) is None
+    assert cache.get("a", now=10) is None  # expired
+    assert cache.get("c", now=10).content == "C"
+
+
+def test_lookup_caches_and_invalidation_evicts():
+    async def scenario():
+        code = models.QRCode(slug="cached1", content="https://example.com/old", is_dynamic=True)
+        await code.insert()
+        cache = RedirectCache(max_size=10, ttl=3600)
+        bus = InvalidationBus()
+        bus.register("redirect", cache.invalidate)
+
+        target, cached = await cache.lookup("cached1")
+        assert target.content == "https://example.com/old" and not cached
+        code.content = "https://example.com/new"
+        await code.save()
+        target, cached = await cache.lookup("cached1")
+        assert target.content == "https://example.com/old" and cached  # served from cache
+        assert (cache.hits, cache.misses) == (1, 1)
+
+        await bus.publish("redirect", ["cached1"])
+        assert (await cache.lookup("cached1"))[0].content == "https://example.com/new"
+        await bus.publish("redirect")
+        assert len(cache) == 0
+
+    asyncio.run(scenario())
+
+
+def test_mongo_messages_skip_their_origin(monkeypatch):
+    async def scenario():
+        monkeypatch.setattr(invalidation, "CACHE_INVALIDATION", "mongo")
+        seen = []
+        bus = InvalidationBus()
+        bus.register("redirect", seen.append)
+        await bus.publish("redirect", ["s1"])
+        assert seen == [["s1"]]  # evicted locally right away
+
+        message = await db.get_db()[invalidation.CACHE_INVALIDATION_COLLECTION].find_one(
+            {"keys": ["s1"]}, sort=[("_id", -1)]
+        )
+        assert message["scope"] == "redirect" and message["origin"] == invalidation.INSTANCE_ID
+
+    asyncio.run(scenario())
+
+
+def test_tail_start_sees_messages_with_older_ids():
+    from datetime import datetime, timedelta
+    from bson import ObjectId
+
+    async def scenario():
+        collection = db.get_db()["invalidation_tail_test"]
+        await collection.insert_many([
+            {"scope": "redirect", "keys": ["old"], "origin": "other"},
+            {"scope": "redirect", "keys": ["mine"], "origin": invalidation.INSTANCE_ID},
+        ])
+        position = await invalidation.tail_start(collection)
+        # published after the listener started by an instance whose clock lags a minute
+        lagging = ObjectId.from_datetime(datetime.utcnow() - timedelta(minutes=1))
+        await collection.insert_one({"_id": lagging, "scope": "redirect", "keys": ["late"], "origin": "other"})
+        await collection.insert_one({"scope": "redirect", "keys": ["echo"], "origin": invalidation.INSTANCE_ID})
+        # what the tailable cursor reads: the whole collection in natural order
+        seen = [doc["keys"] async for doc in collection.find({}) if position.accept(doc)]
+        assert seen == [["late"]]
+        await collection.drop()
+
+    asyncio.run(scenario())
+
+
+def test_tail_start_rolled_out_clears_caches():
+    from bson import ObjectId
+
+    cleared = []
+    bus = InvalidationBus()
+    bus.register("redirect", cleared.append)
+    position = invalidation.TailPosition(ObjectId())  # no longer in the capped collection
+    assert not position.accept({"_id": ObjectId(), "scope": "redirect", "keys": ["a"], "origin": "other"})
+    position.caught_up(bus)
+    assert cleared == [None]
+    assert position.accept({"_id": ObjectId(), "scope": "redirect", "keys": ["b"], "origin": "other"})
+    position.caught_up(bus)
+    assert cleared == [None]  # only once
+
+
+def test_update_evicts_cached_redirect(monkeypatch):
+    from fastapi.testclient import TestClient
+    from backend.app.main import app
+    from backend.app.redirect_cache import redirect_cache
+
+    monkeypatch.setattr(redirect_cache, "max_size", 100)  # off by default without CACHE_INVALIDATION=mongo
+
+    os.environ.setdefault("ADMIN_PASSWORD", "testpass")
+    client = TestClient(app)
+    r = client.post("/admin/login", data={"password": os.environ["ADMIN_PASSWORD"]}, follow_redirects=False)
+    client.cookies.set("admin_token", r.cookies["admin_token"])
+    created = client.post("/api/qrcodes/", json={"content": "https://example.com/v1", "is_dynamic": True}).json()
+
+    assert client.get(f"/q/{created['slug']}", follow_redirects=False).headers["location"] == "https://example.com/v1"
+    assert redirect_cache.get(created["slug"]) is not None
+    client.patch(f"/api/qrcodes/{created['id']}", json={"content": "https://example.com/v2"})
+    assert redirect_cache.get(created["slug"]) is None
+    assert client.get(f"/q/{created['slug']}", follow_redirects=False).headers["location"] == "https://example.com/v2"
+
+
+def test_cache_off_without_shared_invalidation():
+    from backend.app import redirect_cache
+    if invalidation.CACHE_INVALIDATION != "mongo" and "REDIRECT_CACHE_SIZE" not in os.environ:
+        assert redirect_cache.REDIRECT_CACHE_SIZE == 0
+        assert redirect_cache.redirect_cache.max_size == 0
+
+
+def test_clicks_of_deleted_cached_codes_are_dropped():
+    from backend.app.click_buffer import ClickBuffer
+
+    async def scenario():
+        owner = models.User(email="cached-owner@example.com", hashed_password="x")
+        await owner.insert()
+        kept = models.QRCode(slug="cachedkeep", content="https://example.com/keep", owner_id=owner.id)
+        gone = models.QRCode(slug="cachedgone", content="https://example.com/gone", owner_id=owner.id)
+        await kept.insert()
+        await gone.insert()
+        gone_id = gone.id
+        await gone.delete()  # deleted while its target was still cached
+
+        buffer = ClickBuffer(max_size=10)
+        await buffer.record(kept.id, "203.0.113.1", "ua", owner_id=owner.id, slug="cachedkeep", verify=True)
+        await buffer.record(gone_id, "203.0.113.1", "ua", owner_id=owner.id, slug="cachedgone", verify=True)
+        assert await buffer.flush() == 1
+        assert await models.Click.find(models.Click.qrcode_id == gone_id).count() == 0
+        assert (await models.User.get(owner.id)).click_count == 1
+
+    asyncio.run(scenario())
+
+
+def test_warm_up_preloads_most_scanned_slugs(monkeypatch):
+    from datetime import datetime, timedelta
+    from backend.app import redirect_cache
+    from backend.app.redirect_cache import warm_up
+
+    async def no_trending(window, limit):
+        return []
+
+    # no trending counters yet (fresh deployment): ranked from recent clicks
+    monkeypatch.setattr(redirect_cache, "top_slugs", no_trending)
+
+    async def scenario():
+        codes = [models.QRCode(slug=f"warm{i}", content=f"https://example.com/warm{i}") for i in range(3)]
+        for code in codes:
+            await code.insert()
+        now = datetime.utcnow()
+        clicks = [(codes[0], 5, now), (codes[1], 9, now), (codes[2], 50, now - timedelta(days=3))]
+        await models.Click.insert_many([
+            models.Click(qrcode_id=code.id, timestamp=at, ip="x") for code, n, at in clicks for _ in range(n)
+        ])
+
+        cache = RedirectCache(max_size=100, ttl=60)
+        assert await warm_up(cache, top=50, hours=24) >= 2
+        assert cache.get("warm0").content == "https://example.com/warm0"
+        assert cache.get("warm1").content == "https://example.com/warm1"
+        assert cache.get("warm2") is None  # only scanned outside the window
+        assert await warm_up(RedirectCache(max_size=0), top=10) == 0
+
+    asyncio.run(scenario())
+
+
+def test_only_cache_hits_are_verified_at_flush(monkeypatch):
+    from fastapi.testclient import TestClient
+    from backend.app import qrcode_redirect
+    from backend.app.main import app
+    from backend.app.redirect_cache import redirect_cache
+
+    monkeypatch.setattr(redirect_cache, "max_size", 100)
+    flags = []
+
+    async def record(*args, verify=False, **kwargs):
+        flags.append(verify)
+
+    monkeypatch.setattr(qrcode_redirect.click_buffer, "record", record)
+    client = TestClient(app)
+    slug = client.post("/api/qrcodes/", json={"content": "https://example.com/hit", "is_dynamic": True}).json()["slug"]
+    for _ in range(2):
+        client.get(f"/q/{slug}", follow_redirects=False)
+    assert flags == [False, True]  # the miss just read the code from Mongo
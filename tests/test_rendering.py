@@ -0,0 +1,118 @@
+import sys
+import os
+import asyncio
+import base64
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+from segno import make as make_qr
+
+# ensure project root is importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend.app import rendering
+
+
+def test_qr_payload():
+    assert rendering.qr_payload(True, "abc", "https://example.com", "http://host/") == "http://host/q/abc"
+    assert rendering.qr_payload(False, "abc", "https://example.com", "http://host/") == "https://example.com"
+
+
+def test_compact_redirect_url():
+    assert rendering.compact_redirect_url("AB12CD3", "https://qr.example.org/") == "HTTPS://QR.EXAMPLE.ORG/Q/AB12CD3"
+    assert rendering.compact_redirect_url("AB12CD3", "http://localhost:8000") == "HTTP://LOCALHOST:8000/Q/AB12CD3"
+    # the slug and a path prefix are case-sensitive; '_' is not an alphanumeric-mode character
+    assert rendering.compact_redirect_url("Ab12cD3", "https://qr.example.org") is None
+    assert rendering.compact_redirect_url("AB12CD3", "https://example.org/app") is None
+    assert rendering.compact_redirect_url("AB12CD3", "https://my_host.example.org") is None
+
+
+def test_compact_payload_smaller_symbol(monkeypatch):
+    base = "https://dynamique-qrcode.vercel.app"
+    assert rendering.qr_payload(True, "AB12CD3", "https://example.com", base) == f"{base}/q/AB12CD3"
+    monkeypatch.setattr(rendering, "QR_COMPACT_URLS", True)
+    compact = rendering.qr_payload(True, "AB12CD3", "https://example.com", base)
+    assert compact == "HTTPS://DYNAMIQUE-QRCODE.VERCEL.APP/Q/AB12CD3"
+    # mixed-case slugs of older codes keep their byte-mode URL
+    assert rendering.qr_payload(True, "Ab12cD3", "https://example.com", base) == f"{base}/q/Ab12cD3"
+    for error in ("L", "M", "Q", "H"):
+        before, after = make_qr(f"{base}/q/Ab12cD3", error=error), make_qr(compact, error=error)
+        assert after.mode == "alphanumeric"
+        assert after.version < before.version
+
+
+def test_render_formats():
+    assert rendering.render("https://example.com", "png", 300).startswith(b"\x89PNG")
+    assert b"<svg" in rendering.render("https://example.com", "svg")
+
+
+def test_render_many_keeps_order(monkeypatch):
+    # thread pool fallback, small chunks to exercise the in-flight window
+    monkeypatch.setattr(rendering, "RENDER_PROCESSES", 0)
+    payloads = [f"https://example.com/{i}" for i in range(11)]
+
+    async def items():
+        for i, payload in enumerate(payloads):
+            yield i, payload, {}
+
+    async def collect():
+        return [item async for item in rendering.render_many(items(), "svg", chunk_size=2)]
+
+    results = asyncio.run(collect())
+    assert [key for key, _ in results] == list(range(11))
+    assert all(image == rendering.render_svg(payloads[key]) for key, image in results)
+
+
+def make_logo() -> str:
+    out = io.BytesIO()
+    Image.new("RGBA", (80, 40), (255, 0, 0, 255)).save(out, format="PNG")
+    return "data:image/png;base64," + base64.b64encode(out.getvalue()).decode()
+
+
+def test_parse_options():
+    assert rendering.parse_options({}) == rendering.RenderOptions()
+    opts = rendering.parse_options({"dark": "navy", "border": "2", "error": "q", "title": "ignored"})
+    assert (opts.dark, opts.border, opts.error) == ("navy", 2, "Q")
+    # a logo raises the default error correction level
+    assert rendering.parse_options({"logo": make_logo()}).error == "H"
+    assert rendering.parse_options({"logo": make_logo(), "error": "m"}).error == "M"
+
+
+@pytest.mark.parametrize("options", [
+    {"dark": "not-a-color"},
+    {"border": [1]},
+    {"border": 50},
+    {"error": "X"},
+    {"logo": "https://example.com/logo.png"},
+    {"logo_size": 0.9},
+])
+def test_parse_options_rejects(options):
+    with pytest.raises(ValueError):
+        rendering.parse_options(options)
+
+
+def test_render_png_with_logo_and_colors():
+    logo = make_logo()
+    rendering.load_logo.cache_clear()
+    options = {"dark": "#000080", "light": "#ffffee", "logo": logo, "logo_size": 0.25}
+    image = Image.open(io.BytesIO(rendering.render_png("https://example.com", 300, options))).convert("RGB")
+    assert image.getpixel((0, 0)) == (255, 255, 238)
+    assert image.getpixel((image.width // 2, image.height // 2)) == (255, 0, 0)
+    # the second render reuses the decoded logo
+    rendering.render_png("https://example.com/other", 300, options)
+    assert rendering.load_logo.cache_info().misses == 1
+
+
+@pytest.mark.parametrize("scale,border,dark,light", [
+    (1, 4, "#000", "#fff"),
+    (8, 4, "#000", "#fff"),
+    (27, 0, "#123456", "#ffeedd80"),
+])
+def test_matrix_png_matches_segno(scale, border, dark, light):
+    qr = make_qr("https://example.com/q/abcdefg")
+    reference = io.BytesIO()
+    qr.save(reference, kind="png", scale=scale, border=border, dark=dark, light=light)
+    encoded = rendering.encode_matrix_png(qr.matrix, scale, border, dark, light)
+    expected = np.array(Image.open(reference).convert("RGBA"))
+    assert (np.array(Image.open(io.BytesIO(encoded)).convert("RGBA")) == expected).all()
@@ -0,0 +1,58 @@
+import sys
+import os
+import json
+from datetime import datetime
+
+import numpy as np
+from bson import ObjectId
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.responses import StreamingResponse
+
+# ensure project root is importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend.app import responses
+
+
+def test_native_types_serialize_like_jsonable_encoder():
+    oid = ObjectId()
+    stamp = datetime(2024, 5, 1, 12, 30, 15, 250000)
+    body = responses.FastJSONResponse({
+        "id": oid, "at": stamp, "series": np.array([1, 2, 3]), "total": np.int64(6), 7: "x"
+    }).body
+    assert json.loads(body) == {
+        "id": str(oid), "at": stamp.isoformat(), "series": [1, 2, 3], "total": 6, "7": "x"
+    }
+
+
+def test_fallback_default_matches_fast_path():
+    content = {"id": ObjectId(), "at": datetime(2024, 5, 1), "series": np.arange(3)}
+    fallback = json.dumps(content, default=responses._default)
+    assert json.loads(fallback) == json.loads(responses.FastJSONResponse(content).body)
+
+
+def test_large_payloads_are_gzipped_on_request():
+    app = FastAPI(default_response_class=responses.FastJSONResponse)
+    app.add_middleware(responses.StreamSafeGZipMiddleware, minimum_size=responses.GZIP_MINIMUM_SIZE)
+
+    @app.get("/big")
+    async def big():
+        return responses.FastJSONResponse({"labels": [f"2024-01-{i % 28 + 1:02d}" for i in range(500)]})
+
+    @app.get("/small")
+    async def small():
+        return {"ok": True}
+
+    @app.get("/api/qrcodes/clicks/export")
+    async def export():
+        # a content type no Starlette version excludes: left out by path only
+        return StreamingResponse(iter([b"x" * 4096] * 3), media_type="text/csv")
+
+    client = TestClient(app)
+    r = client.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert r.headers["content-encoding"] == "gzip"
+    assert len(r.json()["labels"]) == 500
+    assert "content-encoding" not in client.get("/big", headers={"Accept-Encoding": "identity"}).headers
+    assert "content-encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+    streamed = client.get("/api/qrcodes/clicks/export", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in streamed.headers and len(streamed.content) == 3 * 4096
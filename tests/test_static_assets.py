@@ -0,0 +1,52 @@
+import sys
+import os
+import gzip
+
+from fastapi.testclient import TestClient
+
+# ensure project root is importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend.app.main import app
+from backend.app.static_assets import IMMUTABLE, StaticAssets, static_assets
+
+client = TestClient(app)
+
+
+def test_assets_are_loaded_and_precompressed():
+    asset = static_assets.assets["style.css"]
+    assert asset.media_type == "text/css"
+    assert gzip.decompress(asset.gzip) == asset.body
+
+
+def test_static_revalidates_with_etag():
+    r = client.get("/static/style.css", headers={"Accept-Encoding": "identity"})
+    assert r.status_code == 200
+    assert r.headers["etag"] == static_assets.assets["style.css"].etag
+    assert r.headers["cache-control"] != IMMUTABLE
+
+    r = client.get("/static/style.css", headers={"If-None-Match": r.headers["etag"]})
+    assert r.status_code == 304
+    assert r.content == b""
+
+
+def test_versioned_url_is_immutable_and_gzipped():
+    url = static_assets.url("style.css")
+    assert "?v=" in url
+    r = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert r.headers["cache-control"] == IMMUTABLE
+    assert r.headers["content-encoding"] == "gzip"
+    assert r.content == static_assets.assets["style.css"].body  # httpx decodes the body
+
+
+def test_templates_link_versioned_assets():
+    assert static_assets.url("style.css") in client.get("/").text
+
+
+def test_unknown_asset_and_traversal_404(tmp_path):
+    assert client.get("/static/missing.css").status_code == 404
+    assert client.get("/static/../app/main.py").status_code == 404
+
+    (tmp_path / "js").mkdir()
+    (tmp_path / "js" / "app.js").write_text("console.log('ok');")
+    assets = StaticAssets(str(tmp_path))
+    assert list(assets.assets) == ["js/app.js"]
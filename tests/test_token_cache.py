@@ -0,0 +1,63 @@
+import sys
+import os
+import threading
+import time
+from datetime import timedelta
+
+# ensure project root is importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend.app import auth
+
+
+def test_decode_token_is_cached():
+    auth._token_cache.clear()
+    token = auth.create_access_token({"admin": True}, expires_delta=timedelta(minutes=5))
+    assert auth.decode_token(token)["admin"] is True
+    assert len(auth._token_cache) == 1
+    # a cached payload is a copy: callers cannot alter the cache
+    auth.decode_token(token)["admin"] = False
+    assert auth.decode_token(token)["admin"] is True
+
+
+def test_cached_token_expires(monkeypatch):
+    auth._token_cache.clear()
+    token = auth.create_access_token({"admin": True}, expires_delta=timedelta(minutes=5))
+    assert auth.decode_token(token)
+    monkeypatch.setattr(time, "time", lambda: 10 ** 12)
+
+    def expired(*args, **kwargs):
+        raise auth.JWTError("Signature has expired.")
+
+    # past `exp` the cache entry is dropped and the token verified again
+    monkeypatch.setattr(auth.jwt, "decode", expired)
+    assert auth.decode_token(token) is None
+    assert len(auth._token_cache) == 0
+
+
+def test_invalid_token_is_not_cached():
+    auth._token_cache.clear()
+    assert auth.decode_token("not-a-jwt") is None
+    assert len(auth._token_cache) == 0
+
+
+def test_cache_survives_concurrent_threads(monkeypatch):
+    auth._token_cache.clear()
+    monkeypatch.setattr(auth, "TOKEN_CACHE_SIZE", 4)
+    # more tokens than the cache holds: hits and evictions race across threads
+    tokens = [auth.create_access_token({"admin": True, "n": n}) for n in range(8)]
+    errors = []
+
+    def hammer():
+        try:
+            for _ in range(200):
+                for token in tokens:
+                    assert auth.decode_token(token)["admin"] is True
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=hammer) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == [] and len(auth._token_cache) <= 4
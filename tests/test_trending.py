@@ -0,0 +1,106 @@
+import sys
+import os
+import asyncio
+import random
+
+# ensure project root is importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend.app import models, trending
+from backend.app.sketches import SpaceSaving
+from backend.app.trending import TrendingTracker, persist, top_slugs
+
+
+def test_space_saving_keeps_heavy_hitters():
+    rng = random.Random(1)
+    stream = ["hot"] * 500 + ["warm"] * 200 + [f"cold{rng.randrange(5000)}" for _ in range(2000)]
+    rng.shuffle(stream)
+    summary = SpaceSaving(50)
+    for key in stream:
+        summary.offer(key)
+    assert len(summary) == 50
+    top = summary.top(2)
+    assert [key for key, _, _ in top] == ["hot", "warm"]
+    for key, count, error in top:
+        assert count - error <= stream.count(key) <= count
+
+    left, right = SpaceSaving(50), SpaceSaving(50)
+    for i, key in enumerate(stream):
+        (left if i % 2 else right).offer(key)
+    assert [key for key, _, _ in left.merge(right).top(2)] == ["hot", "warm"]
+
+
+def test_space_saving_eviction_invariants():
+    rng = random.Random(2)
+    stream = [f"k{int(rng.paretovariate(1.2))}" for _ in range(5000)]
+    summary = SpaceSaving.from_list(20, [["k1", 3, 0]])  # the eviction heap is built from loaded counters too
+    truth = {"k1": 3}
+    for i, key in enumerate(stream):
+        summary.offer(key)
+        truth[key] = truth.get(key, 0) + 1
+        if i % 97 == 0 and len(summary) == 20:
+            # the lazily cleaned heap agrees with a full scan
+            assert summary.min_count() == min(count for count, _ in summary.counters.values())
+    assert len(summary) == 20
+    assert sum(count for count, _ in summary.counters.values()) == len(stream) + 3
+    for key, (count, error) in summary.counters.items():
+        assert count - error <= truth[key] <= count
+
+
+def test_windows_expire_old_slots():
+    tracker = TrendingTracker(capacity=10)
+    now = 1_700_000_000
+    for _ in range(5):
+        tracker.offer("old", now=now)
+    for _ in range(3):
+        tracker.offer("new", now=now + 600)
+
+    def top(window):
+        return [(key, count) for key, count, _ in tracker.summary(window, now=now + 600).top(5)]
+
+    assert top("5m") == [("new", 3)]
+    assert top("1h") == [("old", 5), ("new", 3)]
+    assert top("24h") == [("old", 5), ("new", 3)]
+    # memory stays bounded: at most the window's slot count per ring
+    for i in range(100):
+        tracker.offer("x", now=now + i * 3600)
+    assert len(tracker._rings["24h"]) == 24
+
+
+def test_persisted_slots_merge_across_instances(monkeypatch):
+    async def scenario():
+        other = TrendingTracker(capacity=10)
+        for _ in range(4):
+            other.offer("elsewhere")
+        monkeypatch.setattr(trending, "INSTANCE_ID", "other-instance")
+        assert await persist(other) == 3  # one slot per window
+        assert await persist(other) == 0  # nothing changed since
+        monkeypatch.undo()
+
+        local = TrendingTracker(capacity=10)
+        local.offer("here")
+        rows = await top_slugs("5m", 5, tracker=local, shared=True)
+        assert rows[0] == {"slug": "elsewhere", "scans": 4, "error": 0}
+        assert {"slug": "here", "scans": 1, "error": 0} in rows
+        assert await top_slugs("5m", 5, tracker=local, shared=False) == [{"slug": "here", "scans": 1, "error": 0}]
+        await models.TrendingSlot.get_motor_collection().delete_many({"instance": "other-instance"})
+
+    asyncio.run(scenario())
+
+
+def test_trending_endpoint_counts_redirects():
+    from fastapi.testclient import TestClient
+    from backend.app.main import app
+
+    os.environ.setdefault("ADMIN_PASSWORD", "testpass")
+    client = TestClient(app)
+    r = client.post("/admin/login", data={"password": os.environ["ADMIN_PASSWORD"]}, follow_redirects=False)
+    client.cookies.set("admin_token", r.cookies["admin_token"])
+    slug = client.post("/api/qrcodes/", json={"content": "https://example.com/trend", "is_dynamic": True}).json()["slug"]
+    for _ in range(25):
+        client.get(f"/q/{slug}", follow_redirects=False)
+
+    data = client.get("/api/admin/trending?limit=3").json()
+    assert set(data) == {"5m", "1h", "24h"}
+    assert data["5m"][0]["slug"] == slug and data["5m"][0]["scans"] >= 25
+    assert list(client.get("/api/admin/trending?window=1h").json()) == ["1h"]
+    assert client.get("/api/admin/trending?window=2d").status_code == 400
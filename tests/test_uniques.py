@@ -0,0 +1,84 @@
+import sys
+import os
+import asyncio
+import hashlib
+from datetime import datetime, timedelta
+
+import numpy as np
+
+# ensure project root is importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend.app import models, uniques
+from backend.app.sketches import hll_add, hll_count, hll_dumps, hll_loads, hll_merge, hll_new
+
+
+def hashes(start, stop):
+    return [hashlib.sha256(str(i).encode()).hexdigest()[:16] for i in range(start, stop)]
+
+
+def test_hll_estimates_and_merges():
+    a = hll_add(hll_new(), hashes(0, 6000))
+    b = hll_add(hll_new(), hashes(4000, 10000))
+    assert abs(hll_count(a) - 6000) < 6000 * 0.05
+    assert abs(hll_count(hll_merge(a, b)) - 10000) < 10000 * 0.05
+    assert hll_count(hll_add(hll_new(), hashes(0, 20) * 5)) == 20  # duplicates count once
+    assert np.array_equal(hll_loads(hll_dumps(a)), a)
+    assert len(hll_dumps(hll_add(hll_new(), hashes(0, 10)))) < 200
+
+
+def test_sketches_feed_unique_series():
+    async def scenario():
+        code = models.QRCode(slug="uniq1", content="https://example.com/u")
+        await code.insert()
+        today = datetime.utcnow()
+        yesterday = today - timedelta(days=1)
+        # 30 scanners yesterday, 20 today of which 10 came back
+        await uniques.add_scanners([(code.id, yesterday, h) for h in hashes(0, 30)])
+        await asyncio.gather(*(
+            uniques.add_scanners([(code.id, today, h) for h in part])
+            for part in (hashes(20, 30), hashes(30, 40))
+        ))
+        await uniques.add_scanners([(code.id, today, h) for h in hashes(20, 25)])  # no change, no write
+
+        labels, series, total = await uniques.unique_timeseries(code.id, 7, "day")
+        assert len(labels) == 7 and series[-2:].tolist() == [30, 20]
+        assert total == 40
+        assert (await uniques.unique_timeseries(code.id, 7, "week"))[2] == 40
+        assert await uniques.unique_timeseries(code.id, 7, "hour") is None
+
+        doc = await models.UniqueSketch.get_motor_collection().find_one({"_id": uniques.sketch_id(code.id, uniques.sketch_day(today))})
+        assert doc["version"] == 2
+
+    asyncio.run(scenario())
+
+
+def test_click_flush_updates_analytics_uniques():
+    from fastapi.testclient import TestClient
+    from backend.app.main import app
+
+    client = TestClient(app)
+    created = client.post("/api/qrcodes/", json={"content": "https://example.com/unique-flow", "is_dynamic": True}).json()
+    for _ in range(3):
+        client.get(f"/q/{created['slug']}", follow_redirects=False)
+
+    data = client.get(f"/api/qrcodes/{created['id']}/analytics?days=1").json()
+    assert data["series"] == [3]
+    assert data["unique"] == [1] and data["unique_total"] == 1  # every TestClient scan comes from one client
+    assert "unique" not in client.get(f"/api/qrcodes/{created['id']}/analytics?days=1&granularity=hour").json()
+
+
+def test_flush_leaves_sketches_to_feed_sketches():
+    from backend.app.click_buffer import ClickBuffer
+
+    async def scenario():
+        code = models.QRCode(slug="uniqbg", content="https://example.com/uniqbg")
+        await code.insert()
+        sketches = models.UniqueSketch.get_motor_collection()
+        buffer = ClickBuffer(max_size=1)
+        await buffer.record(code.id, "203.0.113.7", "ua", slug="uniqbg")  # flushed inline
+        assert await sketches.count_documents({"qrcode_id": code.id}) == 0  # not on the redirect path
+        assert await buffer.feed_sketches() == 1
+        assert await sketches.count_documents({"qrcode_id": code.id}) == 1
+        assert await buffer.feed_sketches() == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,76 @@
+import sys
+import os
+import asyncio
+import time
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+from starlette.requests import Request
+
+# ensure project root is importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend.app import auth
+
+
+def make_request(token=None):
+    headers = [(b"authorization", f"Bearer {token}".encode())] if token else []
+    return Request({"type": "http", "method": "GET", "path": "/api/me/qrcodes", "headers": headers})
+
+
+def test_access_token_resolves_user_id():
+    user_id = ObjectId()
+    token = auth.create_access_token({"sub": str(user_id)})
+    assert asyncio.run(auth.require_user_id(make_request(token))) == user_id
+    assert asyncio.run(auth.optional_user_id(make_request(token))) == user_id
+
+
+def test_anonymous_request():
+    assert asyncio.run(auth.optional_user_id(make_request())) is None
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(auth.require_user_id(make_request()))
+    assert exc.value.status_code == 401
+
+
+@pytest.mark.parametrize("token", [
+    auth.create_refresh_token({"sub": str(ObjectId())}),
+    auth.create_access_token({"sub": str(ObjectId()), "action": "verify"}),
+    auth.create_access_token({"admin": True}),
+    auth.create_access_token({"sub": "not-an-id"}),
+    "garbage",
+])
+def test_non_user_tokens_rejected(token):
+    assert asyncio.run(auth.optional_user_id(make_request(token))) is None
+
+
+def test_password_hashing_off_the_event_loop():
+    hashed = auth.get_password_hash("s3cret")
+    started = time.perf_counter()
+    assert auth.verify_password("s3cret", hashed)
+    one_verify = time.perf_counter() - started
+
+    async def scenario():
+        gaps = []
+
+        async def ticker(done):
+            last = time.perf_counter()
+            while not done.is_set():
+                await asyncio.sleep(0.005)
+                now = time.perf_counter()
+                gaps.append(now - last)
+                last = now
+
+        done = asyncio.Event()
+        tick = asyncio.create_task(ticker(done))
+        results = await asyncio.gather(*(
+            auth.verify_password_async(password, hashed) for password in ("s3cret", "wrong", "s3cret", "nope")
+        ), auth.get_password_hash_async("other"))
+        done.set()
+        await tick
+        return results, gaps
+
+    (*verified, new_hash), gaps = asyncio.run(scenario())
+    assert verified == [True, False, True, False]
+    assert auth.verify_password("other", new_hash)
+    # five bcrypt runs took several one_verify durations, yet the loop kept ticking
+    assert max(gaps) < one_verify / 2
@@ -0,0 +1,28 @@
+import sys
+import os
+
+# ensure project root is importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from backend.app.useragent import parse_user_agent
+
+IPHONE = "Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.0 Mobile/15E148 Safari/604.1"
+ANDROID = "Mozilla/5.0 (Linux; Android 14; Pixel 8) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Mobile Safari/537.36"
+WINDOWS_EDGE = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36 Edg/120.0"
+
+
+def test_parse_common_user_agents():
+    assert parse_user_agent(IPHONE) == ("mobile", "iOS", "Safari")
+    assert parse_user_agent(ANDROID) == ("mobile", "Android", "Chrome")
+    assert parse_user_agent(WINDOWS_EDGE) == ("desktop", "Windows", "Edge")
+
+
+def test_parse_missing_and_bot_user_agents():
+    assert parse_user_agent(None) == ("unknown", "unknown", "unknown")
+    assert parse_user_agent("Googlebot/2.1 (+http://www.google.com/bot.html)").device == "bot"
+
+
+def test_parse_is_memoized():
+    parse_user_agent.cache_clear()
+    parse_user_agent(IPHONE)
+    parse_user_agent(IPHONE)
+    assert parse_user_agent.cache_info().hits == 1